@@ -1,32 +1,117 @@
 # ----------------------
 # Import Required Modules
 # ----------------------
+import math
+import threading
+import uuid
+from collections import OrderedDict
+
 import dash
-from dash import dcc, html
-from dash.dependencies import Input, Output, State
-from datetime import datetime
+from dash import dcc, html, no_update
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from datetime import datetime, timezone
 import plotly.express as px
 
-from database import get_data_from_db
-from data_processing import (
-    process_data,
-    calculate_phase_durations_and_counts,
-    calculate_average_duration,
+from config import (
+    AGGREGATION_MODE,
+    COMPRESS_RESPONSES,
+    GANTT_RENDERER,
+    METRICS_ENABLED,
+    PROCESSING_ENGINE,
+    REPLAY_TICK_INTERVAL,
+    SERVING_MODE,
+    UPDATE_MODE,
+)
+from database import (
+    get_cached_data,
+    get_data_from_db,
+    get_event_store,
+    get_snapshot,
+    get_available_dates_from_db,
+    get_phase_stats_from_db,
+    get_phase_sketches_from_db,
+    get_gantt_intervals_from_db,
+    DatabaseTargetIndex,
 )
+from event_store import EventStore
+from shared_snapshot import read_snapshot
+from chat_log import chat_events_for_target, get_chat_index
 from graphs import (
     create_avg_duration_bar,
     create_phase_count_bar,
     create_gantt_chart,
+    create_lod_gantt_chart,
+    create_trajectory_map,
 )
+from gantt_lod import parse_x_range, prepare_gantt_bars
+from trajectory_index import build_trajectories, get_trajectory_index, parse_viewport
+from live_updates import register_update_stream, start_listener
+from metrics import instrument_callback, register_metrics, stage_timer
+from partitions import start_partition_maintenance
+from response_encoding import configure_json_engine, register_compression
+from figure_delta import bar_charts_patch, gantt_chart_patch
+from quantile_sketch import STATISTICS, calculate_duration_statistic
+from replay import ReplayState, get_replay_engine
+
+# Both engines expose the same functions; the pure-Python one is kept as a reference
+if PROCESSING_ENGINE == "reference":
+    from data_processing import (
+        process_data,
+        calculate_phase_durations_and_counts,
+        calculate_phase_sketches,
+        calculate_average_duration,
+        build_gantt_data,
+    )
+else:
+    from vectorized_processing import (
+        process_data,
+        calculate_phase_durations_and_counts,
+        calculate_phase_sketches,
+        calculate_average_duration,
+        build_gantt_data,
+    )
 
-TAB_COUNT = 2  # Number of tabs (views)
+# Style of each tab (view) while it is visible; hidden tabs get {"display": "none"}
+TAB_VISIBLE_STYLES = [
+    {"display": "flex", "flexWrap": "wrap"},  # Tab 0: Bar Graphs
+    {"display": "block"},  # Tab 1: Gantt Chart
+    {"display": "block"},  # Tab 2: Track Map
+]
+TAB_COUNT = len(TAB_VISIBLE_STYLES)  # Number of tabs (views)
 INTERVAL_DURATION = 15 * 1000  # Interval duration in milliseconds (15 seconds)
+REPLAY_SPEEDS = [1, 2, 5, 10, 20, 50, 100]  # Replay speeds offered (times real time)
+# Style of the replay controls while replay mode is on
+REPLAY_CONTROLS_STYLE = {"width": "50%", "margin": "0 auto", "textAlign": "center"}
 
 # ----------------------
 # Initialize Dash App
 # ----------------------
+# Encode figures and callback responses with orjson when it is available
+configure_json_engine()
+
 app = dash.Dash(__name__)
 app.title = "Phase Dashboard"
+server = app.server  # WSGI entry point for multi-worker servers (gunicorn app:server)
+
+# In push mode one listener thread per process follows database changes and browsers
+# are told to refresh over server-sent events instead of polling on the interval
+if UPDATE_MODE == "push":
+    register_update_stream(server)
+    start_listener()
+
+# gzip/brotli for callback responses and Dash's bundles; registered before the metrics
+# so those still see (and time) the uncompressed JSON
+if COMPRESS_RESPONSES:
+    register_compression(server)
+
+# Stage timings, payload sizes and concurrency for Prometheus on /metrics
+if METRICS_ENABLED:
+    register_metrics(server)
+
+# Keep future daily partitions of the data table in place (and old ones expiring); in
+# shared serving mode the refresher does this, as it is the only database client
+if SERVING_MODE != "shared":
+    start_partition_maintenance()
 
 # ----------------------
 # App Layout
@@ -35,6 +120,24 @@ app.layout = html.Div(
     [
         # Store to keep track of which tab (view) is currently active
         dcc.Store(id="current-tab-index", data=0),
+        # Visible style of each tab, read by the client-side tab callbacks
+        dcc.Store(id="tab-styles", data=TAB_VISIBLE_STYLES),
+        # Data version and date each tab was last rendered with, so unchanged views are skipped
+        dcc.Store(id="rendered-views", data={}),
+        # Visible x window of the Gantt chart ([start, end], or None for the full span)
+        dcc.Store(id="gantt-window", data=None),
+        # Visible [lon_min, lon_max, lat_min, lat_max] of the track map (None = everything)
+        dcc.Store(id="map-viewport", data=None),
+        # Update mode settings for the browser, and the data version last pushed by the server
+        dcc.Store(
+            id="update-mode",
+            data={
+                "mode": UPDATE_MODE,
+                "url": app.get_relative_path("/updates"),
+                "interval": INTERVAL_DURATION,
+            },
+        ),
+        dcc.Store(id="live-update-signal", data=None),
         # Dropdown for selecting date ranges (populated dynamically)
         dcc.Dropdown(
             id="date-selector",
@@ -49,6 +152,64 @@ app.layout = html.Div(
                 "cursor": "auto",
             },
         ),
+        # Live view, or replay of the selected date's events at an adjustable speed
+        dcc.RadioItems(
+            id="data-mode",
+            options=[
+                {"label": "Live", "value": "live"},
+                {"label": "Replay", "value": "replay"},
+            ],
+            value="live",
+            inline=True,
+            style={"textAlign": "center", "color": "white", "margin": "10px auto"},
+            inputStyle={"marginLeft": "15px", "marginRight": "5px"},
+        ),
+        # Replay controls (only shown in replay mode)
+        html.Div(
+            id="replay-controls",
+            children=[
+                html.Button(
+                    "Play",
+                    id="replay-play",
+                    style={
+                        "backgroundColor": "black",
+                        "color": "white",
+                        "border": "1px solid white",
+                        "padding": "5px 10px",
+                        "cursor": "pointer",
+                    },
+                ),
+                html.Div(id="replay-clock", style={"color": "white", "margin": "5px"}),
+                # Playback speed, in times real time
+                html.Div(
+                    dcc.Slider(
+                        id="replay-speed",
+                        min=0,
+                        max=len(REPLAY_SPEEDS) - 1,
+                        step=None,
+                        marks={i: f"{speed}x" for i, speed in enumerate(REPLAY_SPEEDS)},
+                        value=REPLAY_SPEEDS.index(10),
+                    ),
+                    style={"width": "100%"},
+                ),
+                # Replay position (epoch seconds); dragging it seeks
+                html.Div(
+                    dcc.Slider(id="replay-position", min=0, max=1, value=0, updatemode="mouseup"),
+                    style={"width": "100%"},
+                ),
+            ],
+            style={"display": "none"},
+        ),
+        # Speeds of the speed slider's marks, the time span of the replayed selection,
+        # and where the replay is
+        dcc.Store(id="replay-speeds", data=REPLAY_SPEEDS),
+        dcc.Store(id="replay-bounds", data=None),
+        dcc.Store(id="replay-cursor", data=None),
+        # Target drilled into from the Gantt chart, and the key of its rendered figures
+        dcc.Store(id="selected-target", data=None),
+        dcc.Store(id="target-view", data=None),
+        # Replay steps (disabled unless playing)
+        dcc.Interval(id="replay-interval", interval=REPLAY_TICK_INTERVAL, disabled=True),
         # Button to manually switch between views (tabs)
         html.Button(
             "Next Graph",
@@ -63,7 +224,7 @@ app.layout = html.Div(
                 "margin": "10px auto",
             },
         ),
-        # Div container for all tab content (both views are here, only one is shown at a time)
+        # Div container for all tab content (all views are here, only one is shown at a time)
         html.Div(
             id="tabs-content",
             children=[
@@ -71,6 +232,18 @@ app.layout = html.Div(
                 html.Div(
                     id="tab-0",
                     children=[
+                        # Statistic shown in the duration chart: mean or a percentile
+                        dcc.RadioItems(
+                            id="duration-statistic",
+                            options=[
+                                {"label": label, "value": key}
+                                for key, (label, _) in STATISTICS.items()
+                            ],
+                            value="mean",
+                            inline=True,
+                            style={"width": "100%", "textAlign": "center", "color": "white"},
+                            inputStyle={"marginLeft": "15px", "marginRight": "5px"},
+                        ),
                         html.Div(
                             id="bar-graphs-container",
                             children=[
@@ -92,6 +265,57 @@ app.layout = html.Div(
                     id="tab-1",
                     children=[
                         dcc.Graph(id="gantt-chart"),  # Gantt chart showing timeline
+                        # Drill-down into the target of a clicked bar (hidden until one is)
+                        html.Div(
+                            id="target-drilldown",
+                            children=[
+                                html.Div(
+                                    [
+                                        html.Span(id="target-title"),
+                                        html.Button(
+                                            "Close",
+                                            id="clear-target",
+                                            style={
+                                                "backgroundColor": "black",
+                                                "color": "white",
+                                                "border": "1px solid white",
+                                                "padding": "5px 10px",
+                                                "cursor": "pointer",
+                                                "marginLeft": "15px",
+                                            },
+                                        ),
+                                    ],
+                                    style={"textAlign": "center", "color": "white"},
+                                ),
+                                html.Div(
+                                    [
+                                        dcc.Graph(id="target-duration-bar"),  # Target's avg durations
+                                        dcc.Graph(id="target-count-bar"),  # Target's phase counts
+                                    ],
+                                    style={
+                                        "display": "flex",
+                                        "justifyContent": "space-between",
+                                        "width": "100%",
+                                        "gap": "10px",
+                                    },
+                                ),
+                                dcc.Graph(id="target-timeline"),  # Target's phases over time
+                                # Chat lines that mention the target (with CHAT_LOG_PATH set)
+                                html.Div(
+                                    id="target-chat",
+                                    style={"color": "white", "padding": "0 20px 20px"},
+                                ),
+                            ],
+                            style={"display": "none"},
+                        ),
+                    ],
+                    style={"display": "none"},  # Initially hidden
+                ),
+                # ------------------ Tab 2: Track Map ------------------
+                html.Div(
+                    id="tab-2",
+                    children=[
+                        dcc.Graph(id="trajectory-map"),  # Track trajectories by position
                     ],
                     style={"display": "none"},  # Initially hidden
                 ),
@@ -105,48 +329,561 @@ app.layout = html.Div(
 )
 
 # ----------------------
-# Callback: Handle Tab Switching (Manual or Timed)
+# Client-Side Callback: Handle Tab Switching (Manual or Timed)
 # ----------------------
-@app.callback(
+# Runs in the browser (assets/clientside.js): interval ticks and button clicks advance
+# the tab without a server round trip
+app.clientside_callback(
+    ClientsideFunction(namespace="tabs", function_name="cycle_tabs"),
     Output("current-tab-index", "data"),
     [
         Input("interval-component", "n_intervals"),
         Input("switch-tab-button", "n_clicks"),
     ],
-    [State("current-tab-index", "data")],
+    [State("current-tab-index", "data"), State("tab-styles", "data")],
 )
-def cycle_tabs(n, n_clicks, current_tab_index):
-    # If button has not been clicked, do nothing
-    if n_clicks is None:
-        return current_tab_index
-    # Otherwise, toggle between tabs 0 and 1
-    return (current_tab_index + 1) % TAB_COUNT
 
+# ----------------------
+# Client-Side Callback: Subscribe to Pushed Updates
+# ----------------------
+# Opens the server-sent events stream once per page in push mode; every pushed version
+# is written to live-update-signal, which re-runs update_graphs. Falls back to polling
+# on the interval while the stream is down.
+app.clientside_callback(
+    ClientsideFunction(namespace="live", function_name="connect"),
+    Output("live-update-signal", "data"),
+    Input("update-mode", "data"),
+)
 
 # ----------------------
-# Callback: Update Tab Visibility
+# Client-Side Callback: Update Tab Visibility
 # ----------------------
-@app.callback(
-    [
-        Output("tab-0", "style"),
-        Output("tab-1", "style"),
-    ],
+app.clientside_callback(
+    ClientsideFunction(namespace="tabs", function_name="display_tab_content"),
+    [Output(f"tab-{i}", "style") for i in range(TAB_COUNT)],
     Input("current-tab-index", "data"),
+    State("tab-styles", "data"),
 )
-def display_tab_content(tab_index):
-    # Show tab 0 content if index is 0, otherwise hide it
-    tab_0_style = (
-        {"display": "flex", "flexWrap": "wrap"}
-        if tab_index == 0
-        else {"display": "none"}
+
+
+# ----------------------
+# Client-Side Callback: Select Target from Gantt Chart
+# ----------------------
+# Runs in the browser (assets/clientside.js): a clicked bar's row is looked up in the
+# figure the browser already has, so the figure is never sent back to the server
+app.clientside_callback(
+    ClientsideFunction(namespace="drilldown", function_name="select_target"),
+    Output("selected-target", "data"),
+    Input("gantt-chart", "clickData"),
+    Input("clear-target", "n_clicks"),
+    State("gantt-chart", "figure"),
+    prevent_initial_call=True,
+)
+
+
+# ----------------------
+# Callback: Track Gantt Zoom Window
+# ----------------------
+@app.callback(
+    Output("gantt-window", "data"),
+    Input("gantt-chart", "relayoutData"),
+    Input("date-selector", "value"),
+    prevent_initial_call=True,
+)
+def update_gantt_window(relayout_data, selected_date):
+    # A new date always starts from the full time span
+    if dash.callback_context.triggered_id == "date-selector":
+        return None
+    # Re-aggregate only when the x-axis was zoomed, panned or reset
+    x_range = parse_x_range(relayout_data)
+    return no_update if x_range is False else x_range
+
+
+# ----------------------
+# Callback: Track Map Viewport
+# ----------------------
+@app.callback(
+    Output("map-viewport", "data"),
+    Input("trajectory-map", "relayoutData"),
+    prevent_initial_call=True,
+)
+def update_map_viewport(relayout_data):
+    # Re-select and re-simplify points only when the map was zoomed, panned or reset
+    viewport = parse_viewport(relayout_data)
+    return no_update if viewport is False else viewport
+
+
+# ----------------------
+# Callback: Show Replay Controls and Span
+# ----------------------
+@app.callback(
+    Output("replay-bounds", "data"),
+    Output("replay-position", "min"),
+    Output("replay-position", "max"),
+    Output("replay-position", "marks"),
+    Output("replay-controls", "style"),
+    Input("data-mode", "value"),
+    Input("date-selector", "value"),
+)
+def update_replay_bounds(data_mode, selected_date):
+    if data_mode != "replay":
+        return None, no_update, no_update, no_update, {"display": "none"}
+    _, engine = load_replay_engine(selected_date)
+    bounds = engine.bounds() if engine is not None else None
+    if bounds is None:
+        return None, 0, 1, {}, REPLAY_CONTROLS_STYLE
+
+    # Whole seconds, so the slider's default step of 1 reaches both ends
+    start, end = math.floor(bounds[0]), math.ceil(bounds[1])
+    label_format = "%Y-%m-%d %H:%M" if selected_date == "all" else "%H:%M"
+
+    def label(seconds):
+        # Event times are naive UTC, so the slider reads them back as UTC
+        return datetime.fromtimestamp(seconds, timezone.utc).strftime(label_format)
+
+    # The selection stays the same while new data arrives; the cursor restarts on a new one
+    replay_bounds = {"start": start, "end": end, "key": selected_date}
+    return replay_bounds, start, end, {start: label(start), end: label(end)}, REPLAY_CONTROLS_STYLE
+
+
+# ----------------------
+# Client-Side Callback: Advance the Replay Cursor
+# ----------------------
+# Runs in the browser (assets/clientside.js): each tick moves the cursor by the speed times
+# the real time elapsed, and play/pause, seeking and speed changes take effect at once. The
+# cursor then drives update_graphs like a new data version.
+app.clientside_callback(
+    ClientsideFunction(namespace="replay", function_name="step"),
+    Output("replay-cursor", "data"),
+    Output("replay-position", "value"),
+    Output("replay-interval", "disabled"),
+    Output("replay-play", "children"),
+    Output("replay-clock", "children"),
+    Input("replay-interval", "n_intervals"),
+    Input("replay-play", "n_clicks"),
+    Input("replay-position", "value"),
+    Input("replay-speed", "value"),
+    Input("replay-bounds", "data"),
+    State("replay-cursor", "data"),
+    State("replay-speeds", "data"),
+)
+
+
+# ----------------------
+# Function: Calculate Phase Statistics
+# ----------------------
+def calculate_phase_stats(data, selected_date):
+    """
+    Filters the data to the selected date and calculates per-phase statistics.
+
+    Args:
+        data (EventStore, ReplayState, DataFrame or None): Phase events (target_id,
+            phase_timestamp, phase), or the statistics of a replay. Ignored otherwise in SQL
+            aggregation mode, where Postgres does the work.
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+    Returns:
+        tuple: (filtered_data, phase_durations, phase_counts, avg_durations, phase_colors).
+        filtered_data is None in SQL aggregation mode, for an EventStore (daily rollups)
+        and for a ReplayState.
+    """
+    if isinstance(data, ReplayState):
+        # The replay engine keeps the sums and counts up to its cursor
+        filtered_data = None
+        phase_durations, phase_counts = data.phase_durations, data.phase_counts
+        avg_durations = calculate_average_duration(phase_durations, phase_counts)
+    elif AGGREGATION_MODE == "sql":
+        filtered_data = None
+        with stage_timer("durations"):
+            phase_durations, phase_counts, avg_durations = get_phase_stats_from_db(
+                selected_date
+            )
+    elif isinstance(data, EventStore):
+        # Sum the store's daily rollups; only days with new events are recomputed
+        filtered_data = None
+        with stage_timer("durations"):
+            phase_durations, phase_counts = data.phase_stats(selected_date)
+            avg_durations = calculate_average_duration(phase_durations, phase_counts)
+    else:
+        # Filter and process the raw data based on selected date
+        with stage_timer("process_data"):
+            filtered_data = process_data(data, selected_date)
+
+        with stage_timer("durations"):
+            # Calculate phase durations and how many times each phase appears
+            phase_durations, phase_counts = calculate_phase_durations_and_counts(
+                filtered_data
+            )
+
+            # Compute average duration per phase
+            avg_durations = calculate_average_duration(phase_durations, phase_counts)
+
+    phase_colors = assign_phase_colors(phase_durations)
+    return filtered_data, phase_durations, phase_counts, avg_durations, phase_colors
+
+
+# ----------------------
+# Function: Assign Phase Colors
+# ----------------------
+def assign_phase_colors(phases):
+    """
+    Assigns a unique color to each phase using Plotly's qualitative color set.
+
+    Args:
+        phases (iterable): Phases, in the order of the statistics they are drawn with.
+
+    Returns:
+        dict: {phase: color}.
+    """
+    return {
+        phase: px.colors.qualitative.Set1[i % len(px.colors.qualitative.Set1)]
+        for i, phase in enumerate(phases)
+    }
+
+
+# ----------------------
+# Function: Calculate Duration Percentiles
+# ----------------------
+def calculate_duration_percentiles(data, selected_date, filtered_data, statistic):
+    """
+    Reads a percentile of each phase's duration from mergeable sketches.
+
+    Args:
+        data (EventStore, ReplayState, DataFrame or None): Phase events (unused in SQL mode).
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+        filtered_data (dict, DataFrame or None): Output of `process_data`, if it was needed.
+        statistic (str): A percentile key of quantile_sketch.STATISTICS (e.g. "p90").
+
+    Returns:
+        dict: {phase: minutes}, rounded to 2 decimals.
+    """
+    if isinstance(data, ReplayState):
+        # Sketches of the durations completed before the replay cursor
+        phase_sketches = data.phase_sketches
+    elif AGGREGATION_MODE == "sql":
+        # Stored daily sketches merged with sketches of the live days
+        phase_sketches = get_phase_sketches_from_db(selected_date)
+    elif isinstance(data, EventStore):
+        # Merge the store's daily sketches; only days with new events are re-sketched
+        phase_sketches = data.phase_sketches(selected_date)
+    else:
+        phase_sketches = calculate_phase_sketches(filtered_data)
+    return calculate_duration_statistic(phase_sketches, statistic)
+
+
+# ----------------------
+# Function: Build View
+# ----------------------
+def build_view(
+    tab_index,
+    data,
+    selected_date,
+    gantt_window=None,
+    map_viewport=None,
+    duration_statistic="mean",
+):
+    """
+    Builds only the figures shown on one tab.
+
+    Args:
+        tab_index (int): Index of the tab to build (0 = bar graphs, 1 = Gantt chart, 2 = track map).
+        data (EventStore, ReplayState, DataFrame or None): Phase events (unused in SQL mode).
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+        gantt_window (list, optional): Visible [start, end] of the Gantt chart.
+        map_viewport (list, optional): Visible [lon_min, lon_max, lat_min, lat_max] of the track map.
+        duration_statistic (str): Key of quantile_sketch.STATISTICS shown in the duration chart.
+
+    Returns:
+        dict: View state with the figures keyed by graph id under "figures", plus the
+        values they were drawn from (used to compute patches for later versions).
+    """
+    if tab_index == 2:
+        # The track map reads the track store, not the phase data
+        trajectory_index = get_trajectory_index()
+        if trajectory_index is None:
+            return {"figures": {"trajectory-map": {}}}
+        with stage_timer("trajectories"):
+            trajectories = build_trajectories(trajectory_index, selected_date, map_viewport)
+        with stage_timer("figures"):
+            return {"figures": {"trajectory-map": create_trajectory_map(trajectories)}}
+
+    filtered_data, _, phase_counts, avg_durations, phase_colors = calculate_phase_stats(
+        data, selected_date
     )
-    # Show tab 1 content if index is 1, otherwise hide it
-    tab_1_style = {"display": "block"} if tab_index == 1 else {"display": "none"}
-    return tab_0_style, tab_1_style
+
+    if tab_index == 1:
+        replaying = isinstance(data, ReplayState)
+        if AGGREGATION_MODE != "sql" and filtered_data is None and not replaying:
+            with stage_timer("process_data"):
+                filtered_data = process_data(data, selected_date)
+        with stage_timer("gantt_data"):
+            # Format data into Gantt chart-friendly structure
+            if replaying:
+                gantt_data = data.gantt_data  # Bars up to the replay cursor
+            elif AGGREGATION_MODE == "sql":
+                gantt_data = get_gantt_intervals_from_db(selected_date)
+            else:
+                gantt_data = build_gantt_data(filtered_data)
+            # The level-of-detail renderer also picks the bars worth drawing
+            if GANTT_RENDERER != "express":
+                prepared = prepare_gantt_bars(gantt_data, gantt_window)
+        if GANTT_RENDERER == "express":
+            with stage_timer("figures"):
+                return {"figures": {"gantt-chart": create_gantt_chart(gantt_data, phase_colors)}}
+        with stage_timer("figures"):
+            gantt_chart = create_lod_gantt_chart(
+                gantt_data, phase_colors, gantt_window, prepared=prepared
+            )
+        return {
+            "figures": {"gantt-chart": gantt_chart},
+            "gantt": prepared,
+            "phase_colors": phase_colors,
+            "trace_count": len(gantt_chart["data"]),
+        }
+
+    duration_values = avg_durations
+    if duration_statistic != "mean":
+        with stage_timer("durations"):
+            percentiles = calculate_duration_percentiles(
+                data, selected_date, filtered_data, duration_statistic
+            )
+        # Keep the phases in the same order as the mean and count charts
+        duration_values = {
+            phase: percentiles[phase] for phase in avg_durations if phase in percentiles
+        }
+
+    statistic_label, _ = STATISTICS[duration_statistic]
+    with stage_timer("figures"):
+        figures = {
+            "avg-duration-bar": create_avg_duration_bar(
+                duration_values, phase_colors, statistic_label
+            ),
+            "count-phase-bar": create_phase_count_bar(phase_counts, phase_colors),
+        }
+    return {
+        "figures": figures,
+        "duration_values": duration_values,
+        "phase_counts": phase_counts,
+    }
+
+
+# ----------------------
+# Function: Read Rows from Shared Snapshot
+# ----------------------
+def snapshot_rows(snapshot, selected_date="all"):
+    """
+    Wraps the memory-mapped snapshot columns in the input format of the active engine.
+
+    Args:
+        snapshot (SharedSnapshot): The snapshot currently published by the refresher.
+        selected_date (str): A specific date in "YYYY-MM-DD" format, or "all" (the default)
+            for every row.
+
+    Returns:
+        DataFrame or list of tuples: Rows for `process_data`.
+    """
+    data = snapshot.to_frame(selected_date)
+    if PROCESSING_ENGINE == "reference":
+        data = list(data.itertuples(index=False, name=None))
+    return data
+
+
+# ----------------------
+# Function: Load Replay Engine
+# ----------------------
+def load_replay_engine(selected_date):
+    """
+    Returns the replay engine for the current data and a date, building it on first use.
+
+    Engines are keyed on the replayed selection's content rather than on the data version,
+    so new rows on other days (e.g. today's, while an earlier day is replayed) do not
+    rebuild them.
+
+    Args:
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+    Returns:
+        tuple: (selection version, ReplayEngine), or (None, None) when there is no data yet.
+    """
+    if AGGREGATION_MODE != "sql" and SERVING_MODE == "shared":
+        snapshot = read_snapshot()
+        if snapshot is None:
+            return None, None
+        version = f"shared-{snapshot.selection_fingerprint(selected_date)}"
+        return version, get_replay_engine(
+            version, selected_date, lambda: snapshot.to_frame(selected_date)
+        )
+
+    # Replays need the events themselves, so SQL mode keeps the in-process snapshot too
+    if AGGREGATION_MODE == "sql":
+        get_data_from_db()
+    else:
+        get_cached_data()  # Fetches only if nothing was fetched yet
+    events = get_event_store()
+    version = f"{_BOOT_ID}-{events.selection_revision(selected_date)}"
+    return version, get_replay_engine(version, selected_date, lambda: events.rows(selected_date))
+
+
+# Phases of the main charts per shared snapshot selection, for the drill-down's colors
+_shared_phase_order = {}
+_shared_phase_order_lock = threading.Lock()
+
+
+# ----------------------
+# Function: Load Drill-Down Source
+# ----------------------
+def load_drilldown_source():
+    """
+    Returns the per-target index the drill-down reads in the active mode.
+
+    Shared mode slices the mapped snapshot columns by target, SQL mode queries one target's
+    rows, and otherwise the in-process event store is used.
+
+    Returns:
+        SnapshotTargetIndex, DatabaseTargetIndex, EventStore or None: An object with the
+        target_revision, target_stats and target_timeline methods of EventStore, or None
+        when there is no data yet.
+    """
+    if AGGREGATION_MODE == "sql":
+        return DatabaseTargetIndex()
+    if SERVING_MODE == "shared":
+        snapshot = read_snapshot()
+        return snapshot.target_index() if snapshot is not None else None
+    get_cached_data()  # Fetches only if nothing was fetched yet
+    return get_event_store()
+
+
+# ----------------------
+# Function: Load Phase Order
+# ----------------------
+def load_phase_order(selected_date):
+    """
+    Returns the phases in the order the charts of all targets draw them, so the drill-down
+    gets the same colors.
+
+    Args:
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+    Returns:
+        list: Phases, in the order of the main charts' statistics.
+    """
+    if AGGREGATION_MODE == "sql":
+        return list(get_phase_stats_from_db(selected_date)[0])
+    if SERVING_MODE != "shared":
+        return list(get_event_store().phase_stats(selected_date)[0])
+
+    # The selection is processed once per snapshot version, as the main charts do
+    snapshot = read_snapshot()
+    if snapshot is None:
+        return []
+    key = (snapshot.version, selected_date)
+    with _shared_phase_order_lock:
+        phases = _shared_phase_order.get(key)
+    if phases is None:
+        filtered_data = process_data(snapshot_rows(snapshot, selected_date), selected_date)
+        phases = list(calculate_phase_durations_and_counts(filtered_data)[0])
+        with _shared_phase_order_lock:
+            # Keep the current version's selections only
+            for old_key in [k for k in _shared_phase_order if k[0] != snapshot.version]:
+                del _shared_phase_order[old_key]
+            _shared_phase_order[key] = phases
+    return phases
+
+
+# Views built in this process, keyed by (tab index, view key). Every client viewing the
+# same data shares the same figures, and recent versions are kept so a browser that still
+# shows one of them can be sent a patch instead of whole figures.
+VIEW_HISTORY_SIZE = 32
+_view_history = OrderedDict()
+_view_history_lock = threading.Lock()
+_BOOT_ID = uuid.uuid4().hex[:8]  # Distinguishes in-process versions across restarts
+
+
+# ----------------------
+# Function: Build View (Cached)
+# ----------------------
+def build_cached_view(
+    view_key,
+    tab_index,
+    load_data,
+    selected_date,
+    gantt_window=None,
+    map_viewport=None,
+    duration_statistic="mean",
+):
+    """
+    Returns the view state for one tab, building it only once per data version.
+
+    Args:
+        view_key (str or None): Data version, date and window of the view; None disables
+            caching (SQL mode).
+        tab_index (int): Index of the tab to build.
+        load_data (callable): Returns the raw rows for the Python engines; only called on a cache miss.
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+        gantt_window (list, optional): Visible [start, end] of the Gantt chart.
+        map_viewport (list, optional): Visible [lon_min, lon_max, lat_min, lat_max] of the track map.
+        duration_statistic (str): Key of quantile_sketch.STATISTICS shown in the duration chart.
+
+    Returns:
+        dict: View state from `build_view`.
+    """
+    if view_key is None:
+        return build_view(
+            tab_index, load_data(), selected_date, gantt_window, map_viewport, duration_statistic
+        )
+    with _view_history_lock:
+        state = _view_history.get((tab_index, view_key))
+    if state is None:
+        state = build_view(
+            tab_index, load_data(), selected_date, gantt_window, map_viewport, duration_statistic
+        )
+        with _view_history_lock:
+            _view_history[(tab_index, view_key)] = state
+            while len(_view_history) > VIEW_HISTORY_SIZE:
+                _view_history.popitem(last=False)
+    return state
 
 
 # ----------------------
-# Callback: Update All Graphs and Dropdown Options
+# Function: Build View Patch
+# ----------------------
+def build_view_patch(tab_index, old_key, new_key, new_state, rendered_views):
+    """
+    Works out a partial update from the view a browser shows to the current one.
+
+    Args:
+        tab_index (int): Index of the active tab.
+        old_key (str or None): View key the browser last rendered for this tab.
+        new_key (str): View key of the current data.
+        new_state (dict): Current view state.
+        rendered_views (dict): The browser's rendered-views store.
+
+    Returns:
+        tuple or None: (outputs keyed by graph id, new Gantt trace count or None), or None
+        when the browser must be sent whole figures.
+    """
+    if old_key is None or GANTT_RENDERER == "express" and tab_index == 1:
+        return None
+    if tab_index == 2:
+        return None  # Map points are re-simplified per render, so there is nothing to append
+    # Only the data version may differ; a new date or window needs a fresh figure
+    if old_key.split("|", 1)[1:] != new_key.split("|", 1)[1:]:
+        return None
+    with _view_history_lock:
+        old_state = _view_history.get((tab_index, old_key))
+    if old_state is None:
+        return None
+
+    if tab_index == 1:
+        old_trace_count = rendered_views.get("gantt-traces", old_state["trace_count"])
+        result = gantt_chart_patch(old_state, new_state, old_trace_count)
+        return result
+    patches = bar_charts_patch(old_state, new_state)
+    return (patches, None) if patches is not None else None
+
+
+# ----------------------
+# Callback: Update Visible Graphs and Dropdown Options
 # ----------------------
 @app.callback(
     [
@@ -154,61 +891,211 @@ def display_tab_content(tab_index):
         Output("avg-duration-bar", "figure"),
         Output("count-phase-bar", "figure"),
         Output("gantt-chart", "figure"),
+        Output("trajectory-map", "figure"),
+        Output("rendered-views", "data"),
+    ],
+    [
+        # What makes the dashboard refresh: the interval (poll) or a pushed version (push)
+        Input("live-update-signal", "data")
+        if UPDATE_MODE == "push"
+        else Input("interval-component", "n_intervals"),
+        Input("date-selector", "value"),
+        Input("current-tab-index", "data"),
+        Input("gantt-window", "data"),
+        Input("map-viewport", "data"),
+        Input("duration-statistic", "value"),
+        Input("replay-cursor", "data"),
     ],
-    [Input("interval-component", "n_intervals"), Input("date-selector", "value")],
+    [State("date-selector", "options"), State("rendered-views", "data")],
 )
-def update_graphs(n_intervals, selected_date):
-    # Fetch data and available dates from database
-    data, available_dates = get_data_from_db()
+@instrument_callback("update_graphs")
+def update_graphs(
+    refresh_signal,
+    selected_date,
+    tab_index,
+    gantt_window,
+    map_viewport,
+    duration_statistic,
+    replay_cursor,
+    current_options,
+    rendered_views,
+):
+    if AGGREGATION_MODE == "sql":
+        # Let Postgres compute durations, counts and Gantt intervals; only results are transferred
+        load_data = lambda: None  # noqa: E731
+        available_dates = get_available_dates_from_db()
+        version = None  # Postgres-side results are not versioned, always rebuild
+    elif SERVING_MODE == "shared":
+        # Read the snapshot published by snapshot_refresher.py instead of querying Postgres
+        snapshot = read_snapshot()
+        available_dates = snapshot.available_dates if snapshot is not None else []
+        load_data = lambda: snapshot_rows(snapshot)  # noqa: E731
+        version = f"shared-{snapshot.version}" if snapshot is not None else None
+    else:
+        # Fetch data and available dates from database (in push mode the listener has
+        # already fetched them, so just read the in-process snapshot)
+        if UPDATE_MODE == "push":
+            _, available_dates = get_cached_data()
+        else:
+            _, available_dates = get_data_from_db()
+        # Views read the date-partitioned event store rather than scanning every row; the
+        # version and the store come from the same published snapshot
+        snapshot = get_snapshot()
+        load_data = lambda: snapshot.events  # noqa: E731
+        version = f"{_BOOT_ID}-{snapshot.version}"
+
+    # Dates with track data can be chosen too (for the track map)
+    trajectory_index = get_trajectory_index()
+    if trajectory_index is not None:
+        available_dates = sorted(set(available_dates) | set(trajectory_index.available_dates))
 
     # Create dropdown options based on available dates
     dropdown_options = [{"label": date, "value": date} for date in available_dates]
     dropdown_options.insert(
         0, {"label": "All Data", "value": "all"}
     )  # Add default option
+    if dropdown_options == current_options:
+        dropdown_options = no_update
 
     # If no data is available, return empty graphs
-    if not data:
-        return dropdown_options, {}, {}, {}
-
-    # Filter and process the raw data based on selected date
-    filtered_data = process_data(data, selected_date)
+    if not available_dates:
+        return dropdown_options, {}, {}, {}, {}, {}
 
-    # Calculate phase durations and how many times each phase appears
-    phase_durations, phase_counts = calculate_phase_durations_and_counts(filtered_data)
+    # In replay mode the statistics are those up to the cursor; each cursor position is
+    # a version of its own (the track map is not replayed)
+    replay_time = (replay_cursor or {}).get("time")
+    if replay_time is not None and tab_index != 2:
+        replay_version, engine = load_replay_engine(selected_date)
+        if engine is not None:
+            load_data = lambda: engine.state_at(replay_time)  # noqa: E731
+            version = f"replay-{replay_version}@{replay_time:.3f}"
 
-    # Compute average duration per phase
-    avg_durations = calculate_average_duration(phase_durations, phase_counts)
+    # Skip the work entirely if this browser already shows the active tab for this data
+    view_key = f"{version}|{selected_date}" if version is not None else None
+    if view_key is not None and tab_index == 0:
+        view_key += f"|{duration_statistic}"
+    if view_key is not None and tab_index == 1:
+        view_key += f"|{gantt_window}"
+    if tab_index == 2:
+        # The map is versioned by the track store and does not use the phase rows
+        load_data = lambda: None  # noqa: E731
+        view_key = None
+        if trajectory_index is not None:
+            view_key = f"tracks-{trajectory_index.version}|{selected_date}|{map_viewport}"
+    rendered_views = rendered_views or {}
+    old_key = rendered_views.get(str(tab_index))
+    if view_key is not None and old_key == view_key:
+        return dropdown_options, no_update, no_update, no_update, no_update, no_update
 
-    # Assign a unique color to each phase using Plotly's qualitative color set
-    phase_colors = {
-        phase: px.colors.qualitative.Set1[i % len(px.colors.qualitative.Set1)]
-        for i, phase in enumerate(phase_durations)
-    }
+    # Build figures for the active tab only; hidden tabs are built when switched to
+    state = build_cached_view(
+        view_key,
+        tab_index,
+        load_data,
+        selected_date,
+        gantt_window,
+        map_viewport,
+        duration_statistic,
+    )
+    rendered_views = {**rendered_views, str(tab_index): view_key}
 
-    # Format data into Gantt chart-friendly structure
-    gantt_data = []
-    for target_id, date_entries in filtered_data.items():
-        for date, phases in date_entries.items():
-            for i, (phase, start_time) in enumerate(phases):
-                # Use next phase's start as this phase's end time, or duplicate start if last
-                end_time = phases[i + 1][1] if i + 1 < len(phases) else start_time
-                gantt_data.append(
-                    {
-                        "Task": phase,
-                        "Start": start_time,
-                        "Finish": end_time,
-                        "Target ID": target_id,
-                    }
-                )
-
-    # Create Plotly graph objects
-    avg_duration_bar = create_avg_duration_bar(avg_durations, phase_colors)
-    phase_count_bar = create_phase_count_bar(phase_counts, phase_colors)
-    gantt_chart = create_gantt_chart(gantt_data, phase_colors)
+    # Send only what changed if the browser shows an older version of the same view
+    patch = None
+    if view_key is not None:
+        patch = build_view_patch(tab_index, old_key, view_key, state, rendered_views)
+    if patch is not None:
+        figures, gantt_traces = patch
+    else:
+        figures, gantt_traces = state["figures"], state.get("trace_count")
+    if tab_index == 1:
+        rendered_views["gantt-traces"] = gantt_traces
 
     # Return updated graphs and dropdown options
-    return dropdown_options, avg_duration_bar, phase_count_bar, gantt_chart
+    return (
+        dropdown_options,
+        figures.get("avg-duration-bar", no_update),
+        figures.get("count-phase-bar", no_update),
+        figures.get("gantt-chart", no_update),
+        figures.get("trajectory-map", no_update),
+        rendered_views,
+    )
+
+
+# ----------------------
+# Callback: Update Target Drill-Down
+# ----------------------
+@app.callback(
+    [
+        Output("target-duration-bar", "figure"),
+        Output("target-count-bar", "figure"),
+        Output("target-timeline", "figure"),
+        Output("target-title", "children"),
+        Output("target-chat", "children"),
+        Output("target-drilldown", "style"),
+        Output("target-view", "data"),
+    ],
+    [
+        Input("selected-target", "data"),
+        Input("date-selector", "value"),
+        # Refreshed along with the other graphs
+        Input("live-update-signal", "data")
+        if UPDATE_MODE == "push"
+        else Input("interval-component", "n_intervals"),
+    ],
+    State("target-view", "data"),
+)
+@instrument_callback("update_target_view")
+def update_target_view(selected_target, selected_date, refresh_signal, rendered_key):
+    if selected_target is None:
+        return no_update, no_update, no_update, "", [], {"display": "none"}, None
+    targets = load_drilldown_source()
+    if targets is None:
+        return no_update, no_update, no_update, "", [], {"display": "none"}, None
+
+    # Chat lines about the target, read from the followed chat log (if any)
+    chat_index = get_chat_index()
+    chat_events = []
+    if chat_index is not None:
+        chat_events = chat_events_for_target(chat_index, selected_target, selected_date)
+    chat_key = f"{len(chat_events)}@{chat_events[-1].timestamp.isoformat()}" if chat_events else 0
+
+    # The target's revision only changes when its events change, so refreshes for other
+    # targets' events (or chat about other tracks) send nothing
+    view_key = (
+        f"{selected_date}|{selected_target}|{targets.target_revision(selected_target)}"
+        f"|{chat_key}"
+    )
+    if view_key == rendered_key:
+        return (no_update,) * 7
+
+    # Read only the target's events from the per-target index
+    with stage_timer("durations"):
+        phase_durations, phase_counts = targets.target_stats(selected_target, selected_date)
+        avg_durations = calculate_average_duration(phase_durations, phase_counts)
+    with stage_timer("gantt_data"):
+        gantt_data = targets.target_timeline(selected_target, selected_date)
+
+    # Same colors as the charts of all targets
+    phase_colors = assign_phase_colors(load_phase_order(selected_date))
+    with stage_timer("figures"):
+        duration_bar = create_avg_duration_bar(avg_durations, phase_colors)
+        count_bar = create_phase_count_bar(phase_counts, phase_colors)
+        timeline = create_gantt_chart(gantt_data, phase_colors)
+        # The layout is a shared template; give this figure its own title
+        timeline["layout"] = {
+            **timeline["layout"],
+            "title": {"text": f"Phases of Target {selected_target}"},
+        }
+    title = f"Target {selected_target}: {sum(phase_counts.values())} completed phases"
+    chat = []
+    if chat_index is not None:
+        chat = [html.H4("Chat")] + [
+            html.Div(f"{event.timestamp:%H:%M:%S} {event.sender}: {event.text}")
+            for event in chat_events
+        ]
+        if not chat_events:
+            chat.append(html.Div("No chat lines mention this target."))
+    return duration_bar, count_bar, timeline, title, chat, {"display": "block"}, view_key
 
 
 # ----------------------
@@ -0,0 +1,144 @@
+// ----------------------
+// Client-Side Callbacks
+// ----------------------
+// Tab cycling and visibility only flip CSS, and the replay clock only does arithmetic, so
+// they run in the browser instead of costing a server round trip. Registered from app.py
+// via ClientsideFunction.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    tabs: {
+        // Advance to the next tab on every interval tick or button click, once the
+        // button has been clicked at least once (before that, stay on the first tab)
+        cycle_tabs: function (n_intervals, n_clicks, current_tab_index, tab_styles) {
+            if (n_clicks === null || n_clicks === undefined) {
+                return window.dash_clientside.no_update;
+            }
+            return (current_tab_index + 1) % tab_styles.length;
+        },
+
+        // Show the active tab with its own style and hide all the others
+        display_tab_content: function (tab_index, tab_styles) {
+            return tab_styles.map(function (style, i) {
+                return i === tab_index ? style : { display: "none" };
+            });
+        },
+    },
+
+    live: {
+        // Subscribe to the server's update stream (push mode only). Each message carries
+        // the data version, which is written to live-update-signal to refresh the graphs.
+        // While the stream is down, bump the signal on the poll interval instead.
+        connect: function (update_mode) {
+            if (update_mode.mode !== "push" || window._liveUpdates) {
+                return window.dash_clientside.no_update;
+            }
+            var state = (window._liveUpdates = { poller: null });
+            // The receive time makes every signal distinct, so each one triggers a refresh
+            var signal = function (version) {
+                window.dash_clientside.set_props("live-update-signal", {
+                    data: { version: version, received: Date.now() },
+                });
+            };
+            var startPolling = function () {
+                if (state.poller === null) {
+                    state.poller = setInterval(function () {
+                        signal(null);
+                    }, update_mode.interval);
+                }
+            };
+
+            if (!window.EventSource) {
+                startPolling();
+                return window.dash_clientside.no_update;
+            }
+            var source = new EventSource(update_mode.url);
+            source.onmessage = function (event) {
+                signal(event.data);
+            };
+            source.onopen = function () {
+                if (state.poller !== null) {
+                    clearInterval(state.poller);
+                    state.poller = null;
+                }
+            };
+            // EventSource reconnects by itself; poll until it does
+            source.onerror = startPolling;
+            return window.dash_clientside.no_update;
+        },
+    },
+
+    drilldown: {
+        // Name the target of a clicked Gantt bar, or clear it when the drill-down is closed.
+        // The level-of-detail chart draws targets as numbered rows labelled by the y-axis
+        // tick text; the express chart's y values are the target IDs themselves.
+        select_target: function (click_data, clear_clicks, figure) {
+            var triggered = window.dash_clientside.callback_context.triggered.map(function (t) {
+                return t.prop_id.split(".")[0];
+            });
+            if (triggered.indexOf("clear-target") !== -1) {
+                return null;
+            }
+            if (!click_data || !click_data.points || !click_data.points.length) {
+                return window.dash_clientside.no_update;
+            }
+            var y = click_data.points[0].y;
+            var yaxis = figure && figure.layout && figure.layout.yaxis;
+            if (typeof y === "number" && yaxis && yaxis.ticktext) {
+                y = yaxis.ticktext[Math.round(y)];
+            }
+            return y === undefined || y === null ? window.dash_clientside.no_update : String(y);
+        },
+    },
+
+    replay: {
+        // Move the replay cursor (epoch seconds). The cursor remembers the wall-clock time
+        // it was last moved at, so each tick advances it by the speed times the real time
+        // elapsed, however late the tick fires. Returns the cursor, the position slider
+        // value, whether the tick interval is disabled, the play button label and the clock.
+        step: function (n_intervals, n_clicks, position, speed_index, bounds, cursor, speeds) {
+            var no_update = window.dash_clientside.no_update;
+            if (!bounds) {
+                return [null, no_update, true, "Play", ""];
+            }
+            var now = Date.now();
+            var triggered = window.dash_clientside.callback_context.triggered.map(function (t) {
+                return t.prop_id.split(".")[0];
+            });
+            // A new selection starts paused at its first event
+            var state =
+                cursor && cursor.key === bounds.key
+                    ? Object.assign({}, cursor)
+                    : { time: bounds.start, playing: false, wall: now, key: bounds.key };
+
+            // Catch up at the speed the replay was playing at, then apply the new controls
+            if (state.playing) {
+                state.time += ((now - state.wall) / 1000) * state.speed;
+            }
+            state.wall = now;
+            state.speed = speeds[speed_index];
+            if (triggered.indexOf("replay-play") !== -1) {
+                // Playing from the end starts over
+                if (!state.playing && state.time >= bounds.end) {
+                    state.time = bounds.start;
+                }
+                state.playing = !state.playing;
+            } else if (triggered.indexOf("replay-position") !== -1 && position !== null) {
+                state.time = position;
+            }
+            state.time = Math.min(Math.max(state.time, bounds.start), bounds.end);
+            if (state.time >= bounds.end) {
+                state.playing = false;
+            }
+
+            var clock =
+                new Date(state.time * 1000).toISOString().slice(0, 19).replace("T", " ") +
+                " UTC (" + state.speed + "x)";
+            return [
+                state,
+                Math.round(state.time),
+                !state.playing,
+                state.playing ? "Pause" : "Play",
+                clock,
+            ];
+        },
+    },
+});
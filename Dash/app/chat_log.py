@@ -0,0 +1,321 @@
+import argparse
+import bisect
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from config import CHAT_LOG_DATE, CHAT_LOG_DRILLDOWN_LINES, CHAT_LOG_PATH
+
+# ----------------------
+# Chat Log Track Index
+# ----------------------
+# Exercise chat logs (April1c2.log) explain why targets change phase:
+#
+#   [10:39:56] Hydro_MSO: Intel, color TN 44642
+#   [10:44:44] Hydro_SL: @AOC CCO_ , tn44834 upgrade ID To hostile, DDG1
+#   [10:41:25] wf_beep: AOC_SIDO: @Hydro c TN44834, working
+#
+# ChatLogTail follows such a file the way `tail -f` does: each poll reads only the bytes
+# appended since the last one, parses the complete lines and adds them to a ChatIndex, an
+# inverted index from track number to the time-ordered chat events that mention it. The
+# Gantt drill-down then shows the chat history of its target without rescanning the file.
+
+ChatEvent = namedtuple("ChatEvent", ["timestamp", "sender", "relayed_for", "text", "tracks"])
+
+# "[HH:MM:SS] Sender: message"
+LINE_PATTERN = re.compile(r"^\[(\d{1,2}):(\d{2}):(\d{2})\]\s*([^:]+?):\s?(.*)$")
+
+# Relayed messages start with the original station: "wf_beep: AOC_SIDO: @Hydro ..."
+RELAY_PATTERN = re.compile(r"^([A-Za-z][\w ]{0,30}?):\s")
+
+# Explicit references: TN 44642, TN44834, tn44834, Tn44833, TNs 44953, 45044, and 78044,
+# trk 44834, tk 44853, track 44833, tracking 44833
+PREFIXED_PATTERN = re.compile(
+    r"\b(?:tns?|trk|tk|track(?:s|ing)?)\s*#?\s*"
+    r"(\d{4,5}(?:\s*(?:,|/|&|and)\s*(?:and\s+)?\d{4,5})*)\b",
+    re.IGNORECASE,
+)
+NUMBER_PATTERN = re.compile(r"\d{4,5}")
+
+# Bare five-digit numbers, as in "44642 is civilian aircraft" or "c, 44846 fishing vessel".
+# Digits that are part of a decimal, a code (1201Z, #E4123) or a longer number do not count.
+BARE_PATTERN = re.compile(r"(?<![\w.#/-])(\d{5})(?![\w.])")
+
+
+# ----------------------
+# Function: Extract Track Numbers
+# ----------------------
+def extract_track_numbers(text):
+    """
+    Finds the track numbers a chat message refers to.
+
+    Args:
+        text (str): Message text (without the time and sender).
+
+    Returns:
+        list of int: Track numbers in order of first mention, without duplicates.
+    """
+    numbers = []
+    for match in PREFIXED_PATTERN.finditer(text):
+        numbers.extend(NUMBER_PATTERN.findall(match.group(1)))
+    numbers.extend(BARE_PATTERN.findall(text))
+    return list(dict.fromkeys(int(number) for number in numbers))
+
+
+# ----------------------
+# Function: Parse Chat Line
+# ----------------------
+def parse_chat_line(line, day):
+    """
+    Parses one log line.
+
+    Args:
+        line (str): Raw line, with or without its trailing newline.
+        day (datetime.date): Date the line's time of day belongs to.
+
+    Returns:
+        ChatEvent or None: The event, or None if the line is not a "[time] sender: text" line.
+    """
+    match = LINE_PATTERN.match(line.rstrip("\r\n"))
+    if match is None:
+        return None
+    hours, minutes, seconds, sender, text = match.groups()
+    relay = RELAY_PATTERN.match(text)
+    return ChatEvent(
+        timestamp=datetime.combine(day, datetime.min.time())
+        + timedelta(hours=int(hours), minutes=int(minutes), seconds=int(seconds)),
+        sender=sender.strip(),
+        relayed_for=relay.group(1).strip() if relay else None,
+        text=text.strip(),
+        tracks=extract_track_numbers(text),
+    )
+
+
+# ----------------------
+# Class: Chat Index
+# ----------------------
+class ChatIndex:
+    """
+    Inverted index from track number to the chat events that mention it.
+
+    Attributes:
+        events (list of ChatEvent): Every parsed event, in file order.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._by_track = {}  # track number -> (sorted timestamps, matching event positions)
+
+    def add(self, event):
+        """
+        Adds one event and indexes it under each track it mentions.
+
+        Args:
+            event (ChatEvent): The parsed event.
+        """
+        position = len(self.events)
+        self.events.append(event)
+        for track in event.tracks:
+            times, positions = self._by_track.setdefault(track, ([], []))
+            # Lines arrive in time order, so this is almost always an append
+            slot = bisect.bisect_right(times, event.timestamp)
+            times.insert(slot, event.timestamp)
+            positions.insert(slot, position)
+
+    def tracks(self):
+        """
+        Returns the track numbers mentioned in the log.
+
+        Returns:
+            list of int: Track numbers, ascending.
+        """
+        return sorted(self._by_track)
+
+    def events_for_track(self, track, start=None, end=None):
+        """
+        Looks up the chat events that mention a track, optionally within a time window.
+
+        Args:
+            track (int or str): Track number, or a target ID made of its digits.
+            start (datetime, optional): Earliest event time (inclusive).
+            end (datetime, optional): Latest event time (exclusive).
+
+        Returns:
+            list of ChatEvent: Matching events in time order.
+        """
+        if isinstance(track, str):
+            if not track.strip().isdigit():
+                return []
+            track = int(track)
+        times, positions = self._by_track.get(track, ([], []))
+        lo = bisect.bisect_left(times, start) if start is not None else 0
+        hi = bisect.bisect_left(times, end) if end is not None else len(times)
+        return [self.events[position] for position in positions[lo:hi]]
+
+
+# ----------------------
+# Class: Chat Log Tail
+# ----------------------
+class ChatLogTail:
+    """
+    Follows a growing chat log and keeps a ChatIndex of it up to date.
+
+    Attributes:
+        path (str): Log file path.
+        index (ChatIndex): Index of every complete line read so far.
+        lines_skipped (int): Lines that were not "[time] sender: text" lines.
+    """
+
+    def __init__(self, path, log_date=None):
+        self.path = path
+        self._start_date = log_date
+        self._reset(None)
+
+    def _reset(self, inode):
+        # (Re)start from the top of the file, e.g. after it was truncated or replaced
+        self.index = ChatIndex()
+        self.lines_skipped = 0
+        self._inode = inode
+        self._offset = 0
+        self._day = self._start_date
+        self._last_time = None
+
+    def poll(self):
+        """
+        Reads and indexes the lines appended since the last poll.
+
+        A trailing line without a newline is left for the next poll, so a line being
+        written is never parsed half-finished.
+
+        Returns:
+            list of ChatEvent: The new events (empty if the file did not grow).
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._reset(stat.st_ino)
+        if self._day is None:
+            # Log lines carry no date; fall back to the day the file was last written
+            self._day = date.fromtimestamp(stat.st_mtime)
+        if stat.st_size == self._offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(stat.st_size - self._offset)
+        complete = chunk.rfind(b"\n") + 1
+        self._offset += complete
+
+        new_events = []
+        for raw in chunk[:complete].splitlines():
+            event = parse_chat_line(raw.decode("utf-8", errors="replace"), self._day)
+            if event is None:
+                self.lines_skipped += 1
+                continue
+            # A time of day well before the previous one means the log passed midnight
+            rolled_over = (
+                self._last_time is not None
+                and event.timestamp < self._last_time - timedelta(hours=12)
+            )
+            if rolled_over:
+                self._day += timedelta(days=1)
+                event = event._replace(timestamp=event.timestamp + timedelta(days=1))
+            self._last_time = event.timestamp
+            self.index.add(event)
+            new_events.append(event)
+        return new_events
+
+
+_tail_cache = {"tail": None}
+_tail_lock = threading.Lock()
+
+
+# ----------------------
+# Function: Get Chat Index
+# ----------------------
+def get_chat_index():
+    """
+    Returns the index of the configured chat log, first reading any lines appended to it.
+
+    Returns:
+        ChatIndex or None: The index, or None if CHAT_LOG_PATH is not set.
+    """
+    if not CHAT_LOG_PATH:
+        return None
+    with _tail_lock:
+        if _tail_cache["tail"] is None:
+            log_date = date.fromisoformat(CHAT_LOG_DATE) if CHAT_LOG_DATE else None
+            _tail_cache["tail"] = ChatLogTail(CHAT_LOG_PATH, log_date)
+        tail = _tail_cache["tail"]
+        tail.poll()
+        return tail.index
+
+
+# ----------------------
+# Function: Chat Events for Target
+# ----------------------
+def chat_events_for_target(index, target_id, selected_date, limit=CHAT_LOG_DRILLDOWN_LINES):
+    """
+    Looks up the latest chat events that mention a target on the selected date.
+
+    Args:
+        index (ChatIndex): Index of the chat log.
+        target_id (str): Target ID, matched when it is a track number.
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+        limit (int): Maximum number of events returned.
+
+    Returns:
+        list of ChatEvent: Up to `limit` of the most recent matching events, in time order.
+    """
+    start = end = None
+    if selected_date != "all":
+        start = datetime.combine(date.fromisoformat(selected_date), datetime.min.time())
+        end = start + timedelta(days=1)
+    events = index.events_for_track(target_id, start, end)
+    return events[-limit:] if limit > 0 else []
+
+
+# ----------------------
+# Function: Main
+# ----------------------
+def main():
+    """
+    Command line entry point: indexes a chat log and prints what it found.
+    """
+    parser = argparse.ArgumentParser(
+        description="Index the track numbers mentioned in an exercise chat log."
+    )
+    parser.add_argument("path", help="chat log to read (April1c2.log layout)")
+    parser.add_argument("--date", help="date of the first line, YYYY-MM-DD (default: file date)")
+    parser.add_argument("--track", type=int, help="print the events that mention this track")
+    parser.add_argument("--follow", action="store_true", help="keep reading new lines")
+    args = parser.parse_args()
+
+    tail = ChatLogTail(args.path, date.fromisoformat(args.date) if args.date else None)
+    tail.poll()
+    if args.track is not None:
+        for event in tail.index.events_for_track(args.track):
+            print(f"{event.timestamp:%Y-%m-%d %H:%M:%S} {event.sender}: {event.text}")
+    else:
+        for track in tail.index.tracks():
+            print(f"{track}: {len(tail.index.events_for_track(track))} events")
+        print(
+            f"{len(tail.index.events)} events, {len(tail.index.tracks())} tracks, "
+            f"{tail.lines_skipped} lines skipped"
+        )
+
+    while args.follow:
+        time.sleep(1)
+        for event in tail.poll():
+            if args.track is None or args.track in event.tracks:
+                tracks = ", ".join(str(track) for track in event.tracks) or "-"
+                print(f"{event.timestamp:%H:%M:%S} [{tracks}] {event.sender}: {event.text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+
+# ----------------------
+# Database Connection Settings
+# ----------------------
+# Every setting can be overridden with an environment variable of the same name, so a
+# local Postgres can stand in for the docker-compose one (e.g. DB_HOST=localhost).
+DB_HOST = os.environ.get("DB_HOST", "postgres")  # Container name or hostname of the server
+DB_PORT = int(os.environ.get("DB_PORT", "5432"))  # Default PostgreSQL port
+DB_NAME = os.environ.get("DB_NAME", "data")  # Database name
+DB_USER = os.environ.get("DB_USER", "admin")  # Username for authentication
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "admin")  # Password for authentication
+
+# ----------------------
+# Connection Pool Settings
+# ----------------------
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))  # Connections opened up front
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "5"))  # Hard cap on open connections
+# Seconds a caller waits for a free pooled connection before giving up
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# Connections idle for longer than this (seconds) are checked with SELECT 1 before reuse
+DB_POOL_HEALTHCHECK_AFTER = float(os.environ.get("DB_POOL_HEALTHCHECK_AFTER", "30"))
+DB_CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", "5"))  # Seconds
+DB_STATEMENT_TIMEOUT = int(os.environ.get("DB_STATEMENT_TIMEOUT", "30000"))  # Milliseconds
+
+# ----------------------
+# Fetch Settings
+# ----------------------
+# Rows pulled from the server-side cursor per round trip
+DB_FETCH_BATCH_SIZE = int(os.environ.get("DB_FETCH_BATCH_SIZE", "5000"))
+# Seconds between full resyncs of the in-process snapshot
+FULL_RESYNC_INTERVAL = int(os.environ.get("FULL_RESYNC_INTERVAL", str(10 * 60)))
+
+# ----------------------
+# Partitioning Settings
+# ----------------------
+# Days ahead of today for which empty daily partitions of `data` are created in advance
+PARTITION_PREMAKE_DAYS = int(os.environ.get("PARTITION_PREMAKE_DAYS", "7"))
+# Daily partitions older than this many days are dropped; 0 keeps every partition
+PARTITION_RETENTION_DAYS = int(os.environ.get("PARTITION_RETENTION_DAYS", "0"))
+# Seconds between partition maintenance runs in the app; 0 leaves it to partitions.py (cron)
+PARTITION_MAINTENANCE_INTERVAL = float(os.environ.get("PARTITION_MAINTENANCE_INTERVAL", "3600"))
+
+# ----------------------
+# Aggregation Settings
+# ----------------------
+# "python": fetch raw rows and aggregate in data_processing
+# "sql": let Postgres compute durations, counts and Gantt intervals with window functions
+AGGREGATION_MODE = os.environ.get("AGGREGATION_MODE", "python")
+# "vectorized": columnar NumPy/pandas engine (vectorized_processing)
+# "reference": the original pure-Python implementation (data_processing)
+PROCESSING_ENGINE = os.environ.get("PROCESSING_ENGINE", "vectorized")
+
+# ----------------------
+# Serving Settings
+# ----------------------
+# "single": each server process queries Postgres itself
+# "shared": workers read the memory-mapped snapshot written by snapshot_refresher.py
+SERVING_MODE = os.environ.get("SERVING_MODE", "single")
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "/tmp/phase_snapshot")
+# Seconds between refresher polls of the database
+SNAPSHOT_REFRESH_INTERVAL = float(os.environ.get("SNAPSHOT_REFRESH_INTERVAL", "15"))
+
+# ----------------------
+# Live Update Settings
+# ----------------------
+# "poll": every browser re-runs the dashboard callback on a timer
+# "push": Postgres NOTIFY wakes one listener per server process, which tells browsers to
+#         refresh over server-sent events
+UPDATE_MODE = os.environ.get("UPDATE_MODE", "poll")
+NOTIFY_CHANNEL = os.environ.get("NOTIFY_CHANNEL", "data_changed")
+# Seconds to wait for further notifications before refreshing, so bulk loads refresh once
+NOTIFY_DEBOUNCE = float(os.environ.get("NOTIFY_DEBOUNCE", "0.2"))
+# Seconds without a notification after which the listener refreshes anyway (safety net)
+PUSH_FALLBACK_INTERVAL = float(os.environ.get("PUSH_FALLBACK_INTERVAL", "300"))
+
+# ----------------------
+# Gantt Rendering Settings
+# ----------------------
+# "lod": level-of-detail renderer (gantt_lod), "express": the original px.timeline chart
+GANTT_RENDERER = os.environ.get("GANTT_RENDERER", "lod")
+# Upper limit on bars sent to the browser per render; the shortest are dropped first
+GANTT_MAX_BARS = int(os.environ.get("GANTT_MAX_BARS", "10000"))
+# Approximate drawable size of the Gantt plot, used to decide what is narrower than a pixel
+GANTT_PLOT_WIDTH_PX = int(os.environ.get("GANTT_PLOT_WIDTH_PX", "1500"))
+GANTT_PLOT_HEIGHT_PX = int(os.environ.get("GANTT_PLOT_HEIGHT_PX", "450"))
+# Draw bars with WebGL (Scattergl) instead of SVG
+GANTT_USE_WEBGL = os.environ.get("GANTT_USE_WEBGL", "1") == "1"
+# Traces a Gantt chart may grow to through incremental updates before it is re-sent whole
+GANTT_MAX_TRACES = int(os.environ.get("GANTT_MAX_TRACES", "60"))
+
+# ----------------------
+# Track Data Settings
+# ----------------------
+# Columnar track store built from a bc3data.csv-style export by track_store.py
+TRACK_STORE_DIR = os.environ.get("TRACK_STORE_DIR", "/tmp/track_store")
+
+# ----------------------
+# Trajectory Map Settings
+# ----------------------
+# Side length (degrees) of the spatial grid cells used to find points in a map viewport
+TRAJECTORY_GRID_DEG = float(os.environ.get("TRAJECTORY_GRID_DEG", "0.25"))
+# Approximate drawable width of the trajectory map, used to size the simplification step
+TRAJECTORY_PLOT_WIDTH_PX = int(os.environ.get("TRAJECTORY_PLOT_WIDTH_PX", "1500"))
+# Douglas-Peucker tolerance in screen pixels; larger values send fewer points per track
+TRAJECTORY_TOLERANCE_PX = float(os.environ.get("TRAJECTORY_TOLERANCE_PX", "1.0"))
+
+# ----------------------
+# Chat Log Settings
+# ----------------------
+# Exercise chat log (April1c2.log layout) to index for track-number references; empty disables it
+CHAT_LOG_PATH = os.environ.get("CHAT_LOG_PATH", "")
+# Date of the first line, since log lines only carry a time of day (defaults to the file's date)
+CHAT_LOG_DATE = os.environ.get("CHAT_LOG_DATE", "")
+# Most recent chat lines about the selected target shown in the Gantt drill-down
+CHAT_LOG_DRILLDOWN_LINES = int(os.environ.get("CHAT_LOG_DRILLDOWN_LINES", "20"))
+
+# ----------------------
+# Instrumentation Settings
+# ----------------------
+# Serve stage timings and payload sizes on a Prometheus-style /metrics route
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+# Profile every dashboard callback with cProfile and keep the traces of slow ones
+PROFILE_CALLBACKS = os.environ.get("PROFILE_CALLBACKS", "0") == "1"
+# Callbacks taking at least this many seconds have their profile written to PROFILE_DIR
+PROFILE_SLOW_SECONDS = float(os.environ.get("PROFILE_SLOW_SECONDS", "1.0"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/dashboard_profiles")
+
+# ----------------------
+# Response Encoding Settings
+# ----------------------
+# JSON encoder for callback responses: "orjson", "json" (standard library) or "auto"
+# (orjson when it is installed)
+JSON_ENGINE = os.environ.get("JSON_ENGINE", "auto")
+# Compress JSON, JavaScript and text responses for browsers that accept gzip or brotli
+COMPRESS_RESPONSES = os.environ.get("COMPRESS_RESPONSES", "1") == "1"
+# Responses smaller than this are sent as they are; compressing them gains nothing
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+# gzip level (1-9) and brotli quality (0-11); low values keep the server CPU per tick small
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4"))
+
+# ----------------------
+# Replay Settings
+# ----------------------
+# Events between checkpoints of the replay statistics; seeking backwards restores the
+# nearest checkpoint and replays at most this many events
+REPLAY_CHECKPOINT_EVENTS = int(os.environ.get("REPLAY_CHECKPOINT_EVENTS", "5000"))
+# Milliseconds between replay cursor steps in the browser
+REPLAY_TICK_INTERVAL = int(os.environ.get("REPLAY_TICK_INTERVAL", "1000"))
+# Replay engines (one per data version and date) kept per process
+REPLAY_CACHE_SIZE = int(os.environ.get("REPLAY_CACHE_SIZE", "4"))
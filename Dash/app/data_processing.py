@@ -1,5 +1,8 @@
 from datetime import datetime
 
+from event_store import EventStore
+from quantile_sketch import TDigest
+
 # ----------------------
 # Function: Process Data
 # ----------------------
@@ -8,12 +11,16 @@ def process_data(data, selected_date):
     Organizes raw phase data by target ID and date.
 
     Args:
-        data (list of tuples): Each tuple contains (target_id, phase_timestamp, phase).
+        data (list of tuples or EventStore): Each tuple contains (target_id, phase_timestamp, phase).
         selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
 
     Returns:
         dict: Nested dictionary in the form {target_id: {date: [(phase, timestamp), ...]}}.
     """
+    # The event store is already partitioned by date and target, so no scan is needed
+    if isinstance(data, EventStore):
+        return data.organize(selected_date)
+
     # Dictionary to store the processed data (organized by target ID and date)
     organized_data = {}
 
@@ -84,6 +91,32 @@ def calculate_phase_durations_and_counts(organized_data):
     return phase_durations, phase_counts
 
 
+# ----------------------
+# Function: Calculate Phase Sketches
+# ----------------------
+def calculate_phase_sketches(organized_data):
+    """
+    Summarizes the distribution of each phase's durations as a mergeable quantile sketch.
+
+    Args:
+        organized_data (dict): The output from `process_data`, containing organized phase data.
+
+    Returns:
+        dict: {phase: TDigest} of durations in seconds, for `calculate_duration_statistic`.
+    """
+    # Collect every duration of each phase, exactly as calculate_phase_durations_and_counts sums them
+    phase_values = {}
+    for date_entries in organized_data.values():
+        for phases in date_entries.values():
+            for (current_phase, start_time), (_, end_time) in zip(phases, phases[1:]):
+                phase_values.setdefault(current_phase, []).append(
+                    (end_time - start_time).total_seconds()
+                )
+
+    # Sketch each phase's durations in one batch
+    return {phase: TDigest.from_values(values) for phase, values in phase_values.items()}
+
+
 # ----------------------
 # Function: Calculate Average Duration
 # ----------------------
@@ -112,3 +145,33 @@ def calculate_average_duration(phase_durations, phase_counts):
 
     # Return the dictionary of average durations
     return average_durations
+
+
+# ----------------------
+# Function: Build Gantt Data
+# ----------------------
+def build_gantt_data(organized_data):
+    """
+    Formats organized phase data into Gantt chart rows.
+
+    Args:
+        organized_data (dict): The output from `process_data`, containing organized phase data.
+
+    Returns:
+        list of dict: Rows with 'Task', 'Start', 'Finish' and 'Target ID' for `create_gantt_chart`.
+    """
+    gantt_data = []
+    for target_id, date_entries in organized_data.items():
+        for date, phases in date_entries.items():
+            for i, (phase, start_time) in enumerate(phases):
+                # Use next phase's start as this phase's end time, or duplicate start if last
+                end_time = phases[i + 1][1] if i + 1 < len(phases) else start_time
+                gantt_data.append(
+                    {
+                        "Task": phase,
+                        "Start": start_time,
+                        "Finish": end_time,
+                        "Target ID": target_id,
+                    }
+                )
+    return gantt_data
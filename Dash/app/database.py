@@ -1,82 +1,1196 @@
+import bisect
+import itertools
+import json
+import threading
+import time
+from collections import namedtuple
+from collections.abc import Sequence
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import pool
+
+from config import (
+    DB_HOST,
+    DB_PORT,
+    DB_NAME,
+    DB_USER,
+    DB_PASSWORD,
+    DB_POOL_MIN,
+    DB_POOL_MAX,
+    DB_POOL_TIMEOUT,
+    DB_POOL_HEALTHCHECK_AFTER,
+    DB_CONNECT_TIMEOUT,
+    DB_STATEMENT_TIMEOUT,
+    DB_FETCH_BATCH_SIZE,
+    FULL_RESYNC_INTERVAL,
+)
+from event_store import EventStore
+from metrics import ROWS_FETCHED, STAGE_SECONDS, stage_timer
+from quantile_sketch import TDigest, merge_phase_sketches
+
+# Queries shared by the full and incremental fetches
+# target_id and phase break ties between identical timestamps
+FETCH_ALL_ROWS_QUERY = """
+    SELECT target_id, phase_timestamp, phase
+    FROM data
+    ORDER BY phase_timestamp, target_id, phase
+"""
+# The row comparison keeps rows with an identical timestamp but a later tie-breaker. The
+# plain range condition on phase_timestamp repeats it in a form the planner can use for
+# partition pruning (row comparisons are not used to prune), so a daily-partitioned table
+# only opens the newest partitions.
+FETCH_NEW_ROWS_QUERY = """
+    SELECT target_id, phase_timestamp, phase
+    FROM data
+    WHERE phase_timestamp >= %s
+      AND (phase_timestamp, target_id, phase) > (%s, %s, %s)
+    ORDER BY phase_timestamp, target_id, phase
+"""
+# Only used in SQL aggregation mode; otherwise dates come from the event store's partitions
+UNIQUE_DATES_QUERY = """
+    SELECT DISTINCT DATE(phase_timestamp)
+    FROM data
+    ORDER BY DATE(phase_timestamp)
+"""
+# The same for the daily-partitioned table (see partitions.py), without reading every row:
+# each step probes the phase_timestamp index for the first row of the next day, and that
+# probe is pruned to the partitions from that day on
+PARTITIONED_DATES_QUERY = """
+    WITH RECURSIVE days(day) AS (
+        SELECT MIN(phase_timestamp)::date FROM data
+        UNION ALL
+        SELECT (SELECT MIN(phase_timestamp)::date FROM data WHERE phase_timestamp >= day + 1)
+        FROM days
+        WHERE day IS NOT NULL
+    )
+    SELECT day FROM days WHERE day IS NOT NULL
+"""
+
+# ----------------------
+# In-Process Snapshot
+# ----------------------
+# Rows already fetched from the database are kept here so that each tick only has to
+# ask Postgres for rows newer than the high-water mark. The watermark is the sort key
+# (phase_timestamp, target_id, phase) of the newest row, so rows sharing an identical
+# timestamp are still ordered deterministically and none are fetched twice.
+#
+# A snapshot is never changed once published: each fetch that finds new rows builds the
+# next Snapshot (sharing what it can with the previous one) and replaces `_snapshot`, so a
+# caller holding a snapshot keeps a consistent version, rows and event store.
+
+
+# ----------------------
+# Class: Row Log
+# ----------------------
+class RowLog(Sequence):
+    """
+    Immutable, time-ordered sequence of fetched rows, stored as a few chunks.
+
+    `appended` returns a new log that shares the existing chunks instead of copying every
+    row. Chunks are merged so that their sizes keep decreasing, which keeps the number of
+    chunks logarithmic and copies each row only a logarithmic number of times overall.
+    """
+
+    def __init__(self, chunks=()):
+        self._chunks = tuple(chunk for chunk in chunks if chunk)  # Lists, never modified
+        self._ends = list(itertools.accumulate(len(chunk) for chunk in self._chunks))
+
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._chunks)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self)[index]
+            rows = []
+            chunk = bisect.bisect_right(self._ends, start)
+            while start < stop:
+                offset = self._ends[chunk] - len(self._chunks[chunk])
+                end = min(stop, self._ends[chunk])
+                rows.extend(self._chunks[chunk][start - offset : end - offset])
+                start, chunk = end, chunk + 1
+            return rows
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("RowLog index out of range")
+        chunk = bisect.bisect_right(self._ends, index)
+        return self._chunks[chunk][index - (self._ends[chunk] - len(self._chunks[chunk]))]
+
+    def appended(self, rows):
+        """
+        Returns a new log with rows added at the end, leaving this one unchanged.
+
+        Args:
+            rows (list of tuples): Rows ordered after this log's last row. The list is
+                taken over by the log and must not be modified afterwards.
+
+        Returns:
+            RowLog: The longer log.
+        """
+        chunks = list(self._chunks) + [rows]
+        while len(chunks) > 1 and len(chunks[-1]) >= len(chunks[-2]):
+            newest = chunks.pop()
+            chunks[-1] = chunks[-1] + newest
+        return RowLog(chunks)
+
+
+Snapshot = namedtuple(
+    "Snapshot",
+    [
+        "rows",  # RowLog of all rows fetched so far, ordered by the watermark key
+        "watermark",  # Sort key of the newest row in the snapshot (None = empty)
+        "last_full_sync",  # time.monotonic() of the last full fetch (None = never)
+        "version",  # Incremented whenever the rows change
+        "events",  # EventStore of the same rows, partitioned by date and target
+    ],
+)
+_snapshot = Snapshot(
+    rows=RowLog(), watermark=None, last_full_sync=None, version=0, events=EventStore()
+)
+_fetch_lock = threading.Lock()  # One fetch at a time; only fetches publish snapshots
+
+# ----------------------
+# Connection Pool
+# ----------------------
+# One bounded pool per process. The semaphore makes callers wait (up to DB_POOL_TIMEOUT)
+# for a free connection instead of failing as soon as DB_POOL_MAX are checked out.
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_last_used = {}  # id(connection) -> time.monotonic() it was last returned to the pool
+
+
+# ----------------------
+# Function: Get Connection Pool
+# ----------------------
+def _get_pool():
+    """
+    Creates the process-wide connection pool on first use.
+
+    Returns:
+        psycopg2.pool.ThreadedConnectionPool: The shared connection pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = pool.ThreadedConnectionPool(
+                DB_POOL_MIN,
+                DB_POOL_MAX,
+                host=DB_HOST,
+                port=DB_PORT,
+                dbname=DB_NAME,
+                user=DB_USER,
+                password=DB_PASSWORD,
+                connect_timeout=DB_CONNECT_TIMEOUT,
+                options=f"-c statement_timeout={DB_STATEMENT_TIMEOUT}",
+            )
+        return _pool
+
+
+# ----------------------
+# Function: Check Connection Health
+# ----------------------
+def _is_healthy(conn):
+    """
+    Checks that a pooled connection is still usable before handing it out.
+
+    Connections that were used recently are trusted; ones that sat idle for longer than
+    DB_POOL_HEALTHCHECK_AFTER seconds are probed with a cheap SELECT 1, since the server
+    or a firewall may have dropped them in the meantime.
+
+    Args:
+        conn (psycopg2.extensions.connection): Connection taken from the pool.
+
+    Returns:
+        bool: True if the connection can be used.
+    """
+    if conn.closed:
+        return False
+    last_used = _last_used.get(id(conn))
+    if last_used is not None and time.monotonic() - last_used < DB_POOL_HEALTHCHECK_AFTER:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+# ----------------------
+# Function: Borrow a Pooled Connection
+# ----------------------
+@contextmanager
+def pooled_connection():
+    """
+    Borrows a healthy connection from the pool for the duration of a `with` block.
+
+    The transaction is rolled back when the block exits (callers that write must commit
+    themselves), and connections left broken by an error are discarded instead of being
+    returned to the pool.
+
+    Yields:
+        psycopg2.extensions.connection: An open database connection.
+
+    Raises:
+        psycopg2.pool.PoolError: If no connection frees up within DB_POOL_TIMEOUT seconds.
+    """
+    # Waiting for a free slot counts as connecting, as does replacing stale connections
+    start = time.perf_counter()
+    if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise pool.PoolError(
+            f"No database connection available after {DB_POOL_TIMEOUT} seconds"
+        )
+    try:
+        db_pool = _get_pool()
+        conn = db_pool.getconn()
+        # Replace connections that have gone stale while idle in the pool
+        while not _is_healthy(conn):
+            _last_used.pop(id(conn), None)
+            db_pool.putconn(conn, close=True)
+            conn = db_pool.getconn()
+        STAGE_SECONDS.observe(time.perf_counter() - start, "db_connect")
+
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if not broken and not conn.closed:
+                try:
+                    conn.rollback()  # End any open transaction (and server-side cursors)
+                except psycopg2.Error:
+                    broken = True
+            if broken or conn.closed:
+                _last_used.pop(id(conn), None)
+                db_pool.putconn(conn, close=True)
+            else:
+                _last_used[id(conn)] = time.monotonic()
+                db_pool.putconn(conn)
+    finally:
+        _pool_slots.release()
+
+
+# ----------------------
+# Function: Open Server-Side Cursor
+# ----------------------
+def _open_rows_cursor(cur, rows_query, params=None, cursor_name="phase_rows"):
+    """
+    Opens a named server-side cursor over `rows_query`, to be streamed with FETCH.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Cursor on a connection inside a transaction.
+        rows_query (str): SELECT returning (target_id, phase_timestamp, phase) rows.
+        params (tuple, optional): Parameters for `rows_query`.
+        cursor_name (str): Name of the server-side cursor to declare.
+    """
+    with stage_timer("db_query"):
+        cur.execute(f"DECLARE {cursor_name} NO SCROLL CURSOR FOR {rows_query}", params)
+
+
+# ----------------------
+# Function: Stream Batches from a Server-Side Cursor
+# ----------------------
+def _iter_batches(cur, cursor_name="phase_rows", batch_size=DB_FETCH_BATCH_SIZE):
+    """
+    Streams rows from a declared server-side cursor in fixed-size batches.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Cursor on the connection that declared `cursor_name`.
+        cursor_name (str): Name of the server-side cursor to read from.
+        batch_size (int): Number of rows fetched per round trip.
+
+    Yields:
+        list of tuples: The next batch of (target_id, phase_timestamp, phase) rows.
+    """
+    while True:
+        cur.execute(f"FETCH FORWARD {int(batch_size)} FROM {cursor_name}")
+        batch = cur.fetchall()
+        if not batch:
+            break
+        yield batch
+    cur.execute(f"CLOSE {cursor_name}")
+
+
+# ----------------------
+# Function: Stream All Phase Rows
+# ----------------------
+def iter_phase_rows(batch_size=DB_FETCH_BATCH_SIZE):
+    """
+    Streams every row of the data table in timestamp order without materializing it.
+
+    Args:
+        batch_size (int): Number of rows fetched per round trip.
+
+    Yields:
+        list of tuples: Batches of (target_id, phase_timestamp, phase) rows.
+    """
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            _open_rows_cursor(cur, FETCH_ALL_ROWS_QUERY)
+            yield from _iter_batches(cur, batch_size=batch_size)
+
+
+# ----------------------
+# Function: Get Snapshot
+# ----------------------
+def get_snapshot():
+    """
+    Returns the current in-process snapshot.
+
+    Read the version, rows and event store of one view from the same snapshot: a fetch
+    publishes a new one and never changes a snapshot that was handed out.
+
+    Returns:
+        Snapshot: The published snapshot (empty before the first fetch).
+    """
+    return _snapshot
+
+
+# ----------------------
+# Function: Get Snapshot Version
+# ----------------------
+def get_snapshot_version():
+    """
+    Returns the version of the in-process snapshot, which changes whenever its rows change.
+
+    Returns:
+        int: Snapshot version counter (0 before the first fetch).
+    """
+    return _snapshot.version
+
+
+# ----------------------
+# Function: Get Event Store
+# ----------------------
+def get_event_store():
+    """
+    Returns the in-process snapshot as a date- and target-partitioned event store.
+
+    Returns:
+        EventStore: Events fetched so far (empty before the first fetch).
+    """
+    return _snapshot.events
+
+
+# ----------------------
+# Function: Get Cached Data
+# ----------------------
+def get_cached_data():
+    """
+    Returns the in-process snapshot without querying the database.
+
+    Used in push update mode, where the change listener keeps the snapshot current and
+    callbacks only read it. Falls back to a fetch if the snapshot was never filled.
+
+    Returns:
+        tuple: (data, available_dates), as returned by `get_data_from_db`.
+    """
+    snapshot = _snapshot
+    if snapshot.last_full_sync is None:
+        return get_data_from_db()
+    return snapshot.rows, snapshot.events.dates()
+
+
+# ----------------------
+# Function: Stream a Full Resync
+# ----------------------
+def _stream_full_resync(batches, old_rows):
+    """
+    Reads a full copy of the table, keeping only what differs from the current snapshot.
+
+    While the fetched rows repeat the snapshot's rows in order, nothing is stored (the
+    snapshot's rows and event store stay in use), and rows past its end are collected as
+    new. At the first difference (a late, changed or deleted row) a new event store is
+    started from the matching rows, and every later batch is fed into it as it arrives.
+    So a resync that finds nothing unusual holds no second copy of the data.
+
+    Args:
+        batches (iterable of lists): Row batches from `_iter_batches`.
+        old_rows (RowLog or list of tuples): Rows of the current snapshot.
+
+    Returns:
+        tuple: (rows, events, appended, fetched). rows and events are the new snapshot
+        rows and EventStore if the table no longer starts with the snapshot's rows, else
+        None; appended holds the rows found after the snapshot's last row; fetched is the
+        number of rows read.
+    """
+    matched = 0  # Leading fetched rows equal to the snapshot's
+    appended = []
+    rows = events = None
+    fetched = 0
+    for batch in batches:
+        fetched += len(batch)
+        if rows is None:
+            end = matched + len(batch)
+            if not appended and batch == old_rows[matched:end]:
+                matched = end  # The whole batch repeats the snapshot
+                continue
+            i = 0
+            while (
+                not appended
+                and i < len(batch)
+                and matched < len(old_rows)
+                and batch[i] == old_rows[matched]
+            ):
+                i += 1
+                matched += 1
+            if matched == len(old_rows):
+                appended.extend(batch[i:])  # Past the end of the snapshot: new rows
+                continue
+            # The table differs from the snapshot: rebuild from the rows that matched
+            rows = old_rows[:matched]
+            events = EventStore(rows)
+            batch = batch[i:]
+        rows.extend(batch)
+        events.add_rows(batch)
+    if rows is None and matched < len(old_rows):
+        # Rows were deleted from the end of the table
+        rows = old_rows[:matched]
+        events = EventStore(rows)
+    return rows, events, appended, fetched
+
 
 # ----------------------
 # Function: Get Data from Database
 # ----------------------
-def get_data_from_db():
+def get_data_from_db(incremental=True):
     """
-    Connects to a PostgreSQL database, fetches all phase data, and retrieves available unique dates.
+    Returns all phase data and the available unique dates, fetching only new rows when possible.
+
+    In incremental mode only rows newer than the snapshot's high-water mark are fetched and
+    appended to the in-process snapshot. Every FULL_RESYNC_INTERVAL seconds (or when
+    `incremental` is False) the whole table is re-read instead, which picks up rows that
+    arrived late (older than the watermark) or were deleted. Rows are streamed from a
+    server-side cursor in DB_FETCH_BATCH_SIZE batches over a pooled connection.
+
+    Callbacks are never blocked by the network: they read the published snapshot, while
+    one fetch at a time builds the next snapshot and publishes it at the end. New rows are
+    appended to a RowLog and an extended EventStore that share the previous snapshot's
+    data, so an incremental refresh costs O(new rows), not O(all rows).
+
+    Args:
+        incremental (bool): Fetch only rows newer than the watermark. False forces a full resync.
 
     Returns:
         tuple:
-            - data (list of tuples): All records in the form (target_id, phase_timestamp, phase),
-              ordered by timestamp.
+            - data (RowLog): All records in the form (target_id, phase_timestamp, phase),
+              ordered by timestamp. The same object is returned while no rows change.
             - available_dates (list of str): List of unique dates (YYYY-MM-DD) as strings, used for filtering.
     """
+    global _snapshot
+    with _fetch_lock:
+        try:
+            # Only fetches publish snapshots, and they hold _fetch_lock
+            old = _snapshot
+
+            # Decide whether this call can be served by a delta or needs a full resync
+            full_resync = (
+                not incremental
+                or old.last_full_sync is None
+                or old.watermark is None
+                or time.monotonic() - old.last_full_sync >= FULL_RESYNC_INTERVAL
+            )
+
+            new_rows = new_events = None
+            with pooled_connection() as conn:
+                with conn.cursor() as cur:
+                    if full_resync:
+                        _open_rows_cursor(cur, FETCH_ALL_ROWS_QUERY)
+                    else:
+                        _open_rows_cursor(
+                            cur, FETCH_NEW_ROWS_QUERY, (old.watermark[0],) + old.watermark
+                        )
+                    with stage_timer("db_fetch"):
+                        if full_resync:
+                            new_rows, new_events, appended, fetched = _stream_full_resync(
+                                _iter_batches(cur), old.rows
+                            )
+                        else:
+                            # Only rows past the watermark, normally a handful
+                            appended = [row for batch in _iter_batches(cur) for row in batch]
+                            fetched = len(appended)
+                    ROWS_FETCHED.observe(fetched)
+
+            if full_resync:
+                print(f"Full resync: fetched {fetched} rows from the database.")
+            elif appended:
+                print(f"Fetched {len(appended)} new rows from the database.")
+
+            # Only publish the new snapshot once every query has succeeded
+            if new_rows is not None:
+                # A resync found removed or back-filled rows: use the re-partitioned store
+                rows, events = RowLog([new_rows]), new_events
+            elif appended:
+                # Share the old rows and events; snapshots already handed out stay unchanged
+                rows, events = old.rows.appended(appended), old.events.extended(appended)
+            else:
+                rows, events = old.rows, old.events  # Nothing new, keep the same objects
+            watermark = None
+            if rows:
+                target_id, phase_timestamp, phase = rows[-1]
+                watermark = (phase_timestamp, target_id, phase)
+            _snapshot = Snapshot(
+                rows=rows,
+                watermark=watermark,
+                last_full_sync=time.monotonic() if full_resync else old.last_full_sync,
+                version=old.version + (rows is not old.rows),
+                events=events,
+            )
+
+            # Return the snapshot rows and the list of available dates (the event store's
+            # partition keys; no DISTINCT query needed)
+            return rows, events.dates()
+
+        except Exception as e:
+            # If an exception occurs during the process, catch it and print a user-friendly error message
+            print(f"Error connecting to the database: {e}")
+            # Return empty lists in case of an error to ensure the function doesn't break other code
+            return [], []
+
+
+# ----------------------
+# SQL Aggregation Mode
+# ----------------------
+# Supports the window functions below: rows of one target are read in timestamp order
+# straight from the index instead of being sorted per partition.
+AGGREGATION_INDEX_DDL = """
+    CREATE INDEX IF NOT EXISTS data_target_id_phase_timestamp_idx
+    ON data (target_id, phase_timestamp)
+"""
+
+# Each phase lasts until the next phase of the same target on the same day, which is
+# what calculate_phase_durations_and_counts derives from consecutive pairs in Python
+PHASE_TRANSITIONS_CTE = """
+    WITH transitions AS (
+        SELECT
+            target_id,
+            phase,
+            phase_timestamp,
+            LEAD(phase_timestamp) OVER (
+                PARTITION BY target_id, DATE(phase_timestamp)
+                ORDER BY phase_timestamp, phase
+            ) AS next_timestamp
+        FROM data
+        {where_clause}
+    )
+"""
+GANTT_INTERVALS_QUERY = (
+    PHASE_TRANSITIONS_CTE
+    + """
+    SELECT phase, phase_timestamp, COALESCE(next_timestamp, phase_timestamp), target_id
+    FROM transitions
+    ORDER BY target_id, phase_timestamp, phase
+"""
+)
+
+# Daily rollups: per-day, per-phase totals for days that are closed (every day before the
+# newest day in the data). Statistics sum the rollups and compute only the days after the
+# last rolled-up day from raw rows, so "All Data" never re-derives old history. A day's
+# phases end at midnight (see PHASE_TRANSITIONS_CTE), so late rows only affect their own
+# day, which `reroll_days` recomputes.
+DAILY_ROLLUP_DDL = """
+    CREATE TABLE IF NOT EXISTS phase_daily_rollup (
+        day date NOT NULL,
+        phase text NOT NULL,
+        sum_seconds double precision NOT NULL,
+        phase_count bigint NOT NULL,
+        first_seen timestamp without time zone NOT NULL,
+        PRIMARY KEY (day, phase)
+    )
+"""
+# First day not covered by the rollups
+ROLLUP_LIVE_FROM = "(SELECT COALESCE(MAX(day) + 1, '-infinity'::date) FROM phase_daily_rollup)"
+ROLLUP_INSERT = """
+    INSERT INTO phase_daily_rollup (day, phase, sum_seconds, phase_count, first_seen)
+    SELECT
+        DATE(phase_timestamp),
+        phase,
+        SUM(EXTRACT(EPOCH FROM next_timestamp - phase_timestamp)),
+        COUNT(*),
+        MIN(phase_timestamp)
+    FROM transitions
+    WHERE next_timestamp IS NOT NULL
+    GROUP BY DATE(phase_timestamp), phase
+    ON CONFLICT (day, phase) DO NOTHING
+"""
+# Rolls up every closed day that is not rolled up yet (an empty index range when current)
+ROLL_UP_CLOSED_DAYS_QUERY = (
+    PHASE_TRANSITIONS_CTE.format(
+        where_clause=f"""
+        WHERE phase_timestamp >= {ROLLUP_LIVE_FROM}
+          AND phase_timestamp < (SELECT MAX(phase_timestamp)::date FROM data)
+        """
+    )
+    + ROLLUP_INSERT
+)
+ROLLUP_STATS_QUERY = (
+    PHASE_TRANSITIONS_CTE.format(
+        where_clause=f"""
+        WHERE phase_timestamp >= GREATEST({ROLLUP_LIVE_FROM}, %s::date)
+          AND phase_timestamp < %s::date + 1
+        """
+    )
+    + """
+    , combined AS (
+        SELECT phase, sum_seconds, phase_count, first_seen
+        FROM phase_daily_rollup
+        WHERE day >= %s::date AND day <= %s::date
+        UNION ALL
+        SELECT phase, EXTRACT(EPOCH FROM next_timestamp - phase_timestamp), 1, phase_timestamp
+        FROM transitions
+        WHERE next_timestamp IS NOT NULL
+    )
+    SELECT
+        phase,
+        SUM(sum_seconds) AS sum_seconds,
+        SUM(phase_count) AS phase_count,
+        SUM(sum_seconds) / SUM(phase_count) / 60 AS avg_minutes
+    FROM combined
+    GROUP BY phase
+    ORDER BY MIN(first_seen)
+"""
+)
+
+# Late rows written by anything other than ingest.py (the live writer, a manual INSERT or
+# DELETE) would leave the rollups of their closed day stale. A statement-level trigger on
+# `data` records the closed days a statement touched in phase_dirty_days, from its
+# transition tables so a COPY of a million rows costs one trigger call; readers re-roll
+# those days before using the rollups. Rows of days after the last rolled-up day are not
+# recorded: those days are still computed from raw rows.
+DIRTY_DAYS_DDL = """
+    CREATE TABLE IF NOT EXISTS phase_dirty_days (
+        day date PRIMARY KEY
+    )
+"""
+DIRTY_DAYS_FUNCTION_DDL = """
+    CREATE OR REPLACE FUNCTION mark_rolled_up_days_dirty() RETURNS trigger AS $$
+    DECLARE
+        rolled_until date;
+    BEGIN
+        SELECT MAX(day) INTO rolled_until FROM phase_daily_rollup;
+        IF rolled_until IS NULL THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO phase_dirty_days (day)
+            SELECT DISTINCT DATE(phase_timestamp) FROM new_rows
+            WHERE phase_timestamp < rolled_until + 1
+            ON CONFLICT DO NOTHING;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            INSERT INTO phase_dirty_days (day)
+            SELECT DISTINCT DATE(phase_timestamp) FROM old_rows
+            WHERE phase_timestamp < rolled_until + 1
+            ON CONFLICT DO NOTHING;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+# Transition tables need one trigger per event
+DIRTY_DAYS_TRIGGER_DDL = """
+    DROP TRIGGER IF EXISTS data_dirty_days_insert ON data;
+    CREATE TRIGGER data_dirty_days_insert
+    AFTER INSERT ON data REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_rolled_up_days_dirty();
+    DROP TRIGGER IF EXISTS data_dirty_days_update ON data;
+    CREATE TRIGGER data_dirty_days_update
+    AFTER UPDATE ON data REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_rolled_up_days_dirty();
+    DROP TRIGGER IF EXISTS data_dirty_days_delete ON data;
+    CREATE TRIGGER data_dirty_days_delete
+    AFTER DELETE ON data REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_rolled_up_days_dirty()
+"""
+
+# Duration sketches (quantile_sketch.TDigest, stored with `to_dict`) of each closed day and
+# phase, kept next to the rollups. Percentiles for any range merge the stored sketches
+# with sketches of the live days built from raw rows. `reroll_days` drops a day's sketches,
+# which are then rebuilt on next use.
+DAILY_SKETCH_DDL = """
+    CREATE TABLE IF NOT EXISTS phase_daily_sketch (
+        day date NOT NULL,
+        phase text NOT NULL,
+        sketch jsonb NOT NULL,
+        PRIMARY KEY (day, phase)
+    )
+"""
+PHASE_DURATIONS_SELECT = """
+    SELECT phase, EXTRACT(EPOCH FROM next_timestamp - phase_timestamp)
+    FROM transitions
+    WHERE next_timestamp IS NOT NULL
+"""
+UNSKETCHED_DAYS_QUERY = """
+    SELECT DISTINCT day
+    FROM phase_daily_rollup r
+    WHERE NOT EXISTS (SELECT 1 FROM phase_daily_sketch s WHERE s.day = r.day)
+    ORDER BY day
+"""
+SKETCH_UPSERT = """
+    INSERT INTO phase_daily_sketch (day, phase, sketch)
+    VALUES (%s::date, %s, %s::jsonb)
+    ON CONFLICT (day, phase) DO UPDATE SET sketch = EXCLUDED.sketch
+"""
+STORED_SKETCHES_QUERY = """
+    SELECT phase, sketch
+    FROM phase_daily_sketch
+    WHERE day >= %s::date AND day <= %s::date
+    ORDER BY day
+"""
+LIVE_DURATIONS_QUERY = (
+    PHASE_TRANSITIONS_CTE.format(
+        where_clause=f"""
+        WHERE phase_timestamp >= GREATEST({ROLLUP_LIVE_FROM}, %s::date)
+          AND phase_timestamp < %s::date + 1
+        """
+    )
+    + PHASE_DURATIONS_SELECT
+)
+
+_index_ensured = False
+
+
+# ----------------------
+# Function: Ensure Dirty-Day Tracking
+# ----------------------
+def ensure_dirty_day_tracking(cur):
+    """
+    Creates the rollup tables and the trigger that records closed days changed by any writer.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Open cursor, inside the caller's transaction.
+    """
+    cur.execute(DAILY_ROLLUP_DDL)
+    cur.execute(DAILY_SKETCH_DDL)
+    cur.execute(DIRTY_DAYS_DDL)
+    cur.execute(DIRTY_DAYS_FUNCTION_DDL)
+    cur.execute(DIRTY_DAYS_TRIGGER_DDL)
+
+
+# ----------------------
+# Function: Ensure Aggregation Index
+# ----------------------
+def ensure_aggregation_index():
+    """
+    Creates the index, rollup and sketch tables used by the SQL aggregation mode, once per process.
+    """
+    global _index_ensured
+    if _index_ensured:
+        return
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(AGGREGATION_INDEX_DDL)
+            ensure_dirty_day_tracking(cur)
+        conn.commit()
+    _index_ensured = True
+
+
+# ----------------------
+# Function: Re-Roll Days
+# ----------------------
+def reroll_days(conn, days):
+    """
+    Recomputes the rollups of closed days whose rows changed (e.g. after loading late rows).
+
+    Days after the last rolled-up day are skipped: they are still computed from raw rows.
+    The days are also cleared from phase_dirty_days.
+
+    Args:
+        conn (psycopg2.extensions.connection): Open database connection.
+        days (iterable of date or str): Days whose rows changed.
+
+    Returns:
+        int: Number of days re-rolled.
+    """
+    rerolled = 0
+    with conn.cursor() as cur:
+        cur.execute("SELECT MAX(day) FROM phase_daily_rollup")
+        last_rolled = cur.fetchone()[0]
+        for day in sorted(str(day) for day in days):
+            cur.execute("DELETE FROM phase_dirty_days WHERE day = %s::date", (day,))
+            if last_rolled is None or day > str(last_rolled):
+                continue
+            where_clause, params = _date_range_predicate(day)
+            cur.execute("DELETE FROM phase_daily_rollup WHERE day = %s::date", (day,))
+            cur.execute("DELETE FROM phase_daily_sketch WHERE day = %s::date", (day,))
+            cur.execute(
+                PHASE_TRANSITIONS_CTE.format(where_clause=where_clause) + ROLLUP_INSERT, params
+            )
+            rerolled += 1
+    conn.commit()
+    return rerolled
+
+
+# ----------------------
+# Function: Re-Roll Dirty Days
+# ----------------------
+def _reroll_dirty_days(conn):
+    """
+    Re-rolls the closed days the dirty-day trigger recorded since the last call.
+
+    The recorded days are deleted in the same transaction as their re-roll, so concurrent
+    readers wait for it rather than re-rolling the same days again.
+
+    Args:
+        conn (psycopg2.extensions.connection): Open database connection.
+
+    Returns:
+        int: Number of days re-rolled.
+    """
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM phase_dirty_days RETURNING day")
+        days = [day for (day,) in cur.fetchall()]
+    if not days:
+        conn.commit()
+        return 0
+    return reroll_days(conn, days)
+
+
+# ----------------------
+# Function: Build Date Predicate
+# ----------------------
+def _date_range_predicate(selected_date):
+    """
+    Turns the `date-selector` value into a sargable WHERE clause on phase_timestamp.
+
+    A half-open range on the raw column (rather than DATE(phase_timestamp) = ...) lets
+    Postgres use indexes on phase_timestamp.
+
+    Args:
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+    Returns:
+        tuple: (where_clause, params) to splice into PHASE_TRANSITIONS_CTE.
+    """
+    if selected_date == "all":
+        return "", ()
+    return (
+        "WHERE phase_timestamp >= %s::date AND phase_timestamp < %s::date + 1",
+        (selected_date, selected_date),
+    )
+
+
+# ----------------------
+# Function: Get Phase Statistics from Database
+# ----------------------
+def get_phase_stats_from_db(selected_date):
+    """
+    Computes per-phase total duration, count and average duration inside Postgres.
+
+    Closed days are read from the daily rollups (re-rolling changed ones and rolling up any
+    new ones first); only the days after the last rolled-up day are aggregated from raw rows.
+
+    Args:
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+    Returns:
+        tuple: Three dictionaries keyed by phase, in the same shapes as the Python path:
+            - phase_durations: Total time spent in each phase (in seconds).
+            - phase_counts: How many times each phase occurred.
+            - average_durations: Average duration in minutes, rounded to 2 decimals.
+    """
     try:
-        print("Attempting to connect to the database...")
-
-        # Establish a connection to the PostgreSQL database
-        # The connection string includes:
-        #   - host: Address of the database server (could be 'localhost' or container name if using Docker)
-        #   - port: Default port for PostgreSQL (5432)
-        #   - dbname: Name of the database you're connecting to
-        #   - user: Username to authenticate with
-        #   - password: Password for the user
-        conn = psycopg2.connect(
-            host="postgres",  # Database host (usually a container name or localhost)
-            port="5432",  # Default PostgreSQL port
-            dbname="data",  # Database name
-            user="admin",  # Username for authentication
-            password="admin",  # Password for authentication
-        )
+        ensure_aggregation_index()
+        if selected_date == "all":
+            first_day, last_day = "-infinity", "infinity"
+        else:
+            first_day = last_day = selected_date
+        with pooled_connection() as conn:
+            _reroll_dirty_days(conn)
+            with conn.cursor() as cur:
+                cur.execute(ROLL_UP_CLOSED_DAYS_QUERY)
+                conn.commit()
+                cur.execute(ROLLUP_STATS_QUERY, (first_day, last_day, first_day, last_day))
+                rows = cur.fetchall()
+    except Exception as e:
+        print(f"Error aggregating phase statistics in the database: {e}")
+        return {}, {}, {}
 
-        # Print a success message when the connection is established
-        print("Connection successful!")
+    phase_durations, phase_counts, average_durations = {}, {}, {}
+    for phase, sum_seconds, phase_count, avg_minutes in rows:
+        phase_durations[phase] = float(sum_seconds)
+        phase_counts[phase] = int(phase_count)
+        average_durations[phase] = round(float(avg_minutes), 2)
+    return phase_durations, phase_counts, average_durations
 
-        # Create a cursor object which will be used to execute SQL queries
-        cur = conn.cursor()
 
-        # Query to retrieve all phase data ordered by timestamp
-        # This will fetch the target_id, timestamp, and phase columns from the 'data' table
-        fetch_all_data_query = """
-            SELECT target_id, phase_timestamp, phase
-            FROM data
-            ORDER BY phase_timestamp
+# ----------------------
+# Function: Sketch Phase Durations
+# ----------------------
+def _sketch_durations(cur, query, params):
+    """
+    Runs a (phase, seconds) query and sketches the durations of each phase.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Open cursor.
+        query (str): Query returning (phase, duration_seconds) rows.
+        params (tuple): Parameters for `query`.
+
+    Returns:
+        dict: {phase: TDigest}.
+    """
+    cur.execute(query, params)
+    phase_values = {}
+    for phase, seconds in cur.fetchall():
+        phase_values.setdefault(phase, []).append(float(seconds))
+    return {phase: TDigest.from_values(values) for phase, values in phase_values.items()}
+
+
+# ----------------------
+# Function: Get Phase Sketches from Database
+# ----------------------
+def get_phase_sketches_from_db(selected_date):
+    """
+    Returns mergeable duration sketches of each phase, for percentiles in SQL aggregation mode.
+
+    Closed days are sketched once and stored in phase_daily_sketch (sketching any that are
+    missing first); only the days after the last rolled-up day are sketched from raw rows.
+
+    Args:
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+    Returns:
+        dict: {phase: TDigest} of phase durations in seconds (empty on error).
+    """
+    try:
+        ensure_aggregation_index()
+        if selected_date == "all":
+            first_day, last_day = "-infinity", "infinity"
+        else:
+            first_day = last_day = selected_date
+        with pooled_connection() as conn:
+            _reroll_dirty_days(conn)
+            with conn.cursor() as cur:
+                # Sketch closed days that were rolled up (or re-rolled) since the last call
+                cur.execute(ROLL_UP_CLOSED_DAYS_QUERY)
+                cur.execute(UNSKETCHED_DAYS_QUERY)
+                for (day,) in cur.fetchall():
+                    where_clause, params = _date_range_predicate(str(day))
+                    day_query = (
+                        PHASE_TRANSITIONS_CTE.format(where_clause=where_clause)
+                        + PHASE_DURATIONS_SELECT
+                    )
+                    day_sketches = _sketch_durations(cur, day_query, params)
+                    for phase, sketch in day_sketches.items():
+                        cur.execute(SKETCH_UPSERT, (day, phase, json.dumps(sketch.to_dict())))
+                conn.commit()
+
+                # Merge the stored sketches of the range with the live days'
+                cur.execute(STORED_SKETCHES_QUERY, (first_day, last_day))
+                merged = {}
+                for phase, sketch in cur.fetchall():
+                    merge_phase_sketches({phase: TDigest.from_dict(sketch)}, into=merged)
+                live_sketches = _sketch_durations(cur, LIVE_DURATIONS_QUERY, (first_day, last_day))
+                return merge_phase_sketches(live_sketches, into=merged)
+    except Exception as e:
+        print(f"Error building phase duration sketches from the database: {e}")
+        return {}
+
+
+# ----------------------
+# Function: Get Gantt Intervals from Database
+# ----------------------
+def get_gantt_intervals_from_db(selected_date):
+    """
+    Fetches the start and finish of every phase interval, computed inside Postgres.
+
+    Args:
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+    Returns:
+        list of dict: Rows with 'Task', 'Start', 'Finish' and 'Target ID', as expected by
+        `create_gantt_chart`. The last phase of a target's day finishes when it starts.
+    """
+    try:
+        ensure_aggregation_index()
+        where_clause, params = _date_range_predicate(selected_date)
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(GANTT_INTERVALS_QUERY.format(where_clause=where_clause), params)
+                return [
+                    {"Task": phase, "Start": start, "Finish": finish, "Target ID": target_id}
+                    for phase, start, finish, target_id in cur.fetchall()
+                ]
+    except Exception as e:
+        print(f"Error fetching Gantt intervals from the database: {e}")
+        return []
+
+
+# Queries of one target's events for the drill-down; the (target_id, phase_timestamp)
+# index turns each into a range scan of that target's rows
+TARGET_REVISION_QUERY = """
+    SELECT md5(COALESCE(
+        string_agg(phase_timestamp::text || ' ' || phase, ',' ORDER BY phase_timestamp, phase),
+        ''
+    ))
+    FROM data
+    WHERE target_id = %s
+"""
+TARGET_STATS_QUERY = (
+    PHASE_TRANSITIONS_CTE
+    + """
+    SELECT phase, SUM(EXTRACT(EPOCH FROM next_timestamp - phase_timestamp)), COUNT(*)
+    FROM transitions
+    WHERE next_timestamp IS NOT NULL
+    GROUP BY phase
+    ORDER BY MIN(phase_timestamp), phase
+"""
+)
+TARGET_INTERVALS_QUERY = (
+    PHASE_TRANSITIONS_CTE
+    + """
+    SELECT phase, phase_timestamp, COALESCE(next_timestamp, phase_timestamp)
+    FROM transitions
+    ORDER BY phase_timestamp, phase
+"""
+)
+
+
+# ----------------------
+# Class: Database Target Index
+# ----------------------
+class DatabaseTargetIndex:
+    """
+    Per-target drill-down queries for SQL aggregation mode.
+
+    Each method reads only the selected target's rows, so a drill-down never fetches the
+    whole table. The methods match the drill-down methods of EventStore.
+    """
+
+    @staticmethod
+    def _target_predicate(target_id, selected_date):
+        # WHERE clause for PHASE_TRANSITIONS_CTE limited to one target and the selection
+        where_clause = "WHERE target_id = %s"
+        params = (str(target_id),)
+        if selected_date != "all":
+            where_clause += " AND phase_timestamp >= %s::date AND phase_timestamp < %s::date + 1"
+            params += (selected_date, selected_date)
+        return where_clause, params
+
+    def target_revision(self, target_id):
         """
-        # Execute the query to fetch all data
-        cur.execute(fetch_all_data_query)
-
-        # Fetch all rows from the executed query and store them in the variable 'data'
-        # Each row will be a tuple (target_id, phase_timestamp, phase)
-        data = cur.fetchall()
-        print(f"Fetched {len(data)} rows from the database.")
-
-        # Query to retrieve unique dates from the phase_timestamp column
-        # This query will give us a list of distinct dates that appear in the database
-        unique_dates_query = """
-            SELECT DISTINCT DATE(phase_timestamp)
-            FROM data
-            ORDER BY DATE(phase_timestamp)
+        Returns a key that only changes when the target's rows change.
+
+        Args:
+            target_id (str): The target.
+
+        Returns:
+            str or None: Digest of the target's rows, or None on error.
+        """
+        try:
+            ensure_aggregation_index()
+            with pooled_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(TARGET_REVISION_QUERY, (str(target_id),))
+                    return cur.fetchone()[0]
+        except Exception as e:
+            print(f"Error reading the revision of target {target_id}: {e}")
+            return None
+
+    def target_stats(self, target_id, selected_date):
+        """
+        Computes total duration and count of each phase of one target inside Postgres.
+
+        Args:
+            target_id (str): The target.
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            tuple: (phase_durations, phase_counts), as from `EventStore.target_stats`
+            (empty on error).
         """
-        # Execute the query to fetch unique dates
-        cur.execute(unique_dates_query)
+        phase_durations, phase_counts = {}, {}
+        try:
+            where_clause, params = self._target_predicate(target_id, selected_date)
+            with pooled_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(TARGET_STATS_QUERY.format(where_clause=where_clause), params)
+                    for phase, sum_seconds, phase_count in cur.fetchall():
+                        phase_durations[phase] = float(sum_seconds)
+                        phase_counts[phase] = int(phase_count)
+        except Exception as e:
+            print(f"Error aggregating the phases of target {target_id}: {e}")
+            return {}, {}
+        return phase_durations, phase_counts
 
-        # Fetch all the unique dates, which will be returned as a list of tuples (date,)
-        raw_dates = cur.fetchall()
+    def target_timeline(self, target_id, selected_date):
+        """
+        Fetches the Gantt bars of one target, computed inside Postgres.
 
-        # Convert the tuples (e.g., (2024-04-01,)) into a simple string "2024-04-01"
-        available_dates = [str(date_tuple[0]) for date_tuple in raw_dates]
+        Args:
+            target_id (str): The target.
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
 
-        # Close the cursor and connection to the database to free up resources
-        cur.close()
-        conn.close()
+        Returns:
+            list of dict: Rows with 'Task', 'Start', 'Finish' and 'Target ID', as from
+            `EventStore.target_timeline` (empty on error).
+        """
+        try:
+            where_clause, params = self._target_predicate(target_id, selected_date)
+            with pooled_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(TARGET_INTERVALS_QUERY.format(where_clause=where_clause), params)
+                    return [
+                        {
+                            "Task": phase,
+                            "Start": start,
+                            "Finish": finish,
+                            "Target ID": str(target_id),
+                        }
+                        for phase, start, finish in cur.fetchall()
+                    ]
+        except Exception as e:
+            print(f"Error fetching the timeline of target {target_id}: {e}")
+            return []
 
-        # Return the fetched data (list of tuples) and the list of available dates
-        return data, available_dates
 
+# ----------------------
+# Function: Data Table Is Partitioned
+# ----------------------
+def data_is_partitioned(cur):
+    """
+    Tells whether the data table uses the daily-partitioned layout of partitions.py.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Open cursor.
+
+    Returns:
+        bool: True if `data` is a partitioned table.
+    """
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('data'))"
+    )
+    return cur.fetchone()[0]
+
+
+# ----------------------
+# Function: Get Available Dates from Database
+# ----------------------
+def get_available_dates_from_db():
+    """
+    Retrieves the unique dates present in the data table.
+
+    Returns:
+        list of str: List of unique dates (YYYY-MM-DD) as strings, used for filtering.
+    """
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                if data_is_partitioned(cur):
+                    cur.execute(PARTITIONED_DATES_QUERY)
+                else:
+                    cur.execute(UNIQUE_DATES_QUERY)
+                return [str(date_tuple[0]) for date_tuple in cur.fetchall()]
     except Exception as e:
-        # If an exception occurs during the process, catch it and print a user-friendly error message
         print(f"Error connecting to the database: {e}")
-        # Return empty lists in case of an error to ensure the function doesn't break other code
-        return [], []
+        return []
@@ -0,0 +1,387 @@
+import bisect
+import itertools
+import sys
+import threading
+from datetime import date
+
+from quantile_sketch import TDigest, merge_phase_sketches
+
+# ----------------------
+# In-Memory Event Store
+# ----------------------
+# Phase events kept in memory, partitioned by day and then by target:
+#
+#   _days:       [2024-05-16, 2024-05-17, ...]          <- sorted partition keys
+#   _partitions: {2024-05-16: {"Target0": [PhaseEvent, ...], ...}, ...}
+#
+# Each target's list is sorted by time. Selecting a date is a binary search over the
+# partition keys, not a scan over every row, and the dropdown's dates are the partition
+# keys themselves, so no SELECT DISTINCT DATE(...) query is needed. Events are compact
+# __slots__ records whose target and phase strings are interned, so repeated IDs and
+# phase names are stored once.
+#
+# Per-phase statistics are kept as daily rollups ({day: (sum_seconds, count, duration
+# sketch) per phase}). A phase lasts until the target's next phase on the same day, so a
+# day's rollup depends only on that day's events: adding events re-rolls just the days they
+# fall on (normally only the still-open current day), and "All Data" is the sum of the
+# daily rollups. The duration sketches (quantile_sketch.TDigest) merge the same way, which
+# gives percentiles for any selection without revisiting old events. Each day also has a
+# revision, renewed whenever it gets events, so caches of one day's events (e.g. replay
+# engines) survive new rows on other days.
+#
+# A per-target index serves the drill-down into one target:
+#
+#   _target_days:     {"Target0": [2024-05-16, 2024-05-17, ...], ...}  <- sorted, per target
+#   _target_rollups:  {("Target0", 2024-05-16): (phase_durations, phase_counts), ...}
+#   _target_revisions: {"Target0": 1207, ...}  <- renewed whenever the target gets events
+#
+# A target's events on a day are already one sorted list in its day partition, so the index
+# only records which days those are. Its statistics are rolled up per (target, day) and
+# dropped when that target gets events on that day, so a drill-down touches only the one
+# target's events, however many other targets there are.
+
+# Revisions come from one counter per process, so they never repeat, even across the stores
+# that replace each other on a full resync
+_revisions = itertools.count(1)
+
+
+# ----------------------
+# Class: Phase Event
+# ----------------------
+class PhaseEvent:
+    """
+    One phase change of a target.
+
+    Attributes:
+        target_id (str): Target the event belongs to.
+        phase (str): Phase entered.
+        phase_timestamp (datetime): When the phase was entered.
+    """
+
+    __slots__ = ("target_id", "phase", "phase_timestamp")
+
+    def __init__(self, target_id, phase, phase_timestamp):
+        self.target_id = target_id
+        self.phase = phase
+        self.phase_timestamp = phase_timestamp
+
+
+# ----------------------
+# Class: Event Store
+# ----------------------
+class EventStore:
+    """
+    Date- and target-partitioned phase events, updated incrementally as rows arrive.
+
+    Attributes:
+        row_count (int): Number of events held.
+    """
+
+    def __init__(self, rows=()):
+        self._days = []
+        self._partitions = {}
+        self._rollups = {}  # day -> (phase_durations, phase_counts, phase_sketches), dropped when the day changes
+        self._day_revisions = {}  # day -> revision of the day's events
+        self._target_days = {}  # target_id -> sorted days with events of the target
+        self._target_rollups = {}  # (target_id, day) -> (phase_durations, phase_counts)
+        self._target_revisions = {}  # target_id -> revision of the target's events
+        self._lock = threading.RLock()
+        self.row_count = 0
+        self.add_rows(rows)
+
+    def add_rows(self, rows):
+        """
+        Adds (target_id, phase_timestamp, phase) rows, in any order.
+
+        Args:
+            rows (iterable of tuples): Rows as returned by the database.
+        """
+        with self._lock:
+            for target_id, phase_timestamp, phase in rows:
+                day = phase_timestamp.date()
+                partition = self._partitions.get(day)
+                if partition is None:
+                    partition = self._partitions[day] = {}
+                    bisect.insort(self._days, day)
+
+                target_id = sys.intern(str(target_id))
+                event = PhaseEvent(target_id, sys.intern(str(phase)), phase_timestamp)
+                events = partition.get(target_id)
+                if events is None:
+                    events = partition[target_id] = []
+                    bisect.insort(self._target_days.setdefault(target_id, []), day)
+                # Rows usually arrive in time order, so this is an append
+                if events and phase_timestamp < events[-1].phase_timestamp:
+                    bisect.insort(events, event, key=lambda e: e.phase_timestamp)
+                else:
+                    events.append(event)
+                self._rollups.pop(day, None)  # Re-rolled on next use
+                self._day_revisions[day] = next(_revisions)
+                self._target_rollups.pop((target_id, day), None)
+                self._target_revisions[target_id] = next(_revisions)
+                self.row_count += 1
+
+    def extended(self, rows):
+        """
+        Returns a new store holding this store's events plus `rows`, leaving this one unchanged.
+
+        The new store shares every day partition and target event list the rows do not
+        touch, and copies only those they do, so the cost follows the new rows rather than
+        the store's size. Callers still holding this store keep seeing the same events.
+
+        Args:
+            rows (iterable of tuples): (target_id, phase_timestamp, phase) rows to add.
+
+        Returns:
+            EventStore: The extended store.
+        """
+        rows = list(rows)
+        store = EventStore.__new__(EventStore)
+        with self._lock:
+            store._days = list(self._days)
+            store._partitions = dict(self._partitions)
+            store._rollups = dict(self._rollups)
+            store._day_revisions = dict(self._day_revisions)
+            store._target_days = dict(self._target_days)
+            store._target_rollups = dict(self._target_rollups)
+            store._target_revisions = dict(self._target_revisions)
+            store.row_count = self.row_count
+        store._lock = threading.RLock()
+
+        # Copy what add_rows will modify, so none of it is shared with this store
+        copied_days, copied_targets = set(), set()
+        for target_id, phase_timestamp, _ in rows:
+            day, target_id = phase_timestamp.date(), str(target_id)
+            partition = store._partitions.get(day)
+            if partition is not None and day not in copied_days:
+                partition = store._partitions[day] = dict(partition)
+                copied_days.add(day)
+            if partition is not None and (day, target_id) not in copied_targets:
+                if target_id in partition:
+                    partition[target_id] = list(partition[target_id])
+                copied_targets.add((day, target_id))
+            if target_id in store._target_days and target_id not in copied_targets:
+                store._target_days[target_id] = list(store._target_days[target_id])
+                copied_targets.add(target_id)
+        store.add_rows(rows)
+        return store
+
+    def dates(self):
+        """
+        Returns the dates that have events.
+
+        Returns:
+            list of str: Partition keys as "YYYY-MM-DD", ascending.
+        """
+        with self._lock:
+            return [str(day) for day in self._days]
+
+    def _selected_days(self, selected_date):
+        # Partition keys for a selection, found by binary search for a single date
+        if selected_date == "all":
+            return list(self._days)
+        day = date.fromisoformat(selected_date)
+        i = bisect.bisect_left(self._days, day)
+        return [day] if i < len(self._days) and self._days[i] == day else []
+
+    def organize(self, selected_date):
+        """
+        Returns the events of a selection in the layout of `data_processing.process_data`.
+
+        Args:
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            dict: Nested dictionary in the form {target_id: {date: [(phase, timestamp), ...]}},
+            with targets in order of first appearance.
+        """
+        organized_data = {}
+        with self._lock:
+            for day in self._selected_days(selected_date):
+                for target_id, events in self._partitions[day].items():
+                    organized_data.setdefault(target_id, {})[day] = [
+                        (event.phase, event.phase_timestamp) for event in events
+                    ]
+        return organized_data
+
+    def rows(self, selected_date):
+        """
+        Returns the events of a selection as (target_id, phase_timestamp, phase) rows.
+
+        Args:
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            list of tuples: Rows grouped by day, then by target (in order of first
+            appearance), each target's rows in time order.
+        """
+        with self._lock:
+            return [
+                (event.target_id, event.phase_timestamp, event.phase)
+                for day in self._selected_days(selected_date)
+                for events in self._partitions[day].values()
+                for event in events
+            ]
+
+    def selection_revision(self, selected_date):
+        """
+        Returns a number that changes whenever events are added to a selection.
+
+        Args:
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            int: The selection's revision, unique within the process (0 if it has no events).
+        """
+        with self._lock:
+            if selected_date == "all":
+                return max(self._day_revisions.values(), default=0)
+            return self._day_revisions.get(date.fromisoformat(selected_date), 0)
+
+    def _roll_up(self, day):
+        # Sum the durations of consecutive phases of each target on one day, and sketch
+        # their distribution
+        phase_durations, phase_counts, phase_values = {}, {}, {}
+        for events in self._partitions[day].values():
+            for current, following in zip(events, events[1:]):
+                duration = (following.phase_timestamp - current.phase_timestamp).total_seconds()
+                phase_durations[current.phase] = phase_durations.get(current.phase, 0) + duration
+                phase_counts[current.phase] = phase_counts.get(current.phase, 0) + 1
+                phase_values.setdefault(current.phase, []).append(duration)
+        phase_sketches = {
+            phase: TDigest.from_values(values) for phase, values in phase_values.items()
+        }
+        return phase_durations, phase_counts, phase_sketches
+
+    def _rollup(self, day):
+        # The day's rollup, recomputed only if events were added since it was last used
+        rollup = self._rollups.get(day)
+        if rollup is None:
+            rollup = self._rollups[day] = self._roll_up(day)
+        return rollup
+
+    def phase_stats(self, selected_date):
+        """
+        Calculates total duration and count of each phase by summing daily rollups.
+
+        Only days whose events changed since they were last rolled up are recomputed.
+
+        Args:
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            tuple: (phase_durations, phase_counts), as from `calculate_phase_durations_and_counts`.
+        """
+        phase_durations, phase_counts = {}, {}
+        with self._lock:
+            for day in self._selected_days(selected_date):
+                day_durations, day_counts, _ = self._rollup(day)
+                for phase, duration in day_durations.items():
+                    phase_durations[phase] = phase_durations.get(phase, 0) + duration
+                    phase_counts[phase] = phase_counts.get(phase, 0) + day_counts[phase]
+        return phase_durations, phase_counts
+
+    def phase_sketches(self, selected_date):
+        """
+        Merges the daily duration sketches of each phase over a selection.
+
+        Args:
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            dict: {phase: TDigest} of phase durations in seconds.
+        """
+        merged = {}
+        with self._lock:
+            for day in self._selected_days(selected_date):
+                merge_phase_sketches(self._rollup(day)[2], into=merged)
+        return merged
+
+    def _target_selected_days(self, target_id, selected_date):
+        # Days of a selection on which the target has events
+        days = self._target_days.get(target_id, [])
+        if selected_date == "all":
+            return list(days)
+        day = date.fromisoformat(selected_date)
+        i = bisect.bisect_left(days, day)
+        return [day] if i < len(days) and days[i] == day else []
+
+    def target_revision(self, target_id):
+        """
+        Returns a number that changes whenever events are added for a target.
+
+        Args:
+            target_id (str): The target.
+
+        Returns:
+            int: The target's revision, unique within the process (0 if it has no events).
+        """
+        with self._lock:
+            return self._target_revisions.get(str(target_id), 0)
+
+    @staticmethod
+    def _roll_up_target(events):
+        # Sum the durations of one target's consecutive phases on one day
+        phase_durations, phase_counts = {}, {}
+        for current, following in zip(events, events[1:]):
+            duration = (following.phase_timestamp - current.phase_timestamp).total_seconds()
+            phase_durations[current.phase] = phase_durations.get(current.phase, 0) + duration
+            phase_counts[current.phase] = phase_counts.get(current.phase, 0) + 1
+        return phase_durations, phase_counts
+
+    def target_stats(self, target_id, selected_date):
+        """
+        Calculates total duration and count of each phase of one target.
+
+        Args:
+            target_id (str): The target.
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            tuple: (phase_durations, phase_counts), as from `calculate_phase_durations_and_counts`
+            on the target's events alone.
+        """
+        target_id = str(target_id)
+        phase_durations, phase_counts = {}, {}
+        with self._lock:
+            for day in self._target_selected_days(target_id, selected_date):
+                rollup = self._target_rollups.get((target_id, day))
+                if rollup is None:
+                    rollup = self._target_rollups[(target_id, day)] = self._roll_up_target(
+                        self._partitions[day][target_id]
+                    )
+                day_durations, day_counts = rollup
+                for phase, duration in day_durations.items():
+                    phase_durations[phase] = phase_durations.get(phase, 0) + duration
+                    phase_counts[phase] = phase_counts.get(phase, 0) + day_counts[phase]
+        return phase_durations, phase_counts
+
+    def target_timeline(self, target_id, selected_date):
+        """
+        Returns the Gantt bars of one target.
+
+        Args:
+            target_id (str): The target.
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            list of dict: Rows with 'Task', 'Start', 'Finish' and 'Target ID', as from
+            `build_gantt_data` on the target's events alone.
+        """
+        target_id = str(target_id)
+        gantt_data = []
+        with self._lock:
+            for day in self._target_selected_days(target_id, selected_date):
+                events = self._partitions[day][target_id]
+                for i, event in enumerate(events):
+                    # A phase ends when the next one starts; the day's last phase has no length
+                    following = events[i + 1] if i + 1 < len(events) else event
+                    gantt_data.append(
+                        {
+                            "Task": event.phase,
+                            "Start": event.phase_timestamp,
+                            "Finish": following.phase_timestamp,
+                            "Target ID": target_id,
+                        }
+                    )
+        return gantt_data
@@ -0,0 +1,133 @@
+import pandas as pd
+from dash import Patch, no_update
+
+from config import GANTT_MAX_BARS, GANTT_MAX_TRACES
+from graphs import create_lod_gantt_traces, gantt_bar_width, gantt_title
+
+# ----------------------
+# Figure Deltas
+# ----------------------
+# When a browser already shows a view built from an older data version, these helpers
+# describe only what changed as dash.Patch updates, so bytes sent and client re-render
+# work scale with the new events rather than with the whole history. Each helper returns
+# None when the change cannot be expressed as a patch, and the caller re-sends the figure.
+
+# Columns identifying one Gantt bar
+BAR_KEY = ["Target ID", "Task", "Start", "Finish"]
+
+
+# ----------------------
+# Function: Patch Bar Chart Values
+# ----------------------
+def _bar_values_patch(old_values, new_values):
+    """
+    Builds a patch that rewrites only the bars whose value changed.
+
+    Args:
+        old_values (dict): {phase: value} the browser currently shows.
+        new_values (dict): {phase: value} it should show.
+
+    Returns:
+        dash.Patch, no_update or None: None when the set or order of phases changed.
+    """
+    if list(old_values) != list(new_values):
+        return None
+    patch = Patch()
+    changed = False
+    for i, (phase, value) in enumerate(new_values.items()):
+        if old_values[phase] != value:
+            patch["data"][0]["x"][i] = value
+            patch["data"][0]["text"][i] = value
+            changed = True
+    return patch if changed else no_update
+
+
+# ----------------------
+# Function: Patch Bar Charts
+# ----------------------
+def bar_charts_patch(old_state, new_state):
+    """
+    Describes the change between two renders of the bar-graph tab.
+
+    Args:
+        old_state (dict): View state the browser currently shows.
+        new_state (dict): View state it should show.
+
+    Returns:
+        dict or None: Patches keyed by graph id, or None if a full re-send is needed.
+    """
+    avg_patch = _bar_values_patch(old_state["duration_values"], new_state["duration_values"])
+    count_patch = _bar_values_patch(old_state["phase_counts"], new_state["phase_counts"])
+    if avg_patch is None or count_patch is None:
+        return None
+    return {"avg-duration-bar": avg_patch, "count-phase-bar": count_patch}
+
+
+# ----------------------
+# Function: Patch Gantt Chart
+# ----------------------
+def gantt_chart_patch(old_state, new_state, old_trace_count):
+    """
+    Describes the change between two renders of the Gantt tab as appended bars.
+
+    New bars are appended as extra traces (one per phase, in the phase's legend group).
+    A patch is only possible when every bar the browser shows is still drawn by a fresh
+    render, i.e. no interval it draws was extended or merged away by the new events, went
+    sub-pixel as the span grew, or was pushed past GANTT_MAX_BARS by wider ones.
+
+    Args:
+        old_state (dict): View state the browser currently shows.
+        new_state (dict): View state it should show.
+        old_trace_count (int): Number of traces in the browser's figure.
+
+    Returns:
+        tuple or None: ({"gantt-chart": patch}, new_trace_count), or None if a full
+        re-send is needed.
+    """
+    old, new = old_state["gantt"], new_state["gantt"]
+    old_targets, new_targets = old["target_ids"], new["target_ids"]
+    if old["x_range"] != new["x_range"] or new_targets[: len(old_targets)] != old_targets:
+        return None
+
+    old_bars = pd.MultiIndex.from_frame(old["visible"][BAR_KEY])
+    new_bars = pd.MultiIndex.from_frame(new["visible"][BAR_KEY])
+    if not old_bars.isin(new_bars).all():
+        return None
+
+    added = new["visible"][~new_bars.isin(old_bars)]
+    # The patched figure must stay within the bar cap of a fresh render
+    if len(old["visible"]) + len(added) > GANTT_MAX_BARS:
+        return None
+    new_phases = set(added["Task"].unique())
+    if old_trace_count + len(new_phases) > GANTT_MAX_TRACES:
+        return None
+
+    patch = Patch()
+    bar_width = gantt_bar_width(len(new_targets))
+    if len(new_targets) != len(old_targets):
+        # New targets get new rows at the bottom; existing rows keep their numbers
+        patch["layout"]["yaxis"]["tickvals"].extend(
+            list(range(len(old_targets), len(new_targets)))
+        )
+        patch["layout"]["yaxis"]["ticktext"].extend(
+            [str(target_id) for target_id in new_targets[len(old_targets) :]]
+        )
+        if bar_width != gantt_bar_width(len(old_targets)):
+            for i in range(old_trace_count):
+                patch["data"][i]["line"]["width"] = bar_width
+
+    row_of_target = {target_id: row for row, target_id in enumerate(new_targets)}
+    shown_phases = set(old["visible"]["Task"].unique())
+    traces = create_lod_gantt_traces(
+        added,
+        new_state["phase_colors"],
+        row_of_target,
+        bar_width,
+        show_legend=new_phases - shown_phases,
+        typed_arrays=False,
+    )
+    for trace in traces:
+        patch["data"].append(trace)
+    patch["layout"]["title"]["text"] = gantt_title(new, added_bars=len(added))
+
+    return {"gantt-chart": patch}, old_trace_count + len(traces)
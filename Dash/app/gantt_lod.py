@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+from config import GANTT_MAX_BARS, GANTT_PLOT_WIDTH_PX
+
+# ----------------------
+# Level-of-Detail Gantt Intervals
+# ----------------------
+# px.timeline sends every phase interval to the browser as its own bar. With thousands of
+# targets over "All Data" most of those bars are far narrower than a pixel. The helpers
+# below shrink the interval list before it is drawn:
+#   1. consecutive identical phases of a target are merged into one interval;
+#   2. only intervals overlapping the visible x window are kept, clipped to it;
+#   3. intervals narrower than about one pixel of that window are dropped;
+#   4. at most GANTT_MAX_BARS intervals are kept (the widest ones).
+
+
+# ----------------------
+# Function: Convert Gantt Data to Arrays
+# ----------------------
+def to_interval_frame(gantt_data):
+    """
+    Normalizes Gantt rows into a DataFrame with datetime64 start and finish columns.
+
+    Args:
+        gantt_data (list of dict or DataFrame): Rows with 'Task', 'Start', 'Finish' and 'Target ID'.
+
+    Returns:
+        pandas.DataFrame: Columns Task, Start, Finish and Target ID.
+    """
+    frame = pd.DataFrame(gantt_data, columns=["Task", "Start", "Finish", "Target ID"])
+    for column in ("Start", "Finish"):
+        # to_datetime scans even datetime64 columns for repeated values; skip those
+        if not pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = pd.to_datetime(frame[column])
+    return frame
+
+
+# ----------------------
+# Function: Merge Consecutive Phases
+# ----------------------
+def merge_consecutive_phases(intervals):
+    """
+    Merges back-to-back intervals of the same phase on the same target into one.
+
+    Args:
+        intervals (pandas.DataFrame): Output of `to_interval_frame`.
+
+    Returns:
+        pandas.DataFrame: Same columns, with each run of identical contiguous phases collapsed.
+    """
+    if intervals.empty:
+        return intervals
+    ordered = intervals.sort_values(["Target ID", "Start"], kind="stable")
+    targets = ordered["Target ID"].to_numpy()
+    tasks = ordered["Task"].to_numpy()
+    starts = ordered["Start"].to_numpy()
+    finishes = ordered["Finish"].to_numpy()
+
+    # A new run starts when the target or phase changes, or there is a gap in time
+    new_run = np.ones(len(ordered), dtype=bool)
+    new_run[1:] = (
+        (targets[1:] != targets[:-1])
+        | (tasks[1:] != tasks[:-1])
+        | (starts[1:] != finishes[:-1])
+    )
+    run_starts = np.flatnonzero(new_run)
+    run_ends = np.append(run_starts[1:], len(ordered)) - 1
+
+    return pd.DataFrame(
+        {
+            "Task": tasks[run_starts],
+            "Start": starts[run_starts],
+            "Finish": finishes[run_ends],
+            "Target ID": targets[run_starts],
+        }
+    )
+
+
+# ----------------------
+# Function: Parse Visible Window
+# ----------------------
+def parse_x_range(relayout_data):
+    """
+    Extracts the x-axis window from a `relayoutData` event.
+
+    Args:
+        relayout_data (dict or None): The graph's relayoutData property.
+
+    Returns:
+        list or None: [start, end] as ISO strings, None when the view was reset
+        (autorange), or False when the event did not touch the x-axis.
+    """
+    if not relayout_data:
+        return False
+    if relayout_data.get("xaxis.autorange") or relayout_data.get("autosize"):
+        return None
+    if "xaxis.range[0]" in relayout_data and "xaxis.range[1]" in relayout_data:
+        return [relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]]
+    if "xaxis.range" in relayout_data:
+        return list(relayout_data["xaxis.range"])
+    return False
+
+
+# ----------------------
+# Function: Select Visible Intervals
+# ----------------------
+def select_visible_intervals(
+    intervals, x_range=None, plot_width_px=GANTT_PLOT_WIDTH_PX, max_bars=GANTT_MAX_BARS
+):
+    """
+    Keeps the intervals worth drawing in the visible window.
+
+    Args:
+        intervals (pandas.DataFrame): Merged intervals from `merge_consecutive_phases`.
+        x_range (list, optional): [start, end] of the visible window; None shows everything.
+        plot_width_px (int): Approximate width of the plot area in pixels.
+        max_bars (int): Maximum number of intervals to keep.
+
+    Returns:
+        tuple:
+            - pandas.DataFrame: Visible intervals, clipped to the window.
+            - int: Number of intervals dropped for being narrower than a pixel or over the cap.
+    """
+    if intervals.empty:
+        return intervals, 0
+
+    starts = intervals["Start"].to_numpy()
+    finishes = intervals["Finish"].to_numpy()
+    if x_range is not None:
+        window_start = np.datetime64(pd.Timestamp(x_range[0]).to_datetime64())
+        window_end = np.datetime64(pd.Timestamp(x_range[1]).to_datetime64())
+    else:
+        window_start, window_end = starts.min(), finishes.max()
+
+    # Overlap test, then clip to the window so widths reflect what is on screen
+    overlaps = (finishes >= window_start) & (starts <= window_end)
+    clipped_starts = np.maximum(starts[overlaps], window_start)
+    clipped_finishes = np.minimum(finishes[overlaps], window_end)
+    widths = (clipped_finishes - clipped_starts).astype("timedelta64[ns]").astype(np.int64)
+
+    # One pixel's worth of time at the current zoom level
+    pixel = max((window_end - window_start).astype("timedelta64[ns]").astype(np.int64), 1)
+    pixel /= max(plot_width_px, 1)
+    keep = widths >= pixel
+
+    visible = intervals[overlaps][keep].copy()
+    visible["Start"] = clipped_starts[keep]
+    visible["Finish"] = clipped_finishes[keep]
+    widths = widths[keep]
+
+    # Enforce the cap by keeping the widest intervals
+    if len(visible) > max_bars:
+        widest = np.argpartition(widths, len(widths) - max_bars)[-max_bars:]
+        visible = visible.iloc[np.sort(widest)]
+
+    return visible, len(intervals) - len(visible)
+
+
+# ----------------------
+# Function: Prepare Gantt Bars
+# ----------------------
+def prepare_gantt_bars(gantt_data, x_range=None):
+    """
+    Runs the full level-of-detail pipeline for one render.
+
+    Args:
+        gantt_data (list of dict or DataFrame): Rows with 'Task', 'Start', 'Finish' and 'Target ID'.
+        x_range (list, optional): [start, end] of the visible window; None shows everything.
+
+    Returns:
+        dict:
+            - intervals: All merged intervals (before windowing).
+            - visible: The intervals to draw.
+            - dropped: How many merged intervals are not drawn.
+            - target_ids: Targets in Y-axis order (order of first appearance).
+            - x_range: The window the bars were selected for.
+    """
+    frame = to_interval_frame(gantt_data)
+    intervals = merge_consecutive_phases(frame)
+    visible, dropped = select_visible_intervals(intervals, x_range)
+    return {
+        "intervals": intervals,
+        "visible": visible,
+        "dropped": dropped,
+        "target_ids": list(pd.unique(frame["Target ID"])),
+        "x_range": x_range,
+    }
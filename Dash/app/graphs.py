@@ -1,60 +1,153 @@
+import base64
+import functools
+
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 
+from config import GANTT_PLOT_HEIGHT_PX, GANTT_USE_WEBGL
+from gantt_lod import prepare_gantt_bars
+
+# ----------------------
+# Figure Templates
+# ----------------------
+# The dashboard's figures are plain dictionaries assembled from layouts and trace skeletons
+# that plotly validates once, on first use, and that each render only fills with its data
+# arrays. Building go.Figure / go.Bar objects instead validates every array again on every
+# tick, which cost more than the rest of a large Gantt update. Templates are shared between
+# renders, so figures must not be modified in place: `_fill` copies whatever it changes.
+#
+# Numeric arrays are sent as plotly.js typed arrays (base64 of the raw values), like
+# plotly does for go objects, rather than as JSON number lists.
+
+# Dark styling shared by every chart
+DARK_LAYOUT = dict(
+    paper_bgcolor="black",  # Set the background color of the entire figure
+    plot_bgcolor="black",  # Set the background color of the plot area
+    font=dict(color="white"),  # Set the font color to white for visibility
+    autosize=True,  # Automatically adjust the layout size based on content
+    margin=dict(l=50, r=50, t=50, b=50),  # Set margins around the plot
+)
+
+
+# ----------------------
+# Function: Fill Template
+# ----------------------
+def _fill(template, **values):
+    """
+    Returns a copy of a cached template with some entries set.
+
+    Dictionary values are merged one level deep into the template's dictionary of the same
+    name (e.g. `xaxis={"range": ...}` keeps the template's other axis settings).
+
+    Args:
+        template (dict): Cached layout or trace skeleton (left unchanged).
+        **values: Entries to set.
+
+    Returns:
+        dict: The filled copy.
+    """
+    filled = dict(template)
+    for key, value in values.items():
+        if isinstance(value, dict) and isinstance(template.get(key), dict):
+            value = {**template[key], **value}
+        filled[key] = value
+    return filled
+
+
+# ----------------------
+# Function: Typed Array
+# ----------------------
+def _typed_array(values):
+    """
+    Encodes a numeric array the way plotly.js reads typed arrays.
+
+    Args:
+        values (numpy.ndarray): Float or integer values.
+
+    Returns:
+        dict: {"dtype": e.g. "f8", "bdata": base64 of the little-endian values}.
+    """
+    values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder("<"))
+    return {"dtype": values.dtype.str[1:], "bdata": base64.b64encode(values).decode("ascii")}
+
+
+# ----------------------
+# Function: Bar Chart Templates
+# ----------------------
+@functools.lru_cache(maxsize=None)
+def _bar_chart_layout(x_title, tickformat=None):
+    # Layout of the horizontal bar charts, one per x-axis title
+    xaxis = dict(
+        title=x_title,  # Label for the X-axis
+        color="white",  # Color of axis labels and ticks
+        showgrid=True,  # Display gridlines on the X-axis
+    )
+    if tickformat is not None:
+        xaxis["tickformat"] = tickformat
+    return go.Layout(
+        xaxis=xaxis,
+        yaxis=dict(title="Phase", color="white"),  # Label for the Y-axis
+        **DARK_LAYOUT,
+    ).to_plotly_json()
+
+
+@functools.lru_cache(maxsize=None)
+def _bar_trace():
+    # Horizontal bar with its value written inside in white
+    return go.Bar(
+        orientation="h",  # Specify a horizontal bar chart
+        textposition="inside",  # Position the text inside the bar
+        insidetextfont=dict(color="white", size=14),  # White labels, font size 14
+    ).to_plotly_json()
+
+
+# ----------------------
+# Function: Create Bar Chart
+# ----------------------
+def _create_bar_chart(values, phase_colors, layout):
+    """
+    Fills the bar chart template with one bar per phase.
+
+    Args:
+        values (dict): Value per phase {phase: value}.
+        phase_colors (dict): Mapping of phase names to colors {phase: color}.
+        layout (dict): Cached layout from `_bar_chart_layout`.
+
+    Returns:
+        dict: A Plotly bar chart figure in dictionary format.
+    """
+    bar = _fill(
+        _bar_trace(),
+        x=list(values.values()),  # The X-axis shows the values
+        y=list(values.keys()),  # The Y-axis shows the phase names
+        # Color each phase's bar, or default to blue
+        marker={"color": [phase_colors.get(phase, "blue") for phase in values]},
+        text=list(values.values()),  # Label the bars with their values
+    )
+    return {"data": [bar], "layout": layout}
+
+
 # ----------------------
 # Function: Create Average Duration Bar
 # ----------------------
-def create_avg_duration_bar(avg_duration, phase_colors):
+def create_avg_duration_bar(avg_duration, phase_colors, statistic_label="Average"):
     """
     Creates a horizontal bar chart showing the average duration (in minutes) for each phase.
 
     Args:
-        avg_duration (dict): Average duration per phase {phase: avg_minutes}.
+        avg_duration (dict): Average duration per phase {phase: avg_minutes}, or another
+            duration statistic such as a percentile.
         phase_colors (dict): Mapping of phase names to specific colors {phase: color}.
+        statistic_label (str): Name of the statistic shown, for the axis title (e.g. "Median").
 
     Returns:
         dict: A Plotly bar chart figure in dictionary format.
     """
-    return {
-        "data": [
-            go.Bar(
-                x=list(
-                    avg_duration.values()
-                ),  # The X-axis will show the duration values
-                y=list(avg_duration.keys()),  # The Y-axis will show the phase names
-                orientation="h",  # Specify a horizontal bar chart
-                marker=dict(
-                    color=[
-                        phase_colors.get(
-                            phase, "blue"
-                        )  # Assign color for each phase or default to blue
-                        for phase in avg_duration.keys()
-                    ]
-                ),
-                text=list(
-                    avg_duration.values()
-                ),  # Add labels inside the bars to display duration
-                textposition="inside",  # Position the text inside the bar
-                insidetextfont=dict(
-                    color="white", size=14
-                ),  # Style the text with white color and a font size of 14
-            )
-        ],
-        "layout": go.Layout(
-            xaxis=dict(
-                title="Average Duration (minutes)",  # Label for the X-axis
-                color="white",  # Color of axis labels and ticks
-                showgrid=True,  # Display gridlines on the X-axis
-                tickformat=".0f",  # Remove decimal places from the tick marks
-            ),
-            yaxis=dict(title="Phase", color="white"),  # Label for the Y-axis
-            paper_bgcolor="black",  # Set the background color of the entire figure
-            plot_bgcolor="black",  # Set the background color of the plot area
-            font=dict(color="white"),  # Set the font color to white for visibility
-            autosize=True,  # Automatically adjust the layout size based on content
-            margin=dict(l=50, r=50, t=50, b=50),  # Set margins around the plot
-        ),
-    }
+    # Whole minutes on the tick marks
+    layout = _bar_chart_layout(f"{statistic_label} Duration (minutes)", tickformat=".0f")
+    return _create_bar_chart(avg_duration, phase_colors, layout)
 
 
 # ----------------------
@@ -71,39 +164,32 @@ def create_phase_count_bar(phase_counts, phase_colors):
     Returns:
         dict: A Plotly bar chart figure in dictionary format.
     """
-    return {
-        "data": [
-            go.Bar(
-                x=list(phase_counts.values()),  # The X-axis will show the count values
-                y=list(phase_counts.keys()),  # The Y-axis will show the phase names
-                orientation="h",  # Horizontal bar chart
-                marker=dict(
-                    color=[
-                        phase_colors.get(
-                            phase, "blue"
-                        )  # Use color mapping or default to blue
-                        for phase in phase_counts.keys()
-                    ]
-                ),
-                text=list(phase_counts.values()),  # Display the counts inside the bars
-                textposition="inside",  # Place the text inside the bars
-                insidetextfont=dict(
-                    color="white", size=14
-                ),  # Style the text inside the bars
-            )
-        ],
-        "layout": go.Layout(
-            xaxis=dict(
-                title="Total", color="white", showgrid=True
-            ),  # Label for the X-axis
-            yaxis=dict(title="Phase", color="white"),  # Label for the Y-axis
-            paper_bgcolor="black",  # Set the figure background to black
-            plot_bgcolor="black",  # Set the plot background to black
-            font=dict(color="white"),  # Set font color to white
-            autosize=True,  # Auto-resize layout
-            margin=dict(l=50, r=50, t=50, b=50),  # Set margins around the plot
-        ),
-    }
+    return _create_bar_chart(phase_counts, phase_colors, _bar_chart_layout("Total"))
+
+
+# ----------------------
+# Function: Timeline Templates
+# ----------------------
+@functools.lru_cache(maxsize=None)
+def _timeline_layout():
+    # Layout of the bar-based Gantt chart, as px.timeline sets it up, in dark mode
+    return go.Layout(
+        title="Phase Duration Gantt Chart",  # Title of the chart
+        barmode="overlay",  # Bars of different phases share a target's row
+        legend=dict(title="Phase", tracegroupgap=0),
+        showlegend=True,  # Show the legend for color mapping
+        xaxis=dict(
+            type="date", tickformat="%H:%M:%S", showgrid=True
+        ),  # Time format on X-axis with gridlines
+        yaxis=dict(title="Target ID", showgrid=True),  # Target rows with gridlines
+        **DARK_LAYOUT,
+    ).to_plotly_json()
+
+
+@functools.lru_cache(maxsize=None)
+def _timeline_trace():
+    # One phase's bars: each starts at its base and is its duration (ms) long
+    return go.Bar(orientation="h", textposition="auto", showlegend=True).to_plotly_json()
 
 
 # ----------------------
@@ -113,39 +199,310 @@ def create_gantt_chart(gantt_data, phase_colors):
     """
     Creates a Gantt chart to visualize phase durations over time for each target.
 
+    Draws the same chart as `px.timeline` (one horizontal bar trace per phase) from the
+    cached timeline templates, without Plotly Express's dataframe machinery.
+
     Args:
-        gantt_data (DataFrame): DataFrame containing columns: 'Target ID', 'Task', 'Start', 'Finish'.
+        gantt_data (list of dict or DataFrame): Rows with 'Target ID', 'Task', 'Start', 'Finish'.
         phase_colors (dict): Mapping of phases to colors for the timeline bars.
 
     Returns:
-        plotly.graph_objects.Figure: A Gantt chart figure object.
-    """
-    # Create a timeline chart (Gantt chart) using Plotly Express
-    fig = px.timeline(
-        gantt_data,  # DataFrame that contains the Gantt chart data
-        x_start="Start",  # Column in DataFrame indicating the start time of the phase
-        x_end="Finish",  # Column in DataFrame indicating the finish time of the phase
-        y="Target ID",  # Each row represents a target, placed on the Y-axis
-        color="Task",  # The color of each bar is determined by the phase (Task)
-        color_discrete_map=phase_colors,  # Map phase names to specific colors
-        labels={"Target ID": "Target ID", "Task": "Phase"},  # Custom labels for axes
-        title="Phase Duration Gantt Chart",  # Title of the chart
+        dict: A Gantt chart figure in dictionary format.
+    """
+    gantt_data = pd.DataFrame(gantt_data, columns=["Target ID", "Task", "Start", "Finish"])
+    starts = pd.to_datetime(gantt_data["Start"])
+    finishes = pd.to_datetime(gantt_data["Finish"])
+    gantt_data = gantt_data.assign(
+        Start=starts.dt.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+        Duration=(finishes - starts) // pd.Timedelta(milliseconds=1),
     )
 
-    # Update layout settings for better appearance in dark mode
-    fig.update_layout(
-        yaxis_title="Target ID",  # Label for the Y-axis (Target ID)
-        paper_bgcolor="black",  # Set the figure background color to black
-        plot_bgcolor="black",  # Set the plot background color to black
-        font=dict(color="white"),  # Set the font color to white for visibility
+    traces = []
+    for phase, bars in gantt_data.groupby("Task", sort=False):
+        traces.append(
+            _fill(
+                _timeline_trace(),
+                name=phase,
+                legendgroup=phase,
+                base=bars["Start"].tolist(),  # Start time of each bar
+                # Bar length in milliseconds
+                x=_typed_array(bars["Duration"].to_numpy(dtype=np.int32)),
+                y=bars["Target ID"].tolist(),  # Each target gets a row
+                marker={"color": phase_colors.get(phase, "blue")},
+                hovertemplate=(
+                    f"Phase={phase}<br>Start=%{{base}}<br>Finish=%{{x}}<br>"
+                    "Target ID=%{y}<extra></extra>"
+                ),
+            )
+        )
+    return {"data": traces, "layout": _timeline_layout()}
+
+
+# ----------------------
+# Function: Gantt Bar Width
+# ----------------------
+def gantt_bar_width(target_count):
+    """
+    Picks a bar thickness (in pixels) that fills most of each target's row.
+
+    Args:
+        target_count (int): Number of target rows on the Y-axis.
+
+    Returns:
+        float: Line width for the Gantt bar traces.
+    """
+    return max(1, min(20, GANTT_PLOT_HEIGHT_PX * 0.8 / max(target_count, 1)))
+
+
+# ----------------------
+# Function: Level-of-Detail Gantt Templates
+# ----------------------
+@functools.lru_cache(maxsize=None)
+def _lod_gantt_trace():
+    # Bars drawn as line segments, with WebGL unless it is turned off
+    trace_type = go.Scattergl if GANTT_USE_WEBGL else go.Scatter
+    return trace_type(mode="lines").to_plotly_json()
+
+
+@functools.lru_cache(maxsize=None)
+def _lod_gantt_layout():
+    # Everything but the zoom window, the target rows and the title, which vary per render
+    return go.Layout(
         showlegend=True,  # Show the legend for color mapping
+        legend_title_text="Phase",
         xaxis=dict(
-            tickformat="%H:%M:%S", showgrid=True
-        ),  # Time format on X-axis with gridlines
-        yaxis=dict(showgrid=True),  # Display gridlines on the Y-axis
-        autosize=True,  # Automatically adjust the layout size based on content
-        margin=dict(l=50, r=50, t=50, b=50),  # Set margins around the plot area
-    )
+            type="date",  # Epoch milliseconds are shown as dates
+            tickformat="%H:%M:%S",
+            showgrid=True,
+        ),
+        yaxis=dict(
+            title="Target ID",
+            showgrid=True,
+            tickmode="array",
+            autorange="reversed",  # First target at the top, like px.timeline
+        ),
+        uirevision="gantt",  # Preserve zoom/pan across updates
+        **DARK_LAYOUT,
+    ).to_plotly_json()
+
+
+# ----------------------
+# Function: Create Level-of-Detail Gantt Traces
+# ----------------------
+def create_lod_gantt_traces(
+    bars, phase_colors, row_of_target, bar_width, show_legend=True, typed_arrays=True
+):
+    """
+    Turns Gantt bars into one compact line trace per phase.
+
+    Each bar is the segment start -> finish on its target's row, and NaN breaks the line
+    between bars. Times are epoch milliseconds and rows are numbers. Traces of a phase share
+    a legend group, so traces appended by later updates toggle together with the original one.
+
+    Args:
+        bars (pandas.DataFrame): Bars with 'Task', 'Start', 'Finish' and 'Target ID'.
+        phase_colors (dict): Mapping of phases to colors for the timeline bars.
+        row_of_target (dict): Y-axis row number of each target ID.
+        bar_width (float): Line width in pixels.
+        show_legend (bool or set): Whether traces get a legend entry; a set limits it to those phases.
+        typed_arrays (bool): Send coordinates as typed arrays, which are smaller for whole
+            figures; the few bars of a patch are smaller (and compress better) as plain lists.
+
+    Returns:
+        list of dict: Scattergl (or Scatter, if GANTT_USE_WEBGL is off) traces.
+    """
+    encode = _typed_array if typed_arrays else np.ndarray.tolist
+    traces = []
+    for phase, phase_bars in bars.groupby("Task", sort=False):
+        starts = phase_bars["Start"].to_numpy().astype("datetime64[ms]").astype(np.float64)
+        finishes = phase_bars["Finish"].to_numpy().astype("datetime64[ms]").astype(np.float64)
+        rows = phase_bars["Target ID"].map(row_of_target).to_numpy(dtype=np.float32)
+        gaps = np.full(len(phase_bars), np.nan)
+        traces.append(
+            _fill(
+                _lod_gantt_trace(),
+                x=encode(np.column_stack([starts, finishes, gaps]).ravel()),
+                y=encode(np.column_stack([rows, rows, gaps.astype(np.float32)]).ravel()),
+                name=phase,
+                legendgroup=phase,
+                showlegend=(
+                    phase in show_legend if isinstance(show_legend, set) else show_legend
+                ),
+                line={"color": phase_colors.get(phase, "blue"), "width": bar_width},
+                hovertemplate=f"{phase}<br>%{{x}}<extra></extra>",
+            )
+        )
+    return traces
+
+
+# ----------------------
+# Function: Gantt Chart Title
+# ----------------------
+def gantt_title(prepared, added_bars=None):
+    """
+    Formats the Gantt chart title with the number of bars drawn.
+
+    Args:
+        prepared (dict): Output of `gantt_lod.prepare_gantt_bars`.
+        added_bars (int, optional): Bars appended by an incremental update.
+
+    Returns:
+        str: Chart title.
+    """
+    details = f"{len(prepared['visible']):,} bars, {prepared['dropped']:,} hidden"
+    if added_bars is not None:
+        details += f", +{added_bars:,} in last update"
+    return f"Phase Duration Gantt Chart ({details})"
+
 
-    # Return the Gantt chart figure
+# ----------------------
+# Function: Create Level-of-Detail Gantt Chart
+# ----------------------
+def create_lod_gantt_chart(gantt_data, phase_colors, x_range=None, prepared=None):
+    """
+    Creates a Gantt chart that stays small with thousands of targets and long time spans.
+
+    Consecutive identical phases are merged and only intervals wider than about one pixel of
+    the visible window are drawn (see `gantt_lod`), as one WebGL line trace per phase.
+
+    Args:
+        gantt_data (list of dict or DataFrame): Rows with 'Target ID', 'Task', 'Start', 'Finish'.
+        phase_colors (dict): Mapping of phases to colors for the timeline bars.
+        x_range (list, optional): [start, end] of the visible window from `relayoutData`;
+            None shows the whole time span.
+        prepared (dict, optional): Result of `prepare_gantt_bars` to reuse instead of
+            recomputing it from `gantt_data`.
+
+    Returns:
+        dict: A Gantt chart figure in dictionary format. The title reports how many bars
+        were drawn and how many were hidden.
+    """
+    if prepared is None:
+        prepared = prepare_gantt_bars(gantt_data, x_range)
+    target_ids = prepared["target_ids"]
+    row_of_target = {target_id: row for row, target_id in enumerate(target_ids)}
+
+    fig = {
+        "data": create_lod_gantt_traces(
+            prepared["visible"],
+            phase_colors,
+            row_of_target,
+            gantt_bar_width(len(target_ids)),
+        ),
+        "layout": _fill(
+            _lod_gantt_layout(),
+            # Keep the zoom window the bars were selected for (none: the whole time span)
+            xaxis={} if prepared["x_range"] is None else {"range": prepared["x_range"]},
+            yaxis={
+                "tickvals": list(range(len(target_ids))),
+                "ticktext": [str(target_id) for target_id in target_ids],
+            },
+        ),
+    }
+
+    # Report how much was drawn; what it costs to ship is measured once, when the response
+    # is encoded (dashboard_response_bytes on /metrics)
+    fig["layout"]["title"] = {"text": gantt_title(prepared)}
     return fig
+
+
+# ----------------------
+# Function: Trajectory Map Templates
+# ----------------------
+@functools.lru_cache(maxsize=None)
+def _trajectory_trace():
+    # Track lines with small markers, with WebGL unless it is turned off
+    trace_type = go.Scattergl if GANTT_USE_WEBGL else go.Scatter
+    return trace_type(
+        mode="lines+markers",
+        marker=dict(size=3),
+        line=dict(width=1.5),
+        hovertemplate=(
+            "Track %{customdata[0]}<br>%{customdata[1]}<br>"
+            "%{y:.5f}, %{x:.5f}<br>Altitude %{customdata[2]} m<extra></extra>"
+        ),
+        showlegend=False,
+    ).to_plotly_json()
+
+
+@functools.lru_cache(maxsize=None)
+def _trajectory_layout():
+    # Everything but the viewport, the aspect ratio and the title, which vary per render
+    return go.Layout(
+        xaxis=dict(title="Longitude", showgrid=True),
+        yaxis=dict(title="Latitude", showgrid=True, scaleanchor="x"),
+        uirevision="trajectories",  # Preserve zoom/pan across updates
+        **DARK_LAYOUT,
+    ).to_plotly_json()
+
+
+# ----------------------
+# Function: Create Trajectory Map
+# ----------------------
+def create_trajectory_map(trajectories):
+    """
+    Draws simplified track trajectories on a longitude/latitude plot.
+
+    Points are grouped into one line trace per color, with NaN breaking the line between
+    segments, so the figure size depends on the number of points sent rather than tracks.
+
+    Args:
+        trajectories (dict): Output of `trajectory_index.build_trajectories`.
+
+    Returns:
+        dict: A map figure in dictionary format. The title reports tracks and points drawn.
+    """
+    points = trajectories["points"]
+    palette = px.colors.qualitative.Set1
+
+    # Tracks cycle through the palette; NaN rows after each segment break the lines
+    _, track_codes = np.unique(points["trackNumber"].to_numpy(), return_inverse=True)
+    segment_ends = np.ones(len(points), dtype=bool)
+    segment_ends[:-1] = points["segment"].to_numpy()[1:] != points["segment"].to_numpy()[:-1]
+    traces = []
+    for color_index, color in enumerate(palette):
+        selected = track_codes % len(palette) == color_index
+        if not selected.any():
+            continue
+        group = points[selected]
+        breaks = segment_ends[selected]
+        # Position of each point after inserting one gap behind every segment end
+        slots = np.arange(len(group)) + np.concatenate([[0], np.cumsum(breaks)[:-1]])
+        size = len(group) + int(breaks.sum())
+        lon = np.full(size, np.nan)
+        lat = np.full(size, np.nan)
+        lon[slots] = group["longitude"].to_numpy()
+        lat[slots] = group["latitude"].to_numpy()
+        customdata = np.full((size, 3), None, dtype=object)
+        customdata[slots, 0] = group["trackNumber"].to_numpy().tolist()
+        customdata[slots, 1] = group["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S").tolist()
+        customdata[slots, 2] = group["altitude"].round(0).to_numpy().tolist()
+        traces.append(
+            _fill(
+                _trajectory_trace(),
+                x=_typed_array(lon),
+                y=_typed_array(lat),
+                line={"color": color},
+                customdata=customdata.tolist(),
+            )
+        )
+
+    # Keep a degree of longitude and latitude the same length on screen at this latitude
+    mid_latitude = points["latitude"].mean() if len(points) else 0.0
+    viewport = trajectories["viewport"]
+    layout = _fill(
+        _trajectory_layout(),
+        title={
+            "text": (
+                f"Track Trajectories ({trajectories['track_count']:,} tracks, "
+                f"{len(points):,} of {trajectories['candidates']:,} points)"
+            )
+        },
+        # Keep the viewport the points were selected for (none: fit the data)
+        xaxis={} if viewport is None else {"range": list(viewport[:2])},
+        yaxis={
+            **({} if viewport is None else {"range": list(viewport[2:])}),
+            "scaleratio": 1 / max(float(np.cos(np.radians(mid_latitude))), 0.1),
+        },
+    )
+    return {"data": traces, "layout": layout}
@@ -0,0 +1,330 @@
+import argparse
+import csv
+import io
+import time
+from datetime import datetime
+
+import psycopg2
+
+from config import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, DB_CONNECT_TIMEOUT
+from database import (
+    AGGREGATION_INDEX_DDL,
+    data_is_partitioned,
+    ensure_dirty_day_tracking,
+    reroll_days,
+)
+from partitions import create_partitioned_schema, ensure_day_partitions
+
+# ----------------------
+# Bulk CSV Ingestion
+# ----------------------
+# Replaces the manual pgAdmin import. Creates the schema, then streams one or many CSV
+# files of (target_id, phase_timestamp, phase) rows into Postgres with COPY:
+#
+#   python ingest.py ../data.csv more_data/*.csv
+#
+# Each file is read line by line and normalized on the fly (whitespace stripped, ctime
+# timestamps such as "Thu May 16 08:12:46 2024" rewritten as ISO), COPYed into a staging
+# table in chunks of --chunk-rows rows, and merged into `data` with ON CONFLICT DO NOTHING.
+# Memory use is constant whatever the file size, and re-running on the same files is a
+# no-op because rows are unique on (target_id, phase_timestamp, phase). Daily rollups of
+# days that received rows are recomputed afterwards (see database.reroll_days).
+#
+# A new database gets the daily-partitioned layout of partitions.py, and the partitions
+# of the days in each chunk are created before the chunk is merged. A plain `data` table
+# from an earlier setup keeps working; convert it with `python partitions.py --migrate`.
+
+DEDUP_INDEX_NAME = "data_target_id_phase_timestamp_phase_key"
+
+SCHEMA_DDL = """
+    CREATE TABLE IF NOT EXISTS data (
+        target_id text,
+        phase_timestamp timestamp without time zone,
+        phase text
+    )
+"""
+
+# Removes duplicate rows left by earlier manual imports so the unique index can be built
+DEDUPLICATE_EXISTING_SQL = """
+    DELETE FROM data a
+    USING data b
+    WHERE a.ctid < b.ctid
+      AND a.target_id = b.target_id
+      AND a.phase_timestamp = b.phase_timestamp
+      AND a.phase = b.phase
+"""
+
+DEDUP_INDEX_DDL = f"""
+    CREATE UNIQUE INDEX IF NOT EXISTS {DEDUP_INDEX_NAME}
+    ON data (target_id, phase_timestamp, phase)
+"""
+
+STAGED_DAYS_SQL = "SELECT DISTINCT DATE(phase_timestamp) FROM data_staging"
+
+STAGING_DDL = """
+    CREATE TEMPORARY TABLE IF NOT EXISTS data_staging (
+        target_id text,
+        phase_timestamp timestamp without time zone,
+        phase text
+    ) ON COMMIT DELETE ROWS
+"""
+
+MERGE_STAGING_SQL = """
+    INSERT INTO data (target_id, phase_timestamp, phase)
+    SELECT target_id, phase_timestamp, phase
+    FROM data_staging
+    ON CONFLICT (target_id, phase_timestamp, phase) DO NOTHING
+"""
+
+# Timestamp layouts seen in exports; the first is the ctime style used by data.csv
+TIMESTAMP_FORMATS = (
+    "%a %b %d %H:%M:%S %Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S.%f",
+)
+
+
+# ----------------------
+# Function: Normalize Timestamp
+# ----------------------
+def normalize_timestamp(value, formats=TIMESTAMP_FORMATS):
+    """
+    Parses a timestamp in any known layout and returns it in ISO format.
+
+    Args:
+        value (str): Raw timestamp text, already stripped.
+        formats (sequence of str): strptime layouts to try, in order.
+
+    Returns:
+        tuple: ("YYYY-MM-DD HH:MM:SS[.ffffff]", matching layout), or (None, None) if no
+        layout matches.
+    """
+    for fmt in formats:
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return parsed.isoformat(sep=" "), fmt
+    return None, None
+
+
+# ----------------------
+# Class: Normalized CSV Stream
+# ----------------------
+class NormalizedCsvStream:
+    """
+    File-like object that feeds COPY with cleaned rows, read lazily from a CSV file.
+
+    Rows are (target_id, phase_timestamp, phase). Fields are stripped, timestamps are
+    normalized and malformed rows (wrong field count, empty fields, unknown timestamp
+    layout, e.g. a header line) are skipped and counted. Each COPY reads at most
+    `chunk_rows` rows; call `start_chunk` before the next COPY to continue the file.
+
+    The timestamp layout that matched last is tried first, so a file in a single layout is
+    parsed with one attempt per row. It is kept per stream, so files in different layouts
+    (or loaded from different threads) do not affect each other.
+    """
+
+    def __init__(self, lines, chunk_rows):
+        self._rows = csv.reader(lines)
+        self._chunk_rows = chunk_rows
+        self._chunk_left = chunk_rows
+        self._buffer = ""
+        self.exhausted = False
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self._formats = TIMESTAMP_FORMATS  # Layouts in the order they are tried
+
+    def start_chunk(self):
+        """Allows the next `chunk_rows` rows to be read."""
+        self._chunk_left = self._chunk_rows
+
+    def _next_line(self):
+        # Returns the next normalized CSV line, or "" at the end of the chunk or file
+        while self._chunk_left > 0:
+            try:
+                row = next(self._rows)
+            except StopIteration:
+                self.exhausted = True
+                return ""
+            if len(row) != 3:
+                self.rows_rejected += 1
+                continue
+            target_id, timestamp, phase = (field.strip() for field in row)
+            timestamp, fmt = normalize_timestamp(timestamp, self._formats)
+            if fmt is not None and fmt != self._formats[0]:
+                self._formats = (fmt,) + tuple(f for f in TIMESTAMP_FORMATS if f != fmt)
+            if not target_id or not phase or timestamp is None:
+                self.rows_rejected += 1
+                continue
+            self._chunk_left -= 1
+            self.rows_written += 1
+            line = io.StringIO()
+            csv.writer(line, lineterminator="\n").writerow((target_id, timestamp, phase))
+            return line.getvalue()
+        return ""
+
+    def read(self, size=-1):
+        """Returns up to `size` characters of normalized CSV (all remaining if negative)."""
+        while size < 0 or len(self._buffer) < size:
+            line = self._next_line()
+            if not line:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        """Returns the next normalized line (COPY may read line by line)."""
+        if not self._buffer:
+            self._buffer = self._next_line()
+        newline = self._buffer.find("\n")
+        end = len(self._buffer) if newline < 0 else newline + 1
+        line, self._buffer = self._buffer[:end], self._buffer[end:]
+        return line
+
+
+# ----------------------
+# Function: Ensure Schema
+# ----------------------
+def ensure_schema(conn):
+    """
+    Creates the data table and its indexes if they do not exist yet.
+
+    New databases get the daily-partitioned table; an existing plain table is kept.
+
+    Args:
+        conn (psycopg2.extensions.connection): Open database connection.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('data') IS NULL")
+        if cur.fetchone()[0] or data_is_partitioned(cur):
+            create_partitioned_schema(cur)
+            conn.commit()
+            return
+        print("The data table is not partitioned; `python partitions.py --migrate` converts it.")
+
+        cur.execute(SCHEMA_DDL)
+        cur.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", (DEDUP_INDEX_NAME,))
+        if cur.fetchone() is None:
+            cur.execute(DEDUPLICATE_EXISTING_SQL)
+            if cur.rowcount:
+                print(f"Removed {cur.rowcount} duplicate rows from earlier imports.")
+            cur.execute(DEDUP_INDEX_DDL)
+        cur.execute(AGGREGATION_INDEX_DDL)
+        ensure_dirty_day_tracking(cur)
+    conn.commit()
+
+
+# ----------------------
+# Function: Ingest File
+# ----------------------
+def ingest_file(conn, path, chunk_rows):
+    """
+    Streams one CSV file into the data table.
+
+    Args:
+        conn (psycopg2.extensions.connection): Open database connection.
+        path (str): Path of the CSV file.
+        chunk_rows (int): Rows per COPY/merge transaction.
+
+    Returns:
+        tuple: (rows read, rows inserted, rows rejected, set of days that received rows).
+    """
+    inserted = 0
+    days = set()
+    with open(path, newline="", encoding="utf-8") as f, conn.cursor() as cur:
+        cur.execute(STAGING_DDL)
+        partitioned = data_is_partitioned(cur)
+        stream = NormalizedCsvStream(f, chunk_rows)
+        while not stream.exhausted:
+            stream.start_chunk()
+            cur.copy_expert(
+                "COPY data_staging (target_id, phase_timestamp, phase) "
+                "FROM STDIN WITH (FORMAT csv)",
+                stream,
+            )
+            cur.execute(STAGED_DAYS_SQL)
+            staged_days = [day for (day,) in cur.fetchall()]
+            if partitioned:
+                # Rows go straight into their day's partition rather than the default one
+                ensure_day_partitions(cur, staged_days)
+            cur.execute(MERGE_STAGING_SQL)
+            if cur.rowcount:
+                inserted += cur.rowcount
+                days.update(staged_days)
+            conn.commit()  # Staging rows are dropped on commit
+    return stream.rows_written, inserted, stream.rows_rejected, days
+
+
+# ----------------------
+# Function: Main
+# ----------------------
+def main():
+    """
+    Command line entry point: ingests every CSV file given on the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Load phase CSV files (target_id, timestamp, phase) into Postgres."
+    )
+    parser.add_argument("files", nargs="+", help="CSV files to load")
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=500_000,
+        help="rows per COPY/merge transaction (default: 500000)",
+    )
+    parser.add_argument(
+        "--skip-schema",
+        action="store_true",
+        help="do not create the table and indexes",
+    )
+    args = parser.parse_args()
+
+    # COPY of large files can outlast the app's statement timeout, so use a plain connection
+    conn = psycopg2.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        connect_timeout=DB_CONNECT_TIMEOUT,
+    )
+    try:
+        if not args.skip_schema:
+            ensure_schema(conn)
+
+        total_read = total_inserted = 0
+        changed_days = set()
+        started = time.monotonic()
+        for path in args.files:
+            file_started = time.monotonic()
+            read, inserted, rejected, days = ingest_file(conn, path, args.chunk_rows)
+            changed_days |= days
+            elapsed = max(time.monotonic() - file_started, 1e-9)
+            print(
+                f"{path}: {read} rows read, {inserted} inserted, "
+                f"{read - inserted} duplicates, {rejected} rejected "
+                f"({read / elapsed:,.0f} rows/s)"
+            )
+            total_read += read
+            total_inserted += inserted
+
+        elapsed = max(time.monotonic() - started, 1e-9)
+        if changed_days:
+            rerolled = reroll_days(conn, changed_days)
+            print(f"Re-rolled daily rollups of {rerolled} of {len(changed_days)} changed days.")
+        print(
+            f"Total: {total_read} rows read, {total_inserted} inserted "
+            f"in {elapsed:.1f} s ({total_read / elapsed:,.0f} rows/s)"
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
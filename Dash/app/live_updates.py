@@ -0,0 +1,252 @@
+import select
+import threading
+import time
+
+import psycopg2
+from flask import Response
+
+from config import (
+    DB_HOST,
+    DB_PORT,
+    DB_NAME,
+    DB_USER,
+    DB_PASSWORD,
+    DB_CONNECT_TIMEOUT,
+    NOTIFY_CHANNEL,
+    NOTIFY_DEBOUNCE,
+    PUSH_FALLBACK_INTERVAL,
+    SERVING_MODE,
+    AGGREGATION_MODE,
+)
+from database import get_data_from_db, get_snapshot_version
+from shared_snapshot import current_version
+
+# ----------------------
+# Push-Based Live Updates
+# ----------------------
+# In "push" update mode nothing polls Postgres on a timer:
+#   1. a statement-level trigger on `data` sends NOTIFY on NOTIFY_CHANNEL after every
+#      INSERT/UPDATE/DELETE (one notification per statement, so a COPY of a million rows
+#      costs one wake-up);
+#   2. one listener thread per server process holds a LISTEN connection and, when woken,
+#      refreshes the in-process snapshot (an incremental fetch) and bumps a version;
+#   3. every browser keeps a server-sent events stream open on /updates and is told the
+#      new version, which triggers its dashboard callback (assets/clientside.js).
+# Idle periods cost one sleeping thread and open sockets. If the LISTEN connection drops,
+# the listener reconnects and refreshes once to catch up, and it also refreshes every
+# PUSH_FALLBACK_INTERVAL seconds in case a notification was lost.
+
+NOTIFY_FUNCTION_DDL = f"""
+    CREATE OR REPLACE FUNCTION notify_data_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('{NOTIFY_CHANNEL}', TG_OP);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+NOTIFY_TRIGGER_DDL = """
+    DROP TRIGGER IF EXISTS data_changed_notify ON data;
+    CREATE TRIGGER data_changed_notify
+    AFTER INSERT OR UPDATE OR DELETE ON data
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_data_changed()
+"""
+
+STREAM_KEEPALIVE = 15  # Seconds between comments that keep idle proxies from closing streams
+RECONNECT_DELAY = 5  # Seconds to wait before re-opening a failed LISTEN connection
+
+
+# ----------------------
+# Class: Change Broadcaster
+# ----------------------
+class ChangeBroadcaster:
+    """
+    Version counter that event streams can block on until it changes.
+
+    Attributes:
+        version (int): Incremented every time new data is available.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._changed = threading.Condition()
+
+    def publish(self):
+        """Announces a new data version to every waiting stream."""
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, seen_version, timeout):
+        """
+        Blocks until the version differs from `seen_version` or the timeout expires.
+
+        Args:
+            seen_version (int): Version the caller already knows about.
+            timeout (float): Longest time to wait, in seconds.
+
+        Returns:
+            int: The current version (equal to `seen_version` on timeout).
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != seen_version, timeout)
+            return self.version
+
+
+broadcaster = ChangeBroadcaster()
+_listener_started = False
+_listener_lock = threading.Lock()
+
+
+# ----------------------
+# Function: Ensure Notify Trigger
+# ----------------------
+def ensure_notify_trigger(conn):
+    """
+    Installs the trigger that sends NOTIFY on every change to the data table.
+
+    Args:
+        conn (psycopg2.extensions.connection): Open database connection.
+    """
+    with conn.cursor() as cur:
+        cur.execute(NOTIFY_FUNCTION_DDL)
+        cur.execute(NOTIFY_TRIGGER_DDL)
+    conn.commit()
+
+
+# ----------------------
+# Function: Listen for Changes
+# ----------------------
+def listen_for_changes(on_change, fallback_interval=PUSH_FALLBACK_INTERVAL):
+    """
+    Calls `on_change` whenever the data table changes; runs forever.
+
+    Args:
+        on_change (callable): Called without arguments once on (re)connect and then after
+            every burst of notifications, or after `fallback_interval` seconds of silence.
+        fallback_interval (float): Longest time between two calls of `on_change`.
+    """
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(
+                host=DB_HOST,
+                port=DB_PORT,
+                dbname=DB_NAME,
+                user=DB_USER,
+                password=DB_PASSWORD,
+                connect_timeout=DB_CONNECT_TIMEOUT,
+            )
+            ensure_notify_trigger(conn)
+            conn.autocommit = True  # Notifications are only delivered outside a transaction
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            print(f"Listening for changes on channel '{NOTIFY_CHANNEL}'.")
+
+            # Catch up on anything that changed while we were not listening
+            on_change()
+            while True:
+                readable, _, _ = select.select([conn], [], [], fallback_interval)
+                if readable:
+                    # Let a burst of statements (e.g. a chunked COPY) settle into one refresh
+                    time.sleep(NOTIFY_DEBOUNCE)
+                    conn.poll()
+                    conn.notifies.clear()
+                on_change()
+
+        except Exception as e:
+            print(f"Change listener error: {e}; reconnecting in {RECONNECT_DELAY} s")
+            time.sleep(RECONNECT_DELAY)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+# ----------------------
+# Function: Refresh Snapshot and Publish
+# ----------------------
+def _refresh_and_publish():
+    # Fetch the new rows into the in-process snapshot; announce only real changes
+    version = get_snapshot_version()
+    get_data_from_db()
+    if get_snapshot_version() != version:
+        broadcaster.publish()
+
+
+# ----------------------
+# Function: Watch Shared Snapshot
+# ----------------------
+def _watch_shared_snapshot(interval=0.5):
+    # In shared serving mode the refresher is the only database reader; workers only
+    # watch the snapshot's CURRENT pointer, a stat of one small file
+    seen = current_version()
+    while True:
+        time.sleep(interval)
+        version = current_version()
+        if version != seen:
+            seen = version
+            broadcaster.publish()
+
+
+# ----------------------
+# Function: Start Listener
+# ----------------------
+def start_listener():
+    """
+    Starts this process's change listener thread (once), matching the serving mode.
+    """
+    global _listener_started
+    with _listener_lock:
+        if _listener_started:
+            return
+        _listener_started = True
+
+    if SERVING_MODE == "shared":
+        target, args = _watch_shared_snapshot, ()
+    elif AGGREGATION_MODE == "sql":
+        # Views query Postgres directly, so there is no snapshot to refresh
+        target, args = listen_for_changes, (broadcaster.publish,)
+    else:
+        target, args = listen_for_changes, (_refresh_and_publish,)
+    threading.Thread(target=target, args=args, name="change-listener", daemon=True).start()
+
+
+# ----------------------
+# Function: Event Stream
+# ----------------------
+def event_stream():
+    """
+    Yields server-sent events carrying the data version whenever it changes.
+
+    Yields:
+        str: SSE messages ("data: <version>"), or keep-alive comments while idle.
+    """
+    seen = broadcaster.version
+    yield f"retry: {RECONNECT_DELAY * 1000}\ndata: {seen}\n\n"
+    while True:
+        version = broadcaster.wait_for_change(seen, STREAM_KEEPALIVE)
+        if version != seen:
+            seen = version
+            yield f"data: {version}\n\n"
+        else:
+            yield ": keep-alive\n\n"
+
+
+# ----------------------
+# Function: Register Update Stream
+# ----------------------
+def register_update_stream(server, route="/updates"):
+    """
+    Adds the server-sent events route browsers subscribe to.
+
+    Args:
+        server (flask.Flask): The Dash app's Flask server.
+        route (str): URL path of the stream.
+    """
+
+    @server.route(route)
+    def updates():
+        return Response(
+            event_stream(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
@@ -0,0 +1,287 @@
+import cProfile
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import Response, g, has_request_context, request
+
+from config import PROFILE_CALLBACKS, PROFILE_DIR, PROFILE_SLOW_SECONDS
+
+# ----------------------
+# Hot-Path Instrumentation
+# ----------------------
+# Histograms of where a dashboard update spends its time and how much it sends:
+#
+#   dashboard_stage_seconds{stage}        db_connect, db_query, db_fetch, process_data,
+#                                         durations, gantt_data, trajectories, figures,
+#                                         serialize, compress
+#   dashboard_callback_seconds{callback}  whole callback, as seen by the server
+#   dashboard_rows_fetched                rows returned per database fetch
+#   dashboard_response_bytes{callback}    JSON sent back per callback request
+#   dashboard_wire_bytes{callback}        the same after compression (see response_encoding)
+#   dashboard_callback_concurrency        callbacks running when one starts
+#
+# They are served in the Prometheus text format on /metrics. Values are per process: with
+# several gunicorn workers each one counts its own requests, so scrape them individually
+# (or sum them) rather than through a load balancer.
+#
+# Profiling: with PROFILE_CALLBACKS=1 every instrumented callback runs under cProfile, and
+# any that take PROFILE_SLOW_SECONDS or longer leave a trace in PROFILE_DIR (open it with
+# `python -m pstats` or snakeviz). A single request can opt in without the setting by
+# sending the header "X-Profile-Callback: 1" or the cookie "profile_callbacks=1".
+
+# Bucket upper bounds (seconds / rows / bytes); +Inf is added when rendering
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+# ----------------------
+# Class: Histogram
+# ----------------------
+class Histogram:
+    """
+    Cumulative histogram with optional labels, rendered in the Prometheus text format.
+
+    Attributes:
+        name (str): Metric name.
+        help (str): One-line description.
+        buckets (tuple of float): Bucket upper bounds, ascending.
+        label_name (str or None): Name of the single label, if the metric has one.
+    """
+
+    def __init__(self, name, help, buckets, label_name=None):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.label_name = label_name
+        self._series = {}  # label value -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, label=None):
+        """
+        Records one observation.
+
+        Args:
+            value (float): The observed value.
+            label (str, optional): Value of the metric's label.
+        """
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        """
+        Renders the histogram.
+
+        Returns:
+            list of str: Exposition lines (HELP, TYPE, buckets, sum and count per label).
+        """
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = sorted(
+                (label, list(series)) for label, series in self._series.items()
+            )
+        for label, series in series_items:
+            prefix = f'{self.label_name}="{label}",' if self.label_name else ""
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-1]}')
+            selector = f"{{{prefix[:-1]}}}" if prefix else ""
+            lines.append(f"{self.name}_sum{selector} {series[-2]}")
+            lines.append(f"{self.name}_count{selector} {series[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "dashboard_stage_seconds", "Time spent in each stage of a dashboard update.", TIME_BUCKETS, "stage"
+)
+CALLBACK_SECONDS = Histogram(
+    "dashboard_callback_seconds", "Server-side duration of dashboard callbacks.", TIME_BUCKETS, "callback"
+)
+ROWS_FETCHED = Histogram(
+    "dashboard_rows_fetched", "Rows returned by each database fetch.", ROW_BUCKETS
+)
+RESPONSE_BYTES = Histogram(
+    "dashboard_response_bytes", "JSON bytes sent back per callback request.", BYTE_BUCKETS, "callback"
+)
+WIRE_BYTES = Histogram(
+    "dashboard_wire_bytes", "Compressed bytes sent back per callback request.", BYTE_BUCKETS, "callback"
+)
+CALLBACK_CONCURRENCY = Histogram(
+    "dashboard_callback_concurrency",
+    "Callbacks already running when a callback starts (including itself).",
+    (1, 2, 4, 8, 16, 32, 64),
+)
+HISTOGRAMS = [
+    STAGE_SECONDS,
+    CALLBACK_SECONDS,
+    ROWS_FETCHED,
+    RESPONSE_BYTES,
+    WIRE_BYTES,
+    CALLBACK_CONCURRENCY,
+]
+
+_in_progress = {"count": 0}
+_in_progress_lock = threading.Lock()
+# cProfile can only profile one thread's work at a time reliably, so overlapping
+# callbacks are not profiled while another profile is being taken
+_profile_lock = threading.Lock()
+
+
+# ----------------------
+# Function: Time a Stage
+# ----------------------
+@contextmanager
+def stage_timer(stage):
+    """
+    Times the body of a `with` block as one stage of a dashboard update.
+
+    Args:
+        stage (str): Stage name (the "stage" label of dashboard_stage_seconds).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage)
+
+
+# ----------------------
+# Function: Profiling Requested
+# ----------------------
+def _profiling_requested():
+    # On for every callback via the setting, or for one request via header or cookie
+    if PROFILE_CALLBACKS:
+        return True
+    if not has_request_context():
+        return False
+    return (
+        request.headers.get("X-Profile-Callback") == "1"
+        or request.cookies.get("profile_callbacks") == "1"
+    )
+
+
+# ----------------------
+# Function: Save Profile
+# ----------------------
+def _save_profile(profiler, name, elapsed):
+    # File names sort by time and show which callback was slow and by how much
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(
+            PROFILE_DIR,
+            f"{datetime.now():%Y%m%d-%H%M%S-%f}-{name}-{elapsed * 1000:.0f}ms.prof",
+        )
+        profiler.dump_stats(path)
+        print(f"Slow callback {name} took {elapsed:.2f} s; profile written to {path}")
+    except OSError as e:
+        print(f"Could not write callback profile: {e}")
+
+
+# ----------------------
+# Decorator: Instrument Callback
+# ----------------------
+def instrument_callback(name):
+    """
+    Records duration, concurrency and response size of a Dash callback, and profiles it on request.
+
+    Apply it below `@app.callback` so Dash registers the instrumented function.
+
+    Args:
+        name (str): Callback name (the "callback" label of the metrics).
+
+    Returns:
+        callable: Decorator.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _in_progress_lock:
+                _in_progress["count"] += 1
+                running = _in_progress["count"]
+            CALLBACK_CONCURRENCY.observe(running)
+
+            profiler = None
+            if _profiling_requested() and _profile_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+            start = time.perf_counter()
+            try:
+                if profiler is not None:
+                    return profiler.runcall(function, *args, **kwargs)
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                CALLBACK_SECONDS.observe(elapsed, name)
+                with _in_progress_lock:
+                    _in_progress["count"] -= 1
+                if profiler is not None:
+                    _profile_lock.release()
+                    if elapsed >= PROFILE_SLOW_SECONDS:
+                        _save_profile(profiler, name, elapsed)
+                if has_request_context():
+                    # Dash serializes the outputs after we return; see register_metrics
+                    g.instrumented_callback = name
+                    g.callback_finished = time.perf_counter()
+
+        return wrapper
+
+    return decorator
+
+
+# ----------------------
+# Function: Render Metrics
+# ----------------------
+def render_metrics():
+    """
+    Renders every metric in the Prometheus text exposition format.
+
+    Returns:
+        str: The exposition text.
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    with _in_progress_lock:
+        running = _in_progress["count"]
+    lines.append("# HELP dashboard_callbacks_in_progress Callbacks currently running.")
+    lines.append("# TYPE dashboard_callbacks_in_progress gauge")
+    lines.append(f"dashboard_callbacks_in_progress {running}")
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------
+# Function: Register Metrics
+# ----------------------
+def register_metrics(server, route="/metrics"):
+    """
+    Adds the metrics route and measures serialization and size of callback responses.
+
+    Args:
+        server (flask.Flask): The Dash app's Flask server.
+        route (str): URL path of the metrics.
+    """
+
+    @server.after_request
+    def record_response(response):
+        name = g.get("instrumented_callback")
+        if name is not None:
+            # Time from the callback's return to here is Dash encoding the outputs as JSON
+            STAGE_SECONDS.observe(time.perf_counter() - g.callback_finished, "serialize")
+            if not response.direct_passthrough:
+                RESPONSE_BYTES.observe(response.calculate_content_length() or 0, name)
+        return response
+
+    @server.route(route)
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
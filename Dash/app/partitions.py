@@ -0,0 +1,419 @@
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+from config import (
+    DB_HOST,
+    DB_PORT,
+    DB_NAME,
+    DB_USER,
+    DB_PASSWORD,
+    DB_CONNECT_TIMEOUT,
+    PARTITION_PREMAKE_DAYS,
+    PARTITION_RETENTION_DAYS,
+    PARTITION_MAINTENANCE_INTERVAL,
+)
+from database import (
+    AGGREGATION_INDEX_DDL,
+    data_is_partitioned,
+    ensure_dirty_day_tracking,
+    pooled_connection,
+)
+
+# ----------------------
+# Daily Partitions of the Data Table
+# ----------------------
+# `data` is range-partitioned on phase_timestamp, one partition per day (data_p20240516
+# holds 2024-05-16 00:00 up to 2024-05-17 00:00). Queries that filter on a day or on
+# "newer than the watermark" then only open the matching partitions (partition pruning),
+# and dropping a day of history is a metadata change instead of a DELETE.
+#
+# Indexes, created on the parent and inherited by every partition:
+#   - unique B-tree (phase_timestamp, target_id, phase): rejects duplicate rows (ingest's
+#     ON CONFLICT), streams rows in the order the app fetches them, and answers MIN/MAX
+#     probes. Rows arrive roughly in time order, so inserts land on the rightmost leaf.
+#   - BRIN (phase_timestamp): a few pages per partition; serves wide time-range scans of
+#     append-ordered data where a bitmap over block ranges beats walking the B-tree.
+#   - B-tree (target_id, phase_timestamp): per-target order for the SQL mode's LEAD windows.
+#
+# Rows outside every daily partition land in data_default, so inserts never fail;
+# maintenance moves them into their own partitions. Maintenance (partitions.py from cron,
+# or the app's background thread) creates partitions PARTITION_PREMAKE_DAYS ahead and drops
+# those older than PARTITION_RETENTION_DAYS.
+
+DEFAULT_PARTITION = "data_default"
+
+PARTITIONED_SCHEMA_DDL = """
+    CREATE TABLE IF NOT EXISTS data (
+        target_id text NOT NULL,
+        phase_timestamp timestamp without time zone NOT NULL,
+        phase text NOT NULL
+    ) PARTITION BY RANGE (phase_timestamp)
+"""
+DEFAULT_PARTITION_DDL = f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF data DEFAULT"
+PARTITION_INDEX_DDL = [
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS data_phase_timestamp_target_id_phase_key
+    ON data (phase_timestamp, target_id, phase)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS data_phase_timestamp_brin
+    ON data USING brin (phase_timestamp) WITH (pages_per_range = 32)
+    """,
+    AGGREGATION_INDEX_DDL,
+]
+
+# Daily partitions of `data`, read from the catalog
+DAY_PARTITIONS_QUERY = r"""
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'data'::regclass
+      AND c.relname ~ '^data_p\d{8}$'
+"""
+
+# Only one process maintains partitions at a time (several app workers may try)
+MAINTENANCE_LOCK_SQL = "SELECT pg_try_advisory_xact_lock(hashtext('data_partition_maintenance'))"
+
+
+# ----------------------
+# Function: Partition Name
+# ----------------------
+def partition_name(day):
+    """
+    Returns the name of a day's partition.
+
+    Args:
+        day (datetime.date): The day.
+
+    Returns:
+        str: e.g. "data_p20240516".
+    """
+    return f"data_p{day:%Y%m%d}"
+
+
+# ----------------------
+# Function: List Day Partitions
+# ----------------------
+def list_day_partitions(cur):
+    """
+    Lists the daily partitions of the data table.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Open cursor.
+
+    Returns:
+        dict: {datetime.date: partition name}, ordered by day.
+    """
+    cur.execute(DAY_PARTITIONS_QUERY)
+    days = {
+        datetime.strptime(name[len("data_p"):], "%Y%m%d").date(): name
+        for (name,) in cur.fetchall()
+    }
+    return dict(sorted(days.items()))
+
+
+# ----------------------
+# Function: Create Day Partition
+# ----------------------
+def create_day_partition(cur, day):
+    """
+    Creates the partition of one day, moving in any of its rows held by the default partition.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Open cursor, inside the caller's transaction.
+        day (datetime.date): The day.
+
+    Returns:
+        bool: True if the partition was created, False if it already existed.
+    """
+    name = partition_name(day)
+    cur.execute("SELECT to_regclass(%s)", (name,))
+    if cur.fetchone()[0] is not None:
+        return False
+
+    bounds = (day, day + timedelta(days=1))
+    cur.execute(
+        f"""
+        SELECT EXISTS (
+            SELECT 1 FROM {DEFAULT_PARTITION}
+            WHERE phase_timestamp >= %s AND phase_timestamp < %s
+        )
+        """,
+        bounds,
+    )
+    if not cur.fetchone()[0]:
+        cur.execute(
+            f"CREATE TABLE {name} PARTITION OF data FOR VALUES FROM (%s) TO (%s)", bounds
+        )
+        return True
+
+    # The default partition may not keep rows that belong to a new partition, so move
+    # them into a plain table first and attach that as the partition
+    cur.execute(f"CREATE TABLE {name} (LIKE data INCLUDING DEFAULTS)")
+    cur.execute(
+        f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE phase_timestamp >= %s AND phase_timestamp < %s
+            RETURNING target_id, phase_timestamp, phase
+        )
+        INSERT INTO {name} (target_id, phase_timestamp, phase)
+        SELECT target_id, phase_timestamp, phase FROM moved
+        """,
+        bounds,
+    )
+    print(f"Moved {cur.rowcount} rows of {day} out of the default partition.")
+    cur.execute(f"ALTER TABLE data ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", bounds)
+    return True
+
+
+# ----------------------
+# Function: Ensure Day Partitions
+# ----------------------
+def ensure_day_partitions(cur, days):
+    """
+    Creates the partitions of the given days that do not exist yet.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Open cursor, inside the caller's transaction.
+        days (iterable of datetime.date): Days that need a partition.
+
+    Returns:
+        int: Number of partitions created.
+    """
+    return sum(create_day_partition(cur, day) for day in sorted(set(days)))
+
+
+# ----------------------
+# Function: Drop Expired Partitions
+# ----------------------
+def drop_expired_partitions(cur, keep_from):
+    """
+    Drops the partitions (and rollups) of days before `keep_from`.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Open cursor, inside the caller's transaction.
+        keep_from (datetime.date): First day to keep.
+
+    Returns:
+        list of datetime.date: Days whose partitions were dropped.
+    """
+    dropped = [day for day in list_day_partitions(cur) if day < keep_from]
+    for day in dropped:
+        cur.execute(f"DROP TABLE {partition_name(day)}")
+    cur.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE phase_timestamp < %s", (keep_from,))
+
+    # Statistics of dropped days would otherwise outlive their rows
+    for table in ("phase_daily_rollup", "phase_daily_sketch", "phase_dirty_days"):
+        cur.execute("SELECT to_regclass(%s)", (table,))
+        if cur.fetchone()[0] is not None:
+            cur.execute(f"DELETE FROM {table} WHERE day < %s", (keep_from,))
+    return dropped
+
+
+# ----------------------
+# Function: Create Partitioned Schema
+# ----------------------
+def create_partitioned_schema(cur):
+    """
+    Creates the partitioned data table, its default partition, indexes and rollup tables,
+    if missing.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Open cursor, inside the caller's transaction.
+    """
+    cur.execute(PARTITIONED_SCHEMA_DDL)
+    cur.execute(DEFAULT_PARTITION_DDL)
+    for ddl in PARTITION_INDEX_DDL:
+        cur.execute(ddl)
+    ensure_dirty_day_tracking(cur)
+
+
+# ----------------------
+# Function: Maintain Partitions
+# ----------------------
+def maintain_partitions(
+    conn, premake_days=PARTITION_PREMAKE_DAYS, retention_days=PARTITION_RETENTION_DAYS
+):
+    """
+    Creates upcoming and missing daily partitions and drops expired ones.
+
+    Args:
+        conn (psycopg2.extensions.connection): Open database connection.
+        premake_days (int): Days after today to create partitions for.
+        retention_days (int): Days of history to keep (0 keeps everything).
+
+    Returns:
+        tuple: (partitions created, list of days dropped), or (0, []) if the table is not
+        partitioned or another process is maintaining it.
+    """
+    with conn.cursor() as cur:
+        if not data_is_partitioned(cur):
+            return 0, []
+        cur.execute(MAINTENANCE_LOCK_SQL)
+        if not cur.fetchone()[0]:
+            conn.rollback()
+            return 0, []
+
+        # "Today" is the database's, as that is the clock rows are stamped with
+        cur.execute("SELECT CURRENT_DATE")
+        today = cur.fetchone()[0]
+        days = [today + timedelta(days=i) for i in range(premake_days + 1)]
+        # Give rows that fell into the default partition a partition of their own
+        cur.execute(f"SELECT DISTINCT DATE(phase_timestamp) FROM {DEFAULT_PARTITION}")
+        days.extend(day for (day,) in cur.fetchall())
+
+        dropped = []
+        if retention_days > 0:
+            keep_from = today - timedelta(days=retention_days)
+            days = [day for day in days if day >= keep_from]
+            dropped = drop_expired_partitions(cur, keep_from)
+        created = ensure_day_partitions(cur, days)
+    conn.commit()
+    return created, dropped
+
+
+# ----------------------
+# Function: Migrate to Partitioned Schema
+# ----------------------
+def migrate_to_partitioned(conn):
+    """
+    Converts a plain data table into the partitioned layout, in one transaction.
+
+    The rows are copied into daily partitions (duplicates are dropped on the way) and the
+    old table is removed. The table is locked while this runs.
+
+    Args:
+        conn (psycopg2.extensions.connection): Open database connection.
+
+    Returns:
+        int: Number of rows copied, or 0 if the table was already partitioned.
+    """
+    with conn.cursor() as cur:
+        if data_is_partitioned(cur):
+            return 0
+        cur.execute("SELECT to_regclass('data') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            create_partitioned_schema(cur)
+            conn.commit()
+            return 0
+
+        # Keep the old table (and its index names) out of the way of the new schema
+        cur.execute(
+            "SELECT tgname FROM pg_trigger WHERE tgrelid = 'data'::regclass AND NOT tgisinternal"
+        )
+        triggers = [name for (name,) in cur.fetchall()]
+        cur.execute("ALTER TABLE data RENAME TO data_unpartitioned")
+        cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'data_unpartitioned'")
+        for (index,) in cur.fetchall():
+            cur.execute(f'ALTER INDEX "{index}" RENAME TO "{index[:50]}_unpartitioned"')
+
+        create_partitioned_schema(cur)
+        cur.execute("SELECT DISTINCT DATE(phase_timestamp) FROM data_unpartitioned")
+        ensure_day_partitions(cur, [day for (day,) in cur.fetchall() if day is not None])
+        cur.execute(
+            """
+            INSERT INTO data (target_id, phase_timestamp, phase)
+            SELECT target_id, phase_timestamp, phase
+            FROM data_unpartitioned
+            WHERE target_id IS NOT NULL AND phase_timestamp IS NOT NULL AND phase IS NOT NULL
+            ON CONFLICT DO NOTHING
+            """
+        )
+        copied = cur.rowcount
+        cur.execute("DROP TABLE data_unpartitioned")
+        # The copied rows are the ones the rollups were built from
+        cur.execute("DELETE FROM phase_dirty_days")
+
+        if "data_changed_notify" in triggers:
+            # Push mode's change trigger lived on the old table
+            from live_updates import NOTIFY_TRIGGER_DDL
+
+            cur.execute(NOTIFY_TRIGGER_DDL)
+    conn.commit()
+    return copied
+
+
+# ----------------------
+# Function: Start Partition Maintenance
+# ----------------------
+def start_partition_maintenance(interval=PARTITION_MAINTENANCE_INTERVAL):
+    """
+    Runs `maintain_partitions` every `interval` seconds in a background thread.
+
+    Args:
+        interval (float): Seconds between runs; 0 or less does nothing.
+    """
+    if interval <= 0:
+        return
+
+    def run():
+        while True:
+            try:
+                with pooled_connection() as conn:
+                    created, dropped = maintain_partitions(conn)
+                if created or dropped:
+                    print(f"Partition maintenance: {created} created, {len(dropped)} dropped.")
+            except Exception as e:
+                print(f"Partition maintenance error: {e}")
+            time.sleep(interval)
+
+    threading.Thread(target=run, name="partition-maintenance", daemon=True).start()
+
+
+# ----------------------
+# Function: Main
+# ----------------------
+def main():
+    """
+    Command line entry point: migrates or maintains the partitioned data table.
+    """
+    parser = argparse.ArgumentParser(description="Manage the daily partitions of the data table.")
+    parser.add_argument(
+        "--migrate", action="store_true", help="convert a plain data table into daily partitions"
+    )
+    parser.add_argument(
+        "--premake", type=int, default=PARTITION_PREMAKE_DAYS, help="days ahead to create"
+    )
+    parser.add_argument(
+        "--retention",
+        type=int,
+        default=PARTITION_RETENTION_DAYS,
+        help="days of history to keep (0 keeps everything)",
+    )
+    parser.add_argument("--list", action="store_true", help="print the daily partitions")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        connect_timeout=DB_CONNECT_TIMEOUT,
+    )
+    try:
+        with conn.cursor() as cur:
+            if not args.migrate and not data_is_partitioned(cur):
+                print("The data table is not partitioned; run with --migrate to convert it.")
+                return
+        if args.migrate:
+            started = time.monotonic()
+            copied = migrate_to_partitioned(conn)
+            print(f"Copied {copied} rows into daily partitions in {time.monotonic() - started:.1f} s.")
+        created, dropped = maintain_partitions(conn, args.premake, args.retention)
+        print(f"{created} partitions created, {len(dropped)} dropped.")
+        if args.list:
+            with conn.cursor() as cur:
+                for day, name in list_day_partitions(cur).items():
+                    print(f"{day}  {name}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
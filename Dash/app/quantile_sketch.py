@@ -0,0 +1,223 @@
+import math
+
+import numpy as np
+
+# ----------------------
+# Mergeable Quantile Sketches
+# ----------------------
+# A t-digest summarizes a stream of durations as about a hundred centroids (mean, weight):
+# small near the extremes and larger in the middle, so tail percentiles (p90, p99) stay
+# accurate while the sketch stays a fixed, small size however many values it has seen.
+# Two digests merge into one that summarizes both streams, so a per-phase digest kept for
+# each day answers any range of days by merging, without revisiting raw events.
+#
+# Centroids are sized with the k1 scale function k(q) = compression / (2 pi) * asin(2q - 1):
+# every centroid spans at most one unit of k. Building and merging are deterministic, so
+# the same events always give the same percentiles.
+
+DEFAULT_COMPRESSION = 200
+
+# Duration statistics the bar charts can show: label and quantile (None = mean)
+STATISTICS = {
+    "mean": ("Average", None),
+    "p50": ("Median", 0.5),
+    "p90": ("90th Percentile", 0.9),
+    "p99": ("99th Percentile", 0.99),
+}
+
+
+# ----------------------
+# Class: T-Digest
+# ----------------------
+class TDigest:
+    """
+    Mergeable quantile sketch (merging t-digest).
+
+    Attributes:
+        compression (int): Accuracy/size trade-off; about compression / 2 centroids are kept.
+        count (float): Total weight (number of values) summarized.
+        min (float): Smallest value seen (inf when empty).
+        max (float): Largest value seen (-inf when empty).
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer = []  # Values added since the last compression
+
+    @classmethod
+    def from_values(cls, values, compression=DEFAULT_COMPRESSION):
+        """
+        Builds a digest from a batch of values in one pass.
+
+        Args:
+            values (iterable of float): Values to summarize.
+            compression (int): See the class attributes.
+
+        Returns:
+            TDigest: The digest.
+        """
+        digest = cls(compression)
+        values = np.asarray(values, dtype=float)
+        if len(values):
+            digest._absorb(values, np.ones(len(values)))
+        return digest
+
+    def add(self, value):
+        """
+        Adds one value.
+
+        Args:
+            value (float): The value.
+        """
+        self._buffer.append(value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._flush()
+
+    def merge(self, other):
+        """
+        Adds everything another digest summarizes to this one.
+
+        Args:
+            other (TDigest): Digest to merge in (left unchanged).
+
+        Returns:
+            TDigest: This digest, for chaining.
+        """
+        other._flush()
+        self._flush()
+        if other.count:
+            self._absorb(other._means, other._weights, other.min, other.max)
+        return self
+
+    def _flush(self):
+        # Fold buffered single values into the centroids
+        if self._buffer:
+            values = np.asarray(self._buffer, dtype=float)
+            self._buffer = []
+            self._absorb(values, np.ones(len(values)))
+
+    def _absorb(self, means, weights, low=None, high=None):
+        # Merge new centroids with the existing ones, then re-cluster along the k scale
+        means = np.concatenate([self._means, means])
+        weights = np.concatenate([self._weights, weights])
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        self.min = min(self.min, means[0] if low is None else low)
+        self.max = max(self.max, means[-1] if high is None else high)
+        total = weights.sum()
+        self.count = float(total)
+
+        # Each centroid goes to the k unit its center falls in; runs of one unit merge
+        centers = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * centers - 1)
+        clusters = np.floor(k)
+        starts = np.flatnonzero(np.r_[True, clusters[1:] != clusters[:-1]])
+        merged_weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / merged_weights
+        self._weights = merged_weights
+
+    def quantile(self, q):
+        """
+        Estimates a quantile of the summarized values.
+
+        Args:
+            q (float): Quantile between 0 and 1 (0.5 = median).
+
+        Returns:
+            float or None: The estimate, or None if the digest is empty.
+        """
+        self._flush()
+        if not self.count:
+            return None
+        # Each centroid's mean sits at the middle of its weight; interpolate between them,
+        # with the exact minimum and maximum at the ends
+        centers = np.cumsum(self._weights) - self._weights / 2
+        positions = np.r_[0.0, centers, self.count]
+        values = np.r_[self.min, self._means, self.max]
+        return float(np.interp(q * self.count, positions, values))
+
+    def to_dict(self):
+        """
+        Returns a JSON-serializable form of the digest (see `from_dict`).
+
+        Returns:
+            dict: Compression, min, max and [mean, weight] centroids.
+        """
+        self._flush()
+        return {
+            "compression": self.compression,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "centroids": [[float(m), float(w)] for m, w in zip(self._means, self._weights)],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restores a digest saved with `to_dict`.
+
+        Args:
+            data (dict): Output of `to_dict`.
+
+        Returns:
+            TDigest: The digest.
+        """
+        digest = cls(data["compression"])
+        if data["centroids"]:
+            centroids = np.asarray(data["centroids"], dtype=float)
+            digest._means = centroids[:, 0]
+            digest._weights = centroids[:, 1]
+            digest.count = float(digest._weights.sum())
+            digest.min = data["min"]
+            digest.max = data["max"]
+        return digest
+
+
+# ----------------------
+# Function: Merge Phase Sketches
+# ----------------------
+def merge_phase_sketches(phase_sketches, into=None):
+    """
+    Merges per-phase digests (e.g. one dictionary per day) into one digest per phase.
+
+    Args:
+        phase_sketches (dict): {phase: TDigest} to merge in.
+        into (dict, optional): {phase: TDigest} to merge into (modified); a new one by default.
+
+    Returns:
+        dict: {phase: TDigest}, phases in order of first appearance.
+    """
+    merged = {} if into is None else into
+    for phase, sketch in phase_sketches.items():
+        if phase not in merged:
+            merged[phase] = TDigest(sketch.compression)
+        merged[phase].merge(sketch)
+    return merged
+
+
+# ----------------------
+# Function: Calculate Duration Statistic
+# ----------------------
+def calculate_duration_statistic(phase_sketches, statistic):
+    """
+    Reads a percentile of each phase's duration from its sketch.
+
+    Args:
+        phase_sketches (dict): {phase: TDigest} of durations in seconds.
+        statistic (str): A key of STATISTICS other than "mean" (e.g. "p90").
+
+    Returns:
+        dict: {phase: minutes}, rounded to 2 decimals like `calculate_average_duration`.
+    """
+    _, q = STATISTICS[statistic]
+    return {
+        phase: round(sketch.quantile(q) / 60, 2)
+        for phase, sketch in phase_sketches.items()
+        if sketch.count
+    }
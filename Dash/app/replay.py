@@ -0,0 +1,285 @@
+import bisect
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from config import REPLAY_CACHE_SIZE, REPLAY_CHECKPOINT_EVENTS
+from quantile_sketch import TDigest
+
+# ----------------------
+# Historical Replay
+# ----------------------
+# Replays the phase events of a selection in time order, so a debrief can watch the
+# statistics and the Gantt chart evolve as they did during the exercise:
+#
+#   events:      sorted by time once, when the engine is built
+#   position:    number of events applied so far (everything up to the cursor)
+#   aggregates:  per-phase duration sums, counts and sketches, each target's open phase,
+#                and how many Gantt bars are closed so far
+#   bars:        closed Gantt bars in event order, up to the furthest point replayed (a
+#                bar never changes once closed, so going back only lowers the count)
+#
+# Moving the cursor forward applies only the events in between: each event closes its
+# target's open phase (adding one duration and one bar) and opens a new one, exactly as
+# `calculate_phase_durations_and_counts` and `build_gantt_data` pair consecutive events of
+# a target on the same day. Every REPLAY_CHECKPOINT_EVENTS events the aggregates are saved,
+# so moving the cursor back restores the nearest earlier checkpoint and replays at most
+# that many events instead of starting over.
+#
+# Cursors are seconds since the epoch, with the event timestamps read as UTC.
+
+NS_PER_SECOND = 10**9
+NS_PER_DAY = 86400 * NS_PER_SECOND
+
+
+# ----------------------
+# Class: Replay State
+# ----------------------
+class ReplayState:
+    """
+    Statistics and Gantt bars of a selection as of a replay cursor.
+
+    Attributes:
+        cursor (pandas.Timestamp): Time the replay has reached.
+        events_applied (int): Events at or before the cursor.
+        event_count (int): Events in the whole selection.
+        phase_durations (dict): Total seconds per phase, as from `calculate_phase_durations_and_counts`.
+        phase_counts (dict): Completed occurrences per phase.
+        phase_sketches (dict): {phase: TDigest} of the completed durations.
+        gantt_data (pandas.DataFrame): Columns 'Task', 'Start', 'Finish' and 'Target ID'. A
+            target's current phase on the cursor's day runs up to the cursor.
+    """
+
+    def __init__(
+        self,
+        cursor,
+        events_applied,
+        event_count,
+        phase_durations,
+        phase_counts,
+        phase_sketches,
+        gantt_data,
+    ):
+        self.cursor = cursor
+        self.events_applied = events_applied
+        self.event_count = event_count
+        self.phase_durations = phase_durations
+        self.phase_counts = phase_counts
+        self.phase_sketches = phase_sketches
+        self.gantt_data = gantt_data
+
+
+# ----------------------
+# Class: Replay Engine
+# ----------------------
+class ReplayEngine:
+    """
+    Incremental statistics over the events of one selection, positioned at a time cursor.
+
+    Attributes:
+        selected_date (str): The selection replayed ("all" or "YYYY-MM-DD").
+        event_count (int): Events in the selection.
+    """
+
+    def __init__(self, rows, selected_date="all", checkpoint_every=REPLAY_CHECKPOINT_EVENTS):
+        """
+        Args:
+            rows (iterable of tuples or DataFrame): (target_id, phase_timestamp, phase) rows.
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+            checkpoint_every (int): Events between saved aggregate states.
+        """
+        if not isinstance(rows, pd.DataFrame):
+            rows = pd.DataFrame(list(rows), columns=["target_id", "phase_timestamp", "phase"])
+        timestamps = rows["phase_timestamp"]
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps)
+        times = timestamps.to_numpy().astype("datetime64[ns]").astype(np.int64)
+        keep = np.ones(len(times), dtype=bool)
+        if selected_date != "all":
+            keep = times // NS_PER_DAY == pd.Timestamp(selected_date).value // NS_PER_DAY
+
+        # One stable sort; events with equal timestamps keep their order
+        order = np.flatnonzero(keep)[np.argsort(times[keep], kind="stable")]
+        self.selected_date = selected_date
+        self.event_count = len(order)
+        self._times = times[order]
+        self._time_list = self._times.tolist()
+        self._targets = rows["target_id"].astype(str).to_numpy(dtype=object)[order].tolist()
+        self._phases = rows["phase"].astype(str).to_numpy(dtype=object)[order].tolist()
+
+        self._checkpoint_every = max(1, checkpoint_every)
+        self._lock = threading.Lock()
+        self._reset()
+        self._checkpoints = [self._save()]  # Checkpoint k holds the state at event k * checkpoint_every
+
+    def bounds(self):
+        """
+        Returns the time span of the selection.
+
+        Returns:
+            tuple or None: (first, last) event time in epoch seconds, or None without events.
+        """
+        if not self.event_count:
+            return None
+        return self._time_list[0] / NS_PER_SECOND, self._time_list[-1] / NS_PER_SECOND
+
+    def _reset(self):
+        # Aggregates before the first event
+        self._position = 0
+        self._durations = {}
+        self._counts = {}
+        self._sketches = {}
+        self._open = {}  # target -> (phase, start ns, day) of its current phase
+        # Closed Gantt bars, as columns; the first _bar_count are closed at the position
+        self._bar_targets, self._bar_phases, self._bar_starts, self._bar_finishes = [], [], [], []
+        self._bar_count = 0
+
+    def _save(self):
+        # Copy of the aggregates; closed bars are kept anyway, so their count is enough
+        return (
+            self._position,
+            dict(self._durations),
+            dict(self._counts),
+            {phase: sketch.to_dict() for phase, sketch in self._sketches.items()},
+            dict(self._open),
+            self._bar_count,
+        )
+
+    def _restore(self, checkpoint):
+        position, durations, counts, sketches, open_phases, bar_count = checkpoint
+        self._position = position
+        self._durations = dict(durations)
+        self._counts = dict(counts)
+        self._sketches = {phase: TDigest.from_dict(data) for phase, data in sketches.items()}
+        self._open = dict(open_phases)
+        self._bar_count = bar_count
+
+    def _apply(self, stop):
+        # Apply events [position, stop): each one closes its target's open phase
+        durations, counts, sketches, open_phases = (
+            self._durations, self._counts, self._sketches, self._open
+        )
+        for i in range(self._position, stop):
+            target, phase, time = self._targets[i], self._phases[i], self._time_list[i]
+            day = time // NS_PER_DAY
+            previous = open_phases.get(target)
+            if previous is not None:
+                previous_phase, start, previous_day = previous
+                # A phase lasts until the target's next phase on the same day; the last
+                # phase of a day finishes when it starts
+                finish = time if previous_day == day else start
+                if previous_day == day:
+                    seconds = (time - start) / NS_PER_SECOND
+                    durations[previous_phase] = durations.get(previous_phase, 0) + seconds
+                    counts[previous_phase] = counts.get(previous_phase, 0) + 1
+                    sketch = sketches.get(previous_phase)
+                    if sketch is None:
+                        sketch = sketches[previous_phase] = TDigest()
+                    sketch.add(seconds)
+                # Replaying events again closes the same bars; only new ones are stored
+                if self._bar_count == len(self._bar_targets):
+                    self._bar_targets.append(target)
+                    self._bar_phases.append(previous_phase)
+                    self._bar_starts.append(start)
+                    self._bar_finishes.append(finish)
+                self._bar_count += 1
+            open_phases[target] = (phase, time, day)
+        self._position = stop
+
+    def _seek(self, position):
+        # Restore the nearest checkpoint if the cursor moved back (or past a saved one)
+        saved = min(position // self._checkpoint_every, len(self._checkpoints) - 1)
+        if position < self._position or saved * self._checkpoint_every > self._position:
+            self._restore(self._checkpoints[saved])
+        # Apply events up to the target position, saving checkpoints on the way
+        every = self._checkpoint_every
+        while self._position < position:
+            stop = min(position, (self._position // every + 1) * every)
+            self._apply(stop)
+            if stop % every == 0 and stop // every == len(self._checkpoints):
+                self._checkpoints.append(self._save())
+
+    def state_at(self, cursor):
+        """
+        Moves the replay to a cursor and returns the statistics as of that time.
+
+        Args:
+            cursor (float): Epoch seconds; events at or before it are applied.
+
+        Returns:
+            ReplayState: Copies of the aggregates, safe to use while the replay moves on.
+        """
+        cursor_ns = int(round(cursor * NS_PER_SECOND))
+        with self._lock:
+            self._seek(bisect.bisect_right(self._time_list, cursor_ns))
+
+            # Open phases run up to the cursor on its own day, like a live view
+            cursor_day = cursor_ns // NS_PER_DAY
+            open_targets, open_phases, open_starts, open_finishes = [], [], [], []
+            for target, (phase, start, day) in self._open.items():
+                open_targets.append(target)
+                open_phases.append(phase)
+                open_starts.append(start)
+                open_finishes.append(max(cursor_ns, start) if day == cursor_day else start)
+            closed = self._bar_count
+            gantt_data = pd.DataFrame(
+                {
+                    "Task": self._bar_phases[:closed] + open_phases,
+                    "Start": np.array(
+                        self._bar_starts[:closed] + open_starts, dtype="datetime64[ns]"
+                    ),
+                    "Finish": np.array(
+                        self._bar_finishes[:closed] + open_finishes, dtype="datetime64[ns]"
+                    ),
+                    "Target ID": self._bar_targets[:closed] + open_targets,
+                }
+            )
+            return ReplayState(
+                pd.Timestamp(cursor_ns),
+                self._position,
+                self.event_count,
+                dict(self._durations),
+                dict(self._counts),
+                {
+                    phase: TDigest.from_dict(sketch.to_dict())
+                    for phase, sketch in self._sketches.items()
+                },
+                gantt_data,
+            )
+
+
+# Engines built in this process, keyed by (data version, selected date); building one
+# sorts the selection, so browsers replaying the same data share it
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+# ----------------------
+# Function: Get Replay Engine
+# ----------------------
+def get_replay_engine(source_key, selected_date, load_rows):
+    """
+    Returns the replay engine for a data version and date, building it on first use.
+
+    Args:
+        source_key (str): Version of the selection's rows (changes whenever they change).
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+        load_rows (callable): Returns the rows (see `ReplayEngine`); only called on a cache miss.
+
+    Returns:
+        ReplayEngine: The engine.
+    """
+    key = (source_key, selected_date)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is not None:
+            _engines.move_to_end(key)
+            return engine
+    engine = ReplayEngine(load_rows(), selected_date)
+    with _engines_lock:
+        engine = _engines.setdefault(key, engine)
+        while len(_engines) > REPLAY_CACHE_SIZE:
+            _engines.popitem(last=False)
+    return engine
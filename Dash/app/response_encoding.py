@@ -0,0 +1,167 @@
+import gzip
+import threading
+import time
+
+import plotly.io as pio
+from flask import g, request
+
+from config import BROTLI_QUALITY, COMPRESS_LEVEL, COMPRESS_MIN_BYTES, JSON_ENGINE
+from metrics import STAGE_SECONDS, WIRE_BYTES
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# ----------------------
+# Response Encoding
+# ----------------------
+# What each dashboard update costs on the wire and in server CPU after the figures exist:
+#
+#   - JSON: Dash encodes callback outputs with plotly's JSON helper, which can use orjson
+#     (several times faster than the standard library on figure data) or `json`.
+#     `configure_json_engine` picks one for the whole process.
+#   - Compression: callback responses, the layout and Dash's JavaScript bundles are gzip-
+#     or brotli-compressed for browsers that accept it. Figure JSON (tick labels, target
+#     IDs, base64 arrays) typically shrinks to a quarter or less. The bundles never change
+#     for a given URL, so each is compressed once and kept.
+#
+# Dash's own `compress=True` needs flask-compress; this is the small part of it the
+# dashboard uses, and it reports what it saves on /metrics.
+
+# Content types worth compressing (prefix match)
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "text/")
+# Static Dash bundles are served under this path, with a fingerprint in the URL
+STATIC_PATH = "/_dash-component-suites/"
+
+_static_cache = {}  # (URL, encoding) -> compressed body
+_static_cache_lock = threading.Lock()
+
+
+# ----------------------
+# Function: Configure JSON Engine
+# ----------------------
+def configure_json_engine(engine=JSON_ENGINE):
+    """
+    Sets the JSON encoder plotly (and so Dash) uses for figures and callback responses.
+
+    Args:
+        engine (str): "orjson", "json" or "auto" (orjson if it is installed).
+
+    Returns:
+        str: The engine in use.
+    """
+    if engine in ("auto", "orjson"):
+        try:
+            import orjson  # noqa: F401  (only checked for)
+
+            engine = "orjson"
+        except ImportError:
+            if engine == "orjson":
+                print("JSON_ENGINE is orjson but orjson is not installed; using json.")
+            engine = "json"
+    pio.json.config.default_engine = engine
+    return engine
+
+
+# ----------------------
+# Function: Choose Encoding
+# ----------------------
+def choose_encoding(accept_encoding):
+    """
+    Picks the best compression a client accepts.
+
+    Args:
+        accept_encoding (str): The request's Accept-Encoding header.
+
+    Returns:
+        str or None: "br", "gzip", or None to send the response as it is.
+    """
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        key, _, value = params.strip().partition("=")
+        try:
+            weight = float(value) if key.strip() == "q" else 1.0
+        except ValueError:
+            weight = 0.0
+        # "gzip;q=0" means the client refuses gzip
+        if weight > 0:
+            accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+# ----------------------
+# Function: Compress Body
+# ----------------------
+def compress_body(body, encoding):
+    """
+    Compresses a response body.
+
+    Args:
+        body (bytes): The uncompressed body.
+        encoding (str): "br" or "gzip".
+
+    Returns:
+        bytes: The compressed body.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+# ----------------------
+# Function: Register Compression
+# ----------------------
+def register_compression(server, min_bytes=COMPRESS_MIN_BYTES):
+    """
+    Compresses the server's text responses for clients that accept gzip or brotli.
+
+    Register it before `metrics.register_metrics`, so the metrics see the JSON size and
+    serialization time before compression (Flask runs the last registered hook first).
+
+    Args:
+        server (flask.Flask): The Dash app's Flask server.
+        min_bytes (int): Smallest body worth compressing.
+    """
+
+    @server.after_request
+    def compress_response(response):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed  # Server-sent events must reach the browser as written
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None or response.calculate_content_length() < min_bytes:
+            return response
+
+        body = response.get_data()
+        start = time.perf_counter()
+        if request.method == "GET" and request.path.startswith(STATIC_PATH):
+            key = (request.full_path, encoding)
+            with _static_cache_lock:
+                compressed = _static_cache.get(key)
+            if compressed is None:
+                compressed = compress_body(body, encoding)
+                with _static_cache_lock:
+                    _static_cache[key] = compressed
+        else:
+            compressed = compress_body(body, encoding)
+        response.set_data(compressed)  # Also updates Content-Length
+        response.headers["Content-Encoding"] = encoding
+
+        name = g.get("instrumented_callback")
+        if name is not None:
+            STAGE_SECONDS.observe(time.perf_counter() - start, "compress")
+            WIRE_BYTES.observe(len(compressed), name)
+        return response
@@ -0,0 +1,410 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import SNAPSHOT_DIR
+
+# ----------------------
+# Shared Columnar Snapshot
+# ----------------------
+# One refresher process (snapshot_refresher.py) writes the current phase events into
+# SNAPSHOT_DIR as plain .npy column files, one directory per version:
+#
+#   SNAPSHOT_DIR/
+#       CURRENT            <- text file holding the latest complete version number
+#       v17/meta.json      <- version, row count, category labels, available dates
+#       v17/target_codes.npy, v17/phase_codes.npy, v17/timestamps.npy
+#
+# Every server worker memory-maps the columns read-only, so all workers share the same
+# page-cache copy of the data and memory stays flat as the worker count grows. A new
+# version is only published (by atomically replacing CURRENT) once all of its files are
+# complete, so readers never see a half-written snapshot.
+
+KEEP_VERSIONS = 2  # Older versions are deleted; the previous one is kept for slow readers
+
+_reader_cache = {"version": None, "snapshot": None}
+_reader_lock = threading.Lock()
+
+
+# ----------------------
+# Function: Digest Rows
+# ----------------------
+def _digest_rows(timestamps, *coded_columns):
+    """
+    Hashes rows of the snapshot columns, with the labels their codes refer to.
+
+    Args:
+        timestamps (numpy.ndarray): datetime64[us] timestamps of the rows.
+        *coded_columns (tuple): (codes, categories) pairs of the rows' coded columns.
+
+    Returns:
+        str: Hex digest of the rows.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(timestamps).view(np.uint8))
+    for codes, _ in coded_columns:
+        digest.update(np.ascontiguousarray(codes).view(np.uint8))
+    if len(timestamps):
+        for codes, categories in coded_columns:
+            used = categories[: int(codes.max()) + 1]
+            digest.update("\0".join(used).encode() + b"\1")
+    return digest.hexdigest()
+
+
+# ----------------------
+# Class: Shared Snapshot
+# ----------------------
+class SharedSnapshot:
+    """
+    Read-only view of one published snapshot version.
+
+    Attributes:
+        version (int): Version counter of this snapshot.
+        target_codes (numpy.ndarray): int32 index into `target_categories` per event.
+        phase_codes (numpy.ndarray): int32 index into `phase_categories` per event.
+        timestamps (numpy.ndarray): datetime64[us] timestamp per event, ordered by time.
+        target_categories (list of str): Target IDs referenced by `target_codes`.
+        phase_categories (list of str): Phase names referenced by `phase_codes`.
+        available_dates (list of str): Unique dates (YYYY-MM-DD) present in the snapshot.
+    """
+
+    def __init__(self, version, columns, meta):
+        self.version = version
+        self.target_codes = columns["target_codes"]
+        self.phase_codes = columns["phase_codes"]
+        self.timestamps = columns["timestamps"].view("datetime64[us]")
+        self.target_categories = meta["target_categories"]
+        self.phase_categories = meta["phase_categories"]
+        self.available_dates = meta["available_dates"]
+        self._target_index = None
+        self._index_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def selection_range(self, selected_date):
+        """
+        Finds the rows of a selection, by binary search on the time-ordered timestamps.
+
+        Args:
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            tuple: (start, stop) row numbers of the selection.
+        """
+        if selected_date == "all":
+            return 0, len(self)
+        day = np.datetime64(selected_date, "D")
+        bounds = np.array([day, day + 1], dtype="datetime64[us]")
+        start, stop = np.searchsorted(self.timestamps, bounds)
+        return int(start), int(stop)
+
+    def selection_fingerprint(self, selected_date):
+        """
+        Returns a key that only changes when the rows of a selection change.
+
+        A specific date hashes its slice of the columns and the labels its codes refer to.
+        Codes are numbered in order of first appearance, so rows appended on later days
+        leave an earlier day's fingerprint unchanged across snapshot versions. (A back-filled
+        row with a new target or phase renumbers the codes after it, which only costs the
+        later days a new key.)
+
+        Args:
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            str: The fingerprint.
+        """
+        if selected_date == "all":
+            return f"v{self.version}"
+        rows = slice(*self.selection_range(selected_date))
+        digest = _digest_rows(
+            self.timestamps[rows],
+            (self.target_codes[rows], self.target_categories),
+            (self.phase_codes[rows], self.phase_categories),
+        )
+        return f"{selected_date}-{digest}"
+
+    def target_index(self):
+        """
+        Returns the per-target index of this snapshot, building it on first use.
+
+        Args:
+            None
+
+        Returns:
+            SnapshotTargetIndex: The index, shared by every caller of this version.
+        """
+        with self._index_lock:
+            if self._target_index is None:
+                self._target_index = SnapshotTargetIndex(self)
+            return self._target_index
+
+    def to_frame(self, selected_date="all"):
+        """
+        Wraps the mapped columns in a DataFrame accepted by `vectorized_processing.process_data`.
+
+        Args:
+            selected_date (str): A specific date in "YYYY-MM-DD" format, or "all" (the default)
+                for every row.
+
+        Returns:
+            pandas.DataFrame: Columns target_id, phase_timestamp and phase.
+        """
+        rows = slice(*self.selection_range(selected_date))
+        return pd.DataFrame(
+            {
+                "target_id": pd.Categorical.from_codes(
+                    self.target_codes[rows], self.target_categories
+                ),
+                "phase_timestamp": self.timestamps[rows],
+                "phase": pd.Categorical.from_codes(
+                    self.phase_codes[rows], self.phase_categories
+                ),
+            }
+        )
+
+
+# ----------------------
+# Class: Snapshot Target Index
+# ----------------------
+class SnapshotTargetIndex:
+    """
+    Per-target view of a snapshot's mapped columns, for the target drill-down.
+
+    The rows are grouped by target code once per version (a stable argsort, so each
+    target's rows stay in time order); a drill-down then slices one target's rows instead
+    of scanning the snapshot. The methods match the drill-down methods of EventStore.
+    """
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+        self._order = np.argsort(snapshot.target_codes, kind="stable")
+        counts = np.bincount(snapshot.target_codes, minlength=len(snapshot.target_categories))
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+        self._codes = {target: code for code, target in enumerate(snapshot.target_categories)}
+
+    def _target_rows(self, target_id, selected_date):
+        # Row numbers of a target's events in a selection, in time order
+        code = self._codes.get(str(target_id))
+        if code is None:
+            return self._order[:0]
+        rows = self._order[self._offsets[code] : self._offsets[code + 1]]
+        if selected_date != "all":
+            day = np.datetime64(selected_date, "D")
+            bounds = np.array([day, day + 1], dtype="datetime64[us]")
+            start, stop = np.searchsorted(self._snapshot.timestamps[rows], bounds)
+            rows = rows[start:stop]
+        return rows
+
+    def _phases(self, target_id, selected_date):
+        # The target's timestamps and phase codes, and which rows have a next phase that day
+        rows = self._target_rows(target_id, selected_date)
+        timestamps = self._snapshot.timestamps[rows]
+        phase_codes = self._snapshot.phase_codes[rows]
+        days = timestamps.astype("datetime64[D]")
+        has_next = np.zeros(len(rows), dtype=bool)
+        has_next[:-1] = days[1:] == days[:-1]
+        return timestamps, phase_codes, has_next
+
+    def target_revision(self, target_id):
+        """
+        Returns a key that only changes when the target's events change.
+
+        Args:
+            target_id (str): The target.
+
+        Returns:
+            str: Digest of the target's events ("" if it has none).
+        """
+        rows = self._target_rows(target_id, "all")
+        if not len(rows):
+            return ""
+        return _digest_rows(
+            self._snapshot.timestamps[rows],
+            (self._snapshot.phase_codes[rows], self._snapshot.phase_categories),
+        )
+
+    def target_stats(self, target_id, selected_date):
+        """
+        Calculates total duration and count of each phase of one target.
+
+        Args:
+            target_id (str): The target.
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            tuple: (phase_durations, phase_counts), as from `EventStore.target_stats`.
+        """
+        timestamps, phase_codes, has_next = self._phases(target_id, selected_date)
+        # Each phase lasts until the target's next phase on the same day
+        gaps = np.diff(timestamps).astype(np.int64)[has_next[:-1]] / 1e6
+        codes = phase_codes[has_next]
+        phase_count = len(self._snapshot.phase_categories)
+        durations = np.bincount(codes, weights=gaps, minlength=phase_count)
+        counts = np.bincount(codes, minlength=phase_count)
+
+        # Phases in order of first occurrence, like the pairwise sums
+        _, first = np.unique(codes, return_index=True)
+        phase_durations, phase_counts = {}, {}
+        for code in codes[np.sort(first)]:
+            phase = self._snapshot.phase_categories[code]
+            phase_durations[phase] = float(durations[code])
+            phase_counts[phase] = int(counts[code])
+        return phase_durations, phase_counts
+
+    def target_timeline(self, target_id, selected_date):
+        """
+        Returns the Gantt bars of one target.
+
+        Args:
+            target_id (str): The target.
+            selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+        Returns:
+            pandas.DataFrame: Columns 'Task', 'Start', 'Finish' and 'Target ID', as from
+            `EventStore.target_timeline`.
+        """
+        timestamps, phase_codes, has_next = self._phases(target_id, selected_date)
+        # A phase ends when the next one starts; the day's last phase has no length
+        finishes = timestamps.copy()
+        finishes[:-1][has_next[:-1]] = timestamps[1:][has_next[:-1]]
+        return pd.DataFrame(
+            {
+                "Task": pd.Categorical.from_codes(
+                    phase_codes, self._snapshot.phase_categories
+                ).astype(str),
+                "Start": timestamps,
+                "Finish": finishes,
+                "Target ID": str(target_id),
+            }
+        )
+
+
+# ----------------------
+# Function: Read Current Version
+# ----------------------
+def current_version(directory=SNAPSHOT_DIR):
+    """
+    Reads the version counter of the latest published snapshot.
+
+    Args:
+        directory (str): Snapshot directory.
+
+    Returns:
+        int or None: The published version, or None if nothing has been written yet.
+    """
+    try:
+        with open(os.path.join(directory, "CURRENT")) as f:
+            return int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+# ----------------------
+# Function: Write Snapshot
+# ----------------------
+def write_snapshot(data, available_dates, directory=SNAPSHOT_DIR):
+    """
+    Encodes phase rows as columns and publishes them as the next snapshot version.
+
+    Args:
+        data (list of tuples): Each tuple contains (target_id, phase_timestamp, phase), ordered by time.
+        available_dates (list of str): Unique dates (YYYY-MM-DD) present in the data.
+        directory (str): Snapshot directory.
+
+    Returns:
+        int: The newly published version number.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = (current_version(directory) or 0) + 1
+    version_dir = os.path.join(directory, f"v{version}")
+    staging_dir = version_dir + ".tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    raw = pd.DataFrame.from_records(
+        data, columns=["target_id", "phase_timestamp", "phase"]
+    )
+    target_codes, target_categories = pd.factorize(raw["target_id"])
+    phase_codes, phase_categories = pd.factorize(raw["phase"])
+    timestamps = pd.to_datetime(raw["phase_timestamp"]).to_numpy().astype(
+        "datetime64[us]"
+    )
+
+    np.save(os.path.join(staging_dir, "target_codes.npy"), target_codes.astype(np.int32))
+    np.save(os.path.join(staging_dir, "phase_codes.npy"), phase_codes.astype(np.int32))
+    np.save(os.path.join(staging_dir, "timestamps.npy"), timestamps.view(np.int64))
+    with open(os.path.join(staging_dir, "meta.json"), "w") as f:
+        json.dump(
+            {
+                "version": version,
+                "row_count": len(raw),
+                "target_categories": [str(t) for t in target_categories],
+                "phase_categories": [str(p) for p in phase_categories],
+                "available_dates": list(available_dates),
+            },
+            f,
+        )
+
+    # Publish: first move the finished directory into place, then flip CURRENT atomically
+    os.replace(staging_dir, version_dir)
+    pointer_tmp = os.path.join(directory, "CURRENT.tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(str(version))
+    os.replace(pointer_tmp, os.path.join(directory, "CURRENT"))
+
+    # Drop versions nobody should be reading any more (open maps stay valid after unlink)
+    for name in os.listdir(directory):
+        if name.startswith("v") and name[1:].isdigit():
+            if int(name[1:]) <= version - KEEP_VERSIONS:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    return version
+
+
+# ----------------------
+# Function: Read Snapshot
+# ----------------------
+def read_snapshot(directory=SNAPSHOT_DIR):
+    """
+    Returns the latest published snapshot, memory-mapping it only when the version changed.
+
+    Args:
+        directory (str): Snapshot directory.
+
+    Returns:
+        SharedSnapshot or None: The current snapshot, or None if nothing has been published.
+    """
+    with _reader_lock:
+        # Retry if the refresher retires the version between reading CURRENT and opening it
+        for _ in range(3):
+            version = current_version(directory)
+            if version is None:
+                return None
+            if _reader_cache["version"] == version:
+                return _reader_cache["snapshot"]
+
+            version_dir = os.path.join(directory, f"v{version}")
+            try:
+                with open(os.path.join(version_dir, "meta.json")) as f:
+                    meta = json.load(f)
+                columns = {
+                    name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r")
+                    for name in ("target_codes", "phase_codes", "timestamps")
+                }
+            except FileNotFoundError:
+                continue
+
+            snapshot = SharedSnapshot(version, columns, meta)
+            _reader_cache["version"] = version
+            _reader_cache["snapshot"] = snapshot
+            return snapshot
+
+        # Fall back to whatever was mapped last rather than failing the callback
+        return _reader_cache["snapshot"]
@@ -0,0 +1,62 @@
+import time
+
+from config import SNAPSHOT_DIR, SNAPSHOT_REFRESH_INTERVAL, UPDATE_MODE
+from database import get_data_from_db
+from live_updates import listen_for_changes
+from partitions import start_partition_maintenance
+from shared_snapshot import write_snapshot
+
+# ----------------------
+# Snapshot Refresher
+# ----------------------
+# The single database reader in "shared" serving mode. It keeps the incremental
+# snapshot from database.get_data_from_db up to date and republishes it for the
+# server workers whenever it changes, so Postgres sees one reader however many
+# workers are running. In push update mode it waits for NOTIFY instead of polling.
+#
+# Usage:
+#   SERVING_MODE=shared python snapshot_refresher.py
+#   SERVING_MODE=shared gunicorn --workers 4 --bind 0.0.0.0:8050 app:server
+
+_published = {"rows": None, "dates": None}
+
+
+# ----------------------
+# Function: Refresh Once
+# ----------------------
+def refresh_once():
+    """
+    Fetches new rows and publishes a snapshot if anything changed.
+    """
+    data, available_dates = get_data_from_db()
+
+    # get_data_from_db returns empty lists when the database is unreachable; keep
+    # serving the last published snapshot rather than blanking every worker
+    if not data and _published["rows"]:
+        return
+
+    # get_data_from_db hands back the same rows object when no new rows arrived
+    if data is not _published["rows"] or available_dates != _published["dates"]:
+        version = write_snapshot(data, available_dates)
+        print(f"Published snapshot v{version} ({len(data)} rows) to {SNAPSHOT_DIR}")
+        _published["rows"], _published["dates"] = data, available_dates
+
+
+# ----------------------
+# Function: Run Refresher
+# ----------------------
+def run_refresher():
+    """
+    Publishes changed snapshots, on database notifications in push mode or else every
+    SNAPSHOT_REFRESH_INTERVAL seconds.
+    """
+    start_partition_maintenance()
+    if UPDATE_MODE == "push":
+        listen_for_changes(refresh_once)
+    while True:
+        refresh_once()
+        time.sleep(SNAPSHOT_REFRESH_INTERVAL)
+
+
+if __name__ == "__main__":
+    run_refresher()
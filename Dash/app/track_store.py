@@ -0,0 +1,372 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import TRACK_STORE_DIR
+
+# ----------------------
+# Columnar Track Store
+# ----------------------
+# Track exports such as bc3data.csv have ~70 columns: trackNumber, an epoch timestamp
+# (plus the same time again as text), ECEF and geodetic positions, velocities, quality,
+# category and many e18.*/e23.* fields that are mostly empty or constant. Parsing the CSV
+# on every load is slow and wasteful, so it is converted once into a directory of typed,
+# memory-mappable .npy columns:
+#
+#   TRACK_STORE_DIR/
+#       meta.json                   <- column encodings, categories, constants, track index
+#       track_numbers.npy           <- distinct track numbers, ascending
+#       track_offsets.npy           <- start row of each track (plus the total row count)
+#       timestamp.npy               <- datetime64[s] per row
+#       e1.latitude.npy ...         <- one file per stored column
+#
+# Rows are sorted by (trackNumber, timestamp), so one track's history is the contiguous
+# slice track_offsets[i]:track_offsets[i + 1] of every column.
+#
+# Column encodings:
+#   - dense:    numeric array of the narrowest fitting type (NaN marks missing floats)
+#   - category: int16 codes into a list of strings (-1 = missing)
+#   - bool:     bit-packed values plus a bit-packed "present" mask
+#   - sparse:   row indices and values of the few non-empty cells
+#   - constant: a single value in meta.json (column never varies), plus a "present"
+#               mask when some cells are empty
+#
+# Usage:
+#   python track_store.py ../../bc3data.csv
+
+SORT_KEY = ["trackNumber", "timestamp"]
+SPARSE_THRESHOLD = 0.1  # Columns filled in fewer than 10% of rows are stored sparsely
+
+# Narrower storage types for columns whose precision allows it; everything else numeric
+# is kept as float64 (ECEF coordinates and geodetic positions need it)
+FLOAT32_COLUMNS = {
+    "e1.altitude",
+    "e1.xdot",
+    "e1.ydot",
+    "e1.zdot",
+    "e1.velocityEast",
+    "e1.velocityNorth",
+    "e1.velocityUp",
+    "e1.groundSpeed",
+    "e1.heading",
+}
+
+_store_cache = {"meta_mtime": None, "store": None}
+_store_lock = threading.Lock()
+
+
+# ----------------------
+# Function: Encode Column
+# ----------------------
+def _encode_column(name, values, row_count):
+    """
+    Chooses the storage encoding for one column and produces the arrays to write.
+
+    Args:
+        name (str): Column name.
+        values (pandas.Series): Column values, already in sorted row order.
+        row_count (int): Number of rows.
+
+    Returns:
+        tuple: (column meta dict, {file suffix: numpy array}).
+    """
+    present = values.notna().to_numpy()
+    present_count = int(present.sum())
+
+    # Constant columns (including entirely empty ones) only need their value, plus a
+    # bit-packed "present" mask if some cells are empty
+    non_null = values[present]
+    if non_null.nunique() <= 1:
+        value = non_null.iloc[0] if present_count else None
+        if isinstance(value, np.generic):
+            value = value.item()
+        if present_count in (0, row_count):
+            return {"encoding": "constant", "value": value}, {}
+        return {"encoding": "constant", "value": value, "length": row_count}, {
+            "present": np.packbits(present)
+        }
+
+    # Sparse columns keep only their filled cells
+    if present_count < SPARSE_THRESHOLD * row_count:
+        rows = np.flatnonzero(present).astype(np.int32)
+        values_meta, arrays = _encode_column(
+            name, non_null.reset_index(drop=True), present_count
+        )
+        column_meta = {"encoding": "sparse", "values": values_meta}
+        return column_meta, {
+            "rows": rows,
+            **{
+                f"values.{suffix}" if suffix else "values": array
+                for suffix, array in arrays.items()
+            },
+        }
+
+    # Booleans (pandas reads TRUE/FALSE with gaps as object columns)
+    if pd.api.types.is_bool_dtype(non_null) or (
+        non_null.dtype == object and all(isinstance(v, bool) for v in non_null.unique())
+    ):
+        bits = values.fillna(False).astype(bool).to_numpy()
+        return {"encoding": "bool", "length": row_count}, {
+            "bits": np.packbits(bits),
+            "present": np.packbits(present),
+        }
+
+    # Text columns become dictionary-encoded codes
+    if not pd.api.types.is_numeric_dtype(values):
+        codes, categories = pd.factorize(values)
+        return {"encoding": "category", "categories": [str(c) for c in categories]}, {
+            "codes": codes.astype(np.int16)
+        }
+
+    # Whole numbers without gaps get the smallest integer type that holds them
+    if present_count == row_count and np.all(np.mod(non_null, 1) == 0):
+        array = non_null.to_numpy().astype(np.int64)
+        for dtype in (np.int8, np.int16, np.int32):
+            info = np.iinfo(dtype)
+            if array.min() >= info.min and array.max() <= info.max:
+                array = array.astype(dtype)
+                break
+        return {"encoding": "dense"}, {"": array}
+
+    dtype = np.float32 if name in FLOAT32_COLUMNS else np.float64
+    return {"encoding": "dense"}, {"": values.to_numpy(dtype=dtype, na_value=np.nan)}
+
+
+# ----------------------
+# Function: Build Track Store
+# ----------------------
+def build_track_store(csv_path, directory=TRACK_STORE_DIR):
+    """
+    Parses a track export once and writes it as a sorted, columnar track store.
+
+    Args:
+        csv_path (str): Path of the CSV export (bc3data.csv layout).
+        directory (str): Output directory; replaced atomically when complete.
+
+    Returns:
+        int: Number of rows written.
+    """
+    frame = pd.read_csv(csv_path, low_memory=False)
+    # The export repeats the epoch timestamp as text in a second "timestamp" column
+    frame = frame.drop(columns=[c for c in frame.columns if c.startswith("timestamp.")])
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], unit="s")
+    frame = frame.sort_values(SORT_KEY, kind="stable").reset_index(drop=True)
+    row_count = len(frame)
+
+    staging = directory.rstrip("/") + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    # Offset index: rows of track_numbers[i] are track_offsets[i]:track_offsets[i + 1]
+    track_column = frame["trackNumber"].to_numpy(dtype=np.int64)
+    track_numbers, track_offsets = np.unique(track_column, return_index=True)
+    np.save(os.path.join(staging, "track_numbers.npy"), track_numbers)
+    np.save(
+        os.path.join(staging, "track_offsets.npy"),
+        np.append(track_offsets, row_count).astype(np.int64),
+    )
+    np.save(
+        os.path.join(staging, "timestamp.npy"),
+        frame["timestamp"].to_numpy().astype("datetime64[s]"),
+    )
+
+    columns = {}
+    for name in frame.columns:
+        if name in ("timestamp", "trackNumber"):
+            continue
+        column_meta, arrays = _encode_column(name, frame[name], row_count)
+        columns[name] = column_meta
+        for suffix, array in arrays.items():
+            file_name = f"{name}.{suffix}.npy" if suffix else f"{name}.npy"
+            np.save(os.path.join(staging, file_name), array)
+
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({"row_count": row_count, "columns": columns}, f, indent=1)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+    return row_count
+
+
+# ----------------------
+# Class: Track Store
+# ----------------------
+class TrackStore:
+    """
+    Read-only, memory-mapped access to a track store written by `build_track_store`.
+
+    Attributes:
+        directory (str): Store directory.
+        modified (int): Modification time of meta.json in nanoseconds, usable as a version.
+        row_count (int): Number of rows.
+        track_numbers (numpy.ndarray): Distinct track numbers, ascending.
+        track_offsets (numpy.ndarray): Start row of each track, plus the total row count.
+        timestamps (numpy.ndarray): datetime64[s] per row.
+        columns (list of str): Stored column names (excluding trackNumber and timestamp).
+    """
+
+    def __init__(self, directory=TRACK_STORE_DIR):
+        self.directory = directory
+        meta_path = os.path.join(directory, "meta.json")
+        self.modified = os.stat(meta_path).st_mtime_ns  # Changes whenever the store is rebuilt
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self.row_count = meta["row_count"]
+        self._column_meta = meta["columns"]
+        self.columns = list(self._column_meta)
+        self.track_numbers = self._load("track_numbers.npy")
+        self.track_offsets = self._load("track_offsets.npy")
+        self.timestamps = self._load("timestamp.npy")
+
+    def _load(self, file_name):
+        return np.load(os.path.join(self.directory, file_name), mmap_mode="r")
+
+    def track_slice(self, track_number):
+        """
+        Finds the rows of one track with a binary search of the offset index.
+
+        Args:
+            track_number (int): Track number to look up.
+
+        Returns:
+            slice: Row range of the track (empty if the track is unknown).
+        """
+        i = np.searchsorted(self.track_numbers, track_number)
+        if i == len(self.track_numbers) or self.track_numbers[i] != track_number:
+            return slice(0, 0)
+        return slice(int(self.track_offsets[i]), int(self.track_offsets[i + 1]))
+
+    def _decode(self, file_prefix, column_meta, rows):
+        """
+        Materializes rows[start:stop] of one column from its encoding.
+
+        Args:
+            file_prefix (str): Column name (or "<name>.values" for the cells of a sparse column).
+            column_meta (dict): Encoding description from meta.json.
+            rows (slice): Row range to decode.
+
+        Returns:
+            numpy.ndarray: The decoded values (object dtype where values can be missing).
+        """
+        encoding = column_meta["encoding"]
+        length = rows.stop - rows.start
+        if encoding == "constant":
+            values = np.full(length, column_meta["value"], dtype=object)
+            if "length" in column_meta:
+                present = np.unpackbits(
+                    self._load(f"{file_prefix}.present.npy"), count=column_meta["length"]
+                )[rows]
+                values[present == 0] = None
+            return values
+        if encoding == "dense":
+            return np.asarray(self._load(f"{file_prefix}.npy")[rows])
+        if encoding == "category":
+            codes = np.asarray(self._load(f"{file_prefix}.codes.npy")[rows])
+            categories = np.array(column_meta["categories"] + [None], dtype=object)
+            return categories[codes]  # Code -1 picks the trailing None
+        if encoding == "bool":
+            count = column_meta["length"]
+            bits = np.unpackbits(self._load(f"{file_prefix}.bits.npy"), count=count)[rows]
+            present = np.unpackbits(self._load(f"{file_prefix}.present.npy"), count=count)[rows]
+            values = bits.astype(bool).astype(object)
+            values[present == 0] = None
+            return values
+
+        # Sparse: scatter the stored cells that fall inside the requested rows
+        cell_rows = self._load(f"{file_prefix}.rows.npy")
+        lo, hi = (int(i) for i in np.searchsorted(cell_rows, [rows.start, rows.stop]))
+        values = np.full(length, None, dtype=object)
+        values[np.asarray(cell_rows[lo:hi]) - rows.start] = self._decode(
+            f"{file_prefix}.values", column_meta["values"], slice(lo, hi)
+        )
+        return values
+
+    def load_rows(self, rows, columns=None):
+        """
+        Loads a contiguous row range as a DataFrame.
+
+        Args:
+            rows (slice): Row range to load.
+            columns (list of str, optional): Columns to include; all when omitted.
+
+        Returns:
+            pandas.DataFrame: trackNumber, timestamp and the requested columns.
+        """
+        start, stop, _ = rows.indices(self.row_count)
+        rows = slice(start, stop)
+        # Each row's track is the last offset at or before it
+        track_index = (
+            np.searchsorted(self.track_offsets, np.arange(start, stop), side="right") - 1
+        )
+        frame = {
+            "trackNumber": np.asarray(self.track_numbers)[track_index],
+            "timestamp": np.asarray(self.timestamps[rows]),
+        }
+        for name in columns if columns is not None else self.columns:
+            frame[name] = self._decode(name, self._column_meta[name], rows)
+        return pd.DataFrame(frame)
+
+    def load_track(self, track_number, columns=None):
+        """
+        Loads the full history of one track by slicing, without scanning other tracks.
+
+        Args:
+            track_number (int): Track number to load.
+            columns (list of str, optional): Columns to include; all when omitted.
+
+        Returns:
+            pandas.DataFrame: The track's rows in timestamp order.
+        """
+        return self.load_rows(self.track_slice(track_number), columns)
+
+
+# ----------------------
+# Function: Open Track Store
+# ----------------------
+def open_track_store(directory=TRACK_STORE_DIR):
+    """
+    Returns the track store in `directory`, reopening it only after it has been rebuilt.
+
+    Args:
+        directory (str): Store directory.
+
+    Returns:
+        TrackStore or None: The opened store, or None if no store has been built yet.
+    """
+    with _store_lock:
+        try:
+            meta_mtime = os.stat(os.path.join(directory, "meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if _store_cache["meta_mtime"] != meta_mtime:
+            _store_cache["store"] = TrackStore(directory)
+            _store_cache["meta_mtime"] = meta_mtime
+        return _store_cache["store"]
+
+
+# ----------------------
+# Function: Main
+# ----------------------
+def main():
+    """
+    Command line entry point: converts a track CSV export into a track store.
+    """
+    parser = argparse.ArgumentParser(
+        description="Convert a track CSV export (bc3data.csv layout) into a columnar track store."
+    )
+    parser.add_argument("csv_path", help="track export to convert")
+    parser.add_argument(
+        "--out", default=TRACK_STORE_DIR, help=f"output directory (default: {TRACK_STORE_DIR})"
+    )
+    args = parser.parse_args()
+    row_count = build_track_store(args.csv_path, args.out)
+    print(f"Wrote {row_count} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import TRAJECTORY_GRID_DEG, TRAJECTORY_PLOT_WIDTH_PX, TRAJECTORY_TOLERANCE_PX
+from track_store import open_track_store
+
+# ----------------------
+# Trajectory Index
+# ----------------------
+# The trajectory map draws e1.longitude / e1.latitude of every track in the track store
+# (see track_store.py) for the selected date. Two indexes keep its queries off full scans:
+#   - a time index: row numbers ordered by timestamp, so a day (or any time window) is one
+#     binary search and a contiguous slice;
+#   - a coarse spatial grid: rows bucketed by TRAJECTORY_GRID_DEG-sized lat/lon cells, so a
+#     map viewport only touches the rows of the cells it overlaps.
+# A query uses whichever index yields fewer candidate rows and filters those exactly.
+#
+# Before drawing, each track is simplified with Douglas-Peucker at a tolerance of about one
+# screen pixel of the current viewport, so a zoomed-out map sends only the few points per
+# track that are visible at that scale, and zooming in brings back the detail.
+
+POSITION_COLUMNS = ["e1.latitude", "e1.longitude", "e1.altitude"]
+
+_index_cache = {"modified": None, "index": None}
+_index_lock = threading.Lock()
+
+
+# ----------------------
+# Class: Trajectory Index
+# ----------------------
+class TrajectoryIndex:
+    """
+    Time and spatial indexes over the positions of a track store.
+
+    Rows keep the store's (trackNumber, timestamp) order, so consecutive rows of the same
+    track are consecutive points of its trajectory.
+
+    Attributes:
+        version (int): Version of the track store the index was built from.
+        track_numbers (numpy.ndarray): Track number of each row.
+        timestamps (numpy.ndarray): Epoch seconds of each row.
+        latitudes, longitudes, altitudes (numpy.ndarray): float64 positions (NaN if missing).
+        available_dates (list of str): Unique dates (YYYY-MM-DD) with track data.
+    """
+
+    def __init__(self, store, grid_deg=TRAJECTORY_GRID_DEG):
+        self.version = store.modified
+        positions = store.load_rows(slice(None), POSITION_COLUMNS)
+        self.track_numbers = positions["trackNumber"].to_numpy()
+        self.timestamps = (
+            positions["timestamp"].to_numpy().astype("datetime64[s]").astype(np.int64)
+        )
+        self.latitudes, self.longitudes, self.altitudes = (
+            pd.to_numeric(positions[name], errors="coerce").to_numpy(dtype=np.float64)
+            for name in POSITION_COLUMNS
+        )
+        # Only rows with a position can be drawn (exports also carry empty rows at epoch 0)
+        located = np.flatnonzero(~np.isnan(self.latitudes) & ~np.isnan(self.longitudes))
+        days = np.unique(self.timestamps[located].astype("datetime64[s]").astype("datetime64[D]"))
+        self.available_dates = [str(day) for day in days]
+
+        # Time index: rows with a position, by timestamp (stable, so ties stay in track order)
+        self._time_order = located[np.argsort(self.timestamps[located], kind="stable")]
+        self._sorted_times = self.timestamps[self._time_order]
+
+        # Spatial grid: rows with a position, grouped by cell as a compressed row list
+        self._grid_deg = grid_deg
+        self._lon_cells = int(np.ceil(360 / grid_deg)) + 1
+        keys = self._cell_keys(self.latitudes[located], self.longitudes[located])
+        order = np.argsort(keys, kind="stable")
+        self._cell_rows = located[order]
+        self._cells, cell_starts = np.unique(keys[order], return_index=True)
+        self._cell_offsets = np.append(cell_starts, len(order))
+
+    def _cell_keys(self, latitudes, longitudes):
+        # Cell number of each position: row-major over (latitude band, longitude band)
+        lat_cells = np.floor((latitudes + 90) / self._grid_deg).astype(np.int64)
+        lon_cells = np.floor((longitudes + 180) / self._grid_deg).astype(np.int64)
+        return lat_cells * self._lon_cells + lon_cells
+
+    def _grid_candidates(self, bbox):
+        """
+        Finds the grid cells overlapping a bounding box.
+
+        Args:
+            bbox (tuple): (lon_min, lon_max, lat_min, lat_max) in degrees.
+
+        Returns:
+            tuple: (indices of the overlapping cells, number of rows they hold).
+        """
+        lon_min, lon_max, lat_min, lat_max = bbox
+        # A zoomed-out map can show past +/-180 and +/-90 degrees; keys of cells outside the
+        # world would wrap into the next latitude band
+        lat_min, lat_max = np.clip([lat_min, lat_max], -90, 90)
+        lon_min, lon_max = np.clip([lon_min, lon_max], -180, 180)
+        corners = self._cell_keys(np.array([lat_min, lat_max]), np.array([lon_min, lon_max]))
+        lat_lo, lat_hi = corners // self._lon_cells
+        lon_lo, lon_hi = corners % self._lon_cells
+        # Only occupied cells are tested, so a huge viewport costs no more than the grid
+        cell_lat = self._cells // self._lon_cells
+        cell_lon = self._cells % self._lon_cells
+        cells = np.flatnonzero(
+            (cell_lat >= lat_lo) & (cell_lat <= lat_hi) & (cell_lon >= lon_lo) & (cell_lon <= lon_hi)
+        )
+        sizes = self._cell_offsets[cells + 1] - self._cell_offsets[cells]
+        return cells, int(sizes.sum())
+
+    def query(self, bbox=None, time_window=None):
+        """
+        Finds the rows inside a bounding box and time window.
+
+        Args:
+            bbox (tuple, optional): (lon_min, lon_max, lat_min, lat_max); None for everywhere.
+            time_window (tuple, optional): (start, end) epoch seconds, end exclusive; None
+                for all time.
+
+        Returns:
+            numpy.ndarray: Matching row numbers in ascending (track, time) order.
+        """
+        if time_window is not None:
+            time_lo, time_hi = np.searchsorted(self._sorted_times, time_window)
+        else:
+            time_lo, time_hi = 0, len(self._sorted_times)
+
+        # Start from the index with fewer candidates
+        if bbox is not None:
+            cells, grid_count = self._grid_candidates(bbox)
+        if bbox is not None and grid_count < time_hi - time_lo:
+            rows = np.concatenate(
+                [self._cell_rows[self._cell_offsets[c] : self._cell_offsets[c + 1]] for c in cells]
+                or [np.empty(0, dtype=np.int64)]
+            )
+        else:
+            rows = self._time_order[time_lo:time_hi]
+
+        # Exact filters (the grid is coarse and the time slice ignores the bbox)
+        keep = np.ones(len(rows), dtype=bool)
+        if time_window is not None:
+            times = self.timestamps[rows]
+            keep &= (times >= time_window[0]) & (times < time_window[1])
+        if bbox is not None:
+            lon_min, lon_max, lat_min, lat_max = bbox
+            lons = self.longitudes[rows]
+            lats = self.latitudes[rows]
+            keep &= (lons >= lon_min) & (lons <= lon_max) & (lats >= lat_min) & (lats <= lat_max)
+        return np.sort(rows[keep])
+
+
+# ----------------------
+# Function: Get Trajectory Index
+# ----------------------
+def get_trajectory_index():
+    """
+    Returns the index for the current track store, rebuilding it only after the store changed.
+
+    Returns:
+        TrajectoryIndex or None: The index, or None if no track store has been built.
+    """
+    store = open_track_store()
+    if store is None:
+        return None
+    with _index_lock:
+        if _index_cache["modified"] != store.modified:
+            _index_cache["index"] = TrajectoryIndex(store)
+            _index_cache["modified"] = store.modified
+        return _index_cache["index"]
+
+
+# ----------------------
+# Function: Parse Map Viewport
+# ----------------------
+def parse_viewport(relayout_data):
+    """
+    Extracts the visible longitude/latitude box from a `relayoutData` event of the map.
+
+    Args:
+        relayout_data (dict or None): The graph's relayoutData property.
+
+    Returns:
+        list or None: [lon_min, lon_max, lat_min, lat_max], None when the view was reset
+        (autorange), or False when the event did not change both axes.
+    """
+    if not relayout_data:
+        return False
+    if relayout_data.get("xaxis.autorange") or relayout_data.get("autosize"):
+        return None
+    keys = ["xaxis.range[0]", "xaxis.range[1]", "yaxis.range[0]", "yaxis.range[1]"]
+    if all(key in relayout_data for key in keys):
+        lon_a, lon_b, lat_a, lat_b = (float(relayout_data[key]) for key in keys)
+        return [min(lon_a, lon_b), max(lon_a, lon_b), min(lat_a, lat_b), max(lat_a, lat_b)]
+    return False
+
+
+# ----------------------
+# Function: Simplify Polyline
+# ----------------------
+def simplify_polyline(x, y, tolerance):
+    """
+    Douglas-Peucker simplification of one polyline.
+
+    Keeps the end points, then recursively keeps the point farthest from the chord between
+    two kept points while it is farther than `tolerance`.
+
+    Args:
+        x, y (numpy.ndarray): Point coordinates, in drawing order.
+        tolerance (float): Largest allowed deviation, in the units of x and y.
+
+    Returns:
+        numpy.ndarray: Boolean mask of the points to keep.
+    """
+    count = len(x)
+    keep = np.zeros(count, dtype=bool)
+    if count <= 2:
+        keep[:] = True
+        return keep
+    keep[0] = keep[-1] = True
+
+    # Explicit stack instead of recursion, so long tracks cannot hit the recursion limit
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1 : last] - x[first], y[first + 1 : last] - y[first]
+        chord = np.hypot(dx, dy)
+        if chord == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(px * dy - py * dx) / chord
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+# ----------------------
+# Function: Build Trajectories
+# ----------------------
+def build_trajectories(
+    index,
+    selected_date,
+    viewport=None,
+    plot_width_px=TRAJECTORY_PLOT_WIDTH_PX,
+    tolerance_px=TRAJECTORY_TOLERANCE_PX,
+):
+    """
+    Selects and simplifies the track points to draw for one date and viewport.
+
+    Args:
+        index (TrajectoryIndex): Index of the current track store.
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+        viewport (list, optional): [lon_min, lon_max, lat_min, lat_max] of the visible map;
+            None shows everything.
+        plot_width_px (int): Approximate width of the map in pixels.
+        tolerance_px (float): Simplification tolerance in pixels.
+
+    Returns:
+        dict:
+            - points: DataFrame of the points to draw (trackNumber, timestamp, longitude,
+              latitude, altitude, segment), in track and time order. A new segment starts
+              wherever the track leaves the viewport or the track changes.
+            - candidates: Number of points before simplification.
+            - track_count: Number of tracks drawn.
+            - viewport: The viewport the points were selected for.
+    """
+    time_window = None
+    if selected_date != "all":
+        day_start = np.datetime64(selected_date, "D").astype("datetime64[s]").astype(np.int64)
+        time_window = (day_start, day_start + 24 * 3600)
+    rows = index.query(viewport, time_window)
+
+    if viewport is not None and len(rows):
+        # Also keep each point's neighbours on its track, so lines crossing the edge of the
+        # map are drawn up to the edge
+        last_row = len(index.timestamps) - 1
+        neighbours = [rows]
+        for step in (-1, 1):
+            adjacent = np.clip(rows + step, 0, last_row)
+            neighbours.append(adjacent[index.track_numbers[adjacent] == index.track_numbers[rows]])
+        neighbours = np.unique(np.concatenate(neighbours))
+        located = ~np.isnan(index.longitudes[neighbours]) & ~np.isnan(index.latitudes[neighbours])
+        if time_window is not None:
+            times = index.timestamps[neighbours]
+            located &= (times >= time_window[0]) & (times < time_window[1])
+        rows = neighbours[located]
+
+    longitudes = index.longitudes[rows]
+    latitudes = index.latitudes[rows]
+    tracks = index.track_numbers[rows]
+
+    # Segments: runs of consecutive rows of one track
+    new_segment = np.ones(len(rows), dtype=bool)
+    new_segment[1:] = (np.diff(rows) != 1) | (tracks[1:] != tracks[:-1])
+    segment_starts = np.flatnonzero(new_segment)
+    segment_ends = np.append(segment_starts[1:], len(rows))
+
+    # One pixel of the visible map, in degrees
+    if viewport is not None:
+        span = max(viewport[1] - viewport[0], viewport[3] - viewport[2])
+    elif len(rows):
+        span = max(np.ptp(longitudes), np.ptp(latitudes))
+    else:
+        span = 0.0
+    tolerance = span / max(plot_width_px, 1) * tolerance_px
+
+    keep = np.zeros(len(rows), dtype=bool)
+    for start, end in zip(segment_starts, segment_ends):
+        keep[start:end] = simplify_polyline(
+            longitudes[start:end], latitudes[start:end], tolerance
+        )
+
+    points = pd.DataFrame(
+        {
+            "trackNumber": tracks[keep],
+            "timestamp": index.timestamps[rows[keep]].astype("datetime64[s]"),
+            "longitude": longitudes[keep],
+            "latitude": latitudes[keep],
+            "altitude": index.altitudes[rows[keep]],
+            "segment": np.cumsum(new_segment)[keep],
+        }
+    )
+    return {
+        "points": points,
+        "candidates": len(rows),
+        "track_count": len(np.unique(tracks)),
+        "viewport": viewport,
+    }
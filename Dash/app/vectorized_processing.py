@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+
+# Averages are computed from the per-phase dictionaries, which are tiny, so the
+# reference implementation is shared by both engines
+from data_processing import calculate_average_duration  # noqa: F401
+from event_store import EventStore
+from quantile_sketch import TDigest
+
+# ----------------------
+# Columnar Phase Engine
+# ----------------------
+# Drop-in replacements for the functions in data_processing with the same signatures.
+# Instead of nested {target_id: {date: [(phase, timestamp), ...]}} dictionaries, the data
+# is held as a DataFrame of column arrays:
+#   - target_id / phase: categoricals (integer codes, categories in order of first appearance)
+#   - phase_timestamp: datetime64
+#   - date: datetime64[D], the day each event belongs to
+# Rows are ordered exactly as the reference implementation iterates them (targets in order
+# of first appearance, then time), so every (target, date) group is one contiguous run and
+# "the next phase of the same group" is simply the next row.
+
+
+# ----------------------
+# Function: Process Data
+# ----------------------
+def process_data(data, selected_date):
+    """
+    Organizes raw phase data into columnar arrays grouped by target ID and date.
+
+    Args:
+        data (list of tuples, EventStore or pandas.DataFrame): Each tuple contains (target_id,
+            phase_timestamp, phase), or a DataFrame with those columns (e.g.
+            `SharedSnapshot.to_frame()`). An EventStore only hands over the selected date's events.
+        selected_date (str): A specific date in "YYYY-MM-DD" format or "all" to include all dates.
+
+    Returns:
+        pandas.DataFrame: Columns target_id, phase, phase_timestamp and date, grouped by
+        target (in order of first appearance) and sorted by time within each target.
+    """
+    if isinstance(data, EventStore):
+        data = data.rows(selected_date)
+    if isinstance(data, pd.DataFrame):
+        raw = data
+    else:
+        raw = pd.DataFrame.from_records(
+            data, columns=["target_id", "phase_timestamp", "phase"]
+        )
+    # psycopg2 already returns datetime objects, so this is a straight conversion
+    timestamps = pd.to_datetime(raw["phase_timestamp"]).to_numpy()
+    dates = timestamps.astype("datetime64[D]")
+
+    # Keep only the selected day with a single vectorized comparison
+    if selected_date != "all":
+        keep = dates == np.datetime64(selected_date, "D")
+        raw = raw[keep]
+        timestamps = timestamps[keep]
+        dates = dates[keep]
+
+    # Factorize keeps categories in order of first appearance, like dictionary insertion
+    target_codes, target_categories = pd.factorize(raw["target_id"])
+    phase_codes, phase_categories = pd.factorize(raw["phase"])
+
+    # Stable sort by target keeps each target's events in their original time order
+    order = np.argsort(target_codes, kind="stable")
+
+    return pd.DataFrame(
+        {
+            "target_id": pd.Categorical.from_codes(target_codes[order], target_categories),
+            "phase": pd.Categorical.from_codes(phase_codes[order], phase_categories),
+            "phase_timestamp": timestamps[order],
+            "date": dates[order],
+        }
+    )
+
+
+# ----------------------
+# Function: Find Group Successors
+# ----------------------
+def _next_in_group(organized_data):
+    """
+    Flags which rows are followed by another phase of the same target on the same date.
+
+    Args:
+        organized_data (pandas.DataFrame): The output from `process_data`.
+
+    Returns:
+        numpy.ndarray: Boolean array; True where row i + 1 belongs to the same (target, date) group.
+    """
+    target_codes = organized_data["target_id"].cat.codes.to_numpy()
+    dates = organized_data["date"].to_numpy()
+    has_next = np.zeros(len(organized_data), dtype=bool)
+    has_next[:-1] = (target_codes[1:] == target_codes[:-1]) & (dates[1:] == dates[:-1])
+    return has_next
+
+
+# ----------------------
+# Function: Phase Durations
+# ----------------------
+def _phase_durations(organized_data):
+    """
+    Pairs every phase that has a successor in its group with its duration.
+
+    Args:
+        organized_data (pandas.DataFrame): The output from `process_data`.
+
+    Returns:
+        tuple: (phase_codes, durations) arrays; durations in whole microseconds.
+    """
+    has_next = _next_in_group(organized_data)
+    timestamps = organized_data["phase_timestamp"].to_numpy()
+
+    # Duration of each phase is the gap to the next row of its group, in whole microseconds
+    # so the per-phase sums are exact
+    gaps = np.diff(timestamps).astype("timedelta64[us]").astype(np.int64)
+    durations = gaps[has_next[:-1]]
+    phase_codes = organized_data["phase"].cat.codes.to_numpy()[has_next]
+    return phase_codes, durations
+
+
+# ----------------------
+# Function: Codes in First-Occurrence Order
+# ----------------------
+def _codes_in_first_occurrence_order(phase_codes):
+    # Emit phases in order of first occurrence, matching the reference dictionaries
+    seen_codes, first_index = np.unique(phase_codes, return_index=True)
+    return seen_codes[np.argsort(first_index)]
+
+
+# ----------------------
+# Function: Calculate Phase Durations and Counts
+# ----------------------
+def calculate_phase_durations_and_counts(organized_data):
+    """
+    Calculates total duration and count of occurrences for each phase.
+
+    Args:
+        organized_data (pandas.DataFrame): The output from `process_data`.
+
+    Returns:
+        tuple: Two dictionaries:
+            - phase_durations: Total time spent in each phase (in seconds).
+            - phase_counts: How many times each phase occurred.
+    """
+    phase_codes, durations = _phase_durations(organized_data)
+
+    phase_categories = organized_data["phase"].cat.categories
+    totals = np.bincount(
+        phase_codes, weights=durations, minlength=len(phase_categories)
+    )
+    counts = np.bincount(phase_codes, minlength=len(phase_categories))
+
+    phase_durations = {}
+    phase_counts = {}
+    for code in _codes_in_first_occurrence_order(phase_codes):
+        phase = phase_categories[code]
+        phase_durations[phase] = totals[code] / 1e6
+        phase_counts[phase] = int(counts[code])
+
+    return phase_durations, phase_counts
+
+
+# ----------------------
+# Function: Calculate Phase Sketches
+# ----------------------
+def calculate_phase_sketches(organized_data):
+    """
+    Summarizes the distribution of each phase's durations as a mergeable quantile sketch.
+
+    Args:
+        organized_data (pandas.DataFrame): The output from `process_data`.
+
+    Returns:
+        dict: {phase: TDigest} of durations in seconds, for `calculate_duration_statistic`.
+    """
+    phase_codes, durations = _phase_durations(organized_data)
+    phase_categories = organized_data["phase"].cat.categories
+
+    # Group the durations by phase with one sort, then sketch each run
+    order = np.argsort(phase_codes, kind="stable")
+    sorted_codes = phase_codes[order]
+    seconds = durations[order] / 1e6
+    bounds = np.searchsorted(sorted_codes, np.arange(len(phase_categories) + 1))
+    return {
+        phase_categories[code]: TDigest.from_values(seconds[bounds[code] : bounds[code + 1]])
+        for code in _codes_in_first_occurrence_order(phase_codes)
+    }
+
+
+# ----------------------
+# Function: Build Gantt Data
+# ----------------------
+def build_gantt_data(organized_data):
+    """
+    Formats organized phase data into Gantt chart rows.
+
+    Args:
+        organized_data (pandas.DataFrame): The output from `process_data`.
+
+    Returns:
+        pandas.DataFrame: Columns 'Task', 'Start', 'Finish' and 'Target ID' for `create_gantt_chart`.
+    """
+    has_next = _next_in_group(organized_data)
+    starts = organized_data["phase_timestamp"].to_numpy()
+
+    # Use next phase's start as this phase's end time, or duplicate start if last
+    finishes = starts.copy()
+    finishes[:-1][has_next[:-1]] = starts[1:][has_next[:-1]]
+
+    return pd.DataFrame(
+        {
+            "Task": organized_data["phase"].to_numpy(),
+            "Start": starts,
+            "Finish": finishes,
+            "Target ID": organized_data["target_id"].to_numpy(),
+        }
+    )
@@ -0,0 +1,34 @@
+import os
+import sys
+
+# ----------------------
+# Benchmark Suite
+# ----------------------
+# Measures how the dashboard's hot path scales with the amount of phase data, without a
+# database or a browser:
+#   - generator.py: deterministic synthetic phase events (N targets x M phases x D days)
+#   - fake_db.py:   in-process stand-in for database.get_data_from_db
+#   - stages.py:    microbenchmarks of each stage (processing, durations, Gantt rows,
+#                   figure building, JSON serialization time and size)
+#   - callback.py:  end-to-end runs of the update_graphs callback
+#   - run.py:       runs everything, records results and, with --check, fails on
+#                   regressions against a baseline recorded on the same machine
+#
+# Usage (from the Dash directory):
+#   python -m benchmarks.run
+#   python -m benchmarks.run --update-baseline    # on the base branch
+#   python -m benchmarks.run --check              # on the change
+
+# The app's modules are flat files in app/ imported by name, as in the app itself
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+# Keep runs self-contained: in-process Python aggregation, no track store, chat log,
+# push listener or partition maintenance. Must be set before config is imported.
+os.environ.setdefault("AGGREGATION_MODE", "python")
+os.environ.setdefault("SERVING_MODE", "single")
+os.environ.setdefault("UPDATE_MODE", "poll")
+os.environ.setdefault("PARTITION_MAINTENANCE_INTERVAL", "0")
+os.environ.setdefault("TRACK_STORE_DIR", os.path.join(APP_DIR, ".benchmark-no-track-store"))
+os.environ["CHAT_LOG_PATH"] = ""
@@ -0,0 +1,101 @@
+from plotly.io.json import to_json_plotly
+
+import app
+from benchmarks.fake_db import FakeDatabase
+from benchmarks.stages import measure
+from response_encoding import compress_body
+
+# ----------------------
+# End-to-End Callback Benchmarks
+# ----------------------
+# Drives `app.update_graphs` the way a browser's interval tick does, against FakeDatabase
+# instead of Postgres, for the three situations a tick can be in:
+#   - first_load: nothing cached and nothing rendered yet (whole figures are built)
+#   - new_rows:   rows arrived since the browser's last render (new view, sent as a patch)
+#   - unchanged:  nothing arrived (the callback should return almost immediately)
+# The response size is the JSON Dash would send back for the callback's outputs, and its
+# gzip-compressed size on the wire. The "encode" cases time turning the outputs into those
+# bytes (JSON encoding plus compression), the server CPU a tick costs after the callback.
+
+TABS = {0: "bars", 1: "gantt"}
+
+
+# ----------------------
+# Function: Run Callback Benchmarks
+# ----------------------
+def run_callback_benchmarks(rows, tick_size=50, selected_date="all", repeat=5):
+    """
+    Benchmarks the dashboard callback end to end.
+
+    Args:
+        rows (list of tuples): Generated rows in time order; the newest
+            `tick_size * repeat * len(TABS)` of them are held back and inserted a tick at a time.
+        tick_size (int): Rows inserted before each "new_rows" run.
+        selected_date (str): Date selected in the dropdown ("all" or "YYYY-MM-DD").
+        repeat (int): Timed runs per case.
+
+    Returns:
+        dict: {case name: {"median_s", "min_s", "runs", "json_bytes"[, "wire_bytes"]}}.
+    """
+    held_back = tick_size * repeat * len(TABS)
+    ticks = [
+        rows[start : start + tick_size]
+        for start in range(len(rows) - held_back, len(rows), tick_size)
+    ]
+    fake = FakeDatabase(rows[: len(rows) - held_back])
+    fake.install(app)
+    results = {}
+    try:
+        n_intervals = 0
+        for tab_index, tab_name in TABS.items():
+            browser = {"options": None, "rendered": None}
+
+            def tick():
+                # One interval tick from a browser that remembers what it rendered
+                nonlocal n_intervals
+                n_intervals += 1
+                outputs = app.update_graphs(
+                    n_intervals,
+                    selected_date,
+                    tab_index,
+                    None,
+                    None,
+                    "mean",
+                    None,
+                    browser["options"],
+                    browser["rendered"],
+                )
+                if outputs[0] is not app.no_update:
+                    browser["options"] = outputs[0]
+                if outputs[-1] is not app.no_update:
+                    browser["rendered"] = outputs[-1]
+                return outputs
+
+            def first_load():
+                with app._view_history_lock:
+                    app._view_history.clear()
+                browser.update(options=None, rendered=None)
+                return ()
+
+            def new_rows():
+                fake.insert(ticks.pop(0))
+                return ()
+
+            for case, setup in (
+                ("first_load", first_load),
+                ("new_rows", new_rows),
+                ("unchanged", None),
+            ):
+                timings, outputs = measure(tick, repeat, setup=setup)
+                # Dash leaves outputs that are not updated out of the response
+                sent = [output for output in outputs if output is not app.no_update]
+                payload = to_json_plotly(sent).encode()
+                timings["json_bytes"] = len(payload)
+                timings["wire_bytes"] = len(compress_body(payload, "gzip"))
+                results[f"callback.{tab_name}.{case}"] = timings
+                results[f"encode.{tab_name}.{case}"], _ = measure(
+                    lambda: compress_body(to_json_plotly(sent).encode(), "gzip"), repeat
+                )
+    finally:
+        fake.uninstall()
+    return results
@@ -0,0 +1,90 @@
+import time
+
+import database
+from event_store import EventStore
+
+# ----------------------
+# In-Process Database Stand-In
+# ----------------------
+# Replaces `database.get_data_from_db` with a function that serves generated rows, so the
+# dashboard callback can be benchmarked without Postgres. It fills the same in-process
+# snapshot the real function does (rows, version, event store), so everything downstream
+# - get_snapshot, get_event_store, the view cache - runs unchanged. Rows handed to
+# `FakeDatabase.insert` show up on the next fetch, like rows inserted into the table.
+
+
+# ----------------------
+# Class: Fake Database
+# ----------------------
+class FakeDatabase:
+    """
+    Serves generated rows through the `database` module's snapshot.
+
+    Attributes:
+        fetches (int): Number of times the fake `get_data_from_db` was called.
+    """
+
+    def __init__(self, rows=()):
+        self._pending = list(rows)
+        self.fetches = 0
+        self._originals = {}
+
+    def insert(self, rows):
+        """
+        Queues rows to be returned by the next fetch.
+
+        Args:
+            rows (iterable of tuples): (target_id, phase_timestamp, phase) rows.
+        """
+        self._pending.extend(rows)
+
+    def get_data_from_db(self, incremental=True):
+        """
+        Stand-in for `database.get_data_from_db`: appends queued rows to the snapshot.
+
+        Args:
+            incremental (bool): Ignored; queued rows are always appended.
+
+        Returns:
+            tuple: (data, available_dates), as returned by `database.get_data_from_db`.
+        """
+        snapshot = database._snapshot
+        self.fetches += 1
+        fetched_rows, self._pending = self._pending, []
+        if fetched_rows:
+            rows = snapshot.rows.appended(fetched_rows)
+            target_id, phase_timestamp, phase = rows[-1]
+            snapshot = snapshot._replace(
+                rows=rows,
+                watermark=(phase_timestamp, target_id, phase),
+                version=snapshot.version + 1,
+                events=snapshot.events.extended(fetched_rows),
+            )
+        if snapshot.last_full_sync is None:
+            snapshot = snapshot._replace(last_full_sync=time.monotonic())
+        database._snapshot = snapshot
+        return snapshot.rows, snapshot.events.dates()
+
+    def install(self, *modules):
+        """
+        Empties the snapshot and patches `get_data_from_db` in `database` and `modules`.
+
+        Args:
+            *modules (module): Modules that imported `get_data_from_db` by name (e.g. app).
+        """
+        database._snapshot = database.Snapshot(
+            rows=database.RowLog(),
+            watermark=None,
+            last_full_sync=None,
+            version=0,
+            events=EventStore(),
+        )
+        for module in (database,) + modules:
+            self._originals[module] = module.get_data_from_db
+            module.get_data_from_db = self.get_data_from_db
+
+    def uninstall(self):
+        """Restores the original `get_data_from_db` functions."""
+        for module, original in self._originals.items():
+            module.get_data_from_db = original
+        self._originals = {}
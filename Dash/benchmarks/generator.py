@@ -0,0 +1,77 @@
+import random
+from datetime import datetime, timedelta
+
+# ----------------------
+# Synthetic Phase Events
+# ----------------------
+# Generates rows shaped like data.csv: every target walks through the phases in order
+# (find -> fix -> track -> target -> engage -> assess) once per day, with a minute or so
+# between phase changes and targets starting a little apart. A fixed seed makes every run
+# produce exactly the same rows.
+
+PHASES = ["find", "fix", "track", "target", "engage", "assess"]
+START = datetime(2024, 5, 16, 8, 0, 0)
+
+
+# ----------------------
+# Function: Phase Names
+# ----------------------
+def phase_names(phase_count):
+    """
+    Returns the first `phase_count` phases of the data.csv vocabulary, extended if needed.
+
+    Args:
+        phase_count (int): Number of distinct phases.
+
+    Returns:
+        list of str: Phase names in kill-chain order.
+    """
+    extra = [f"phase{i}" for i in range(len(PHASES) + 1, phase_count + 1)]
+    return (PHASES + extra)[:phase_count]
+
+
+# ----------------------
+# Function: Generate Rows
+# ----------------------
+def generate_rows(targets, phases=len(PHASES), days=1, seed=0):
+    """
+    Generates deterministic phase events.
+
+    Args:
+        targets (int): Number of targets (Target0, Target1, ...).
+        phases (int): Number of phases each target passes through per day.
+        days (int): Number of consecutive days.
+        seed (int): Random seed; equal arguments always give equal rows.
+
+    Returns:
+        list of tuples: (target_id, phase_timestamp, phase) rows ordered by timestamp,
+        like `database.get_data_from_db` returns them.
+    """
+    rng = random.Random(seed)
+    names = phase_names(phases)
+    rows = []
+    for day in range(days):
+        day_start = START + timedelta(days=day)
+        for target in range(targets):
+            timestamp = day_start + timedelta(seconds=rng.randint(0, 3600))
+            for phase in names:
+                rows.append((f"Target{target}", timestamp, phase))
+                timestamp += timedelta(seconds=rng.randint(30, 120))
+    rows.sort(key=lambda row: (row[1], row[0], row[2]))
+    return rows
+
+
+# ----------------------
+# Function: Unique Dates
+# ----------------------
+def unique_dates(rows):
+    """
+    Returns the distinct dates of generated rows, as the date selector lists them.
+
+    Args:
+        rows (list of tuples): Rows from `generate_rows`.
+
+    Returns:
+        list of str: Dates (YYYY-MM-DD), ascending.
+    """
+    return sorted({str(row[1].date()) for row in rows})
@@ -0,0 +1,212 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+from benchmarks.generator import generate_rows
+from benchmarks.stages import run_stage_benchmarks
+from benchmarks.callback import run_callback_benchmarks
+
+# ----------------------
+# Benchmark Runner
+# ----------------------
+# Runs the stage and callback benchmarks on a generated data set, writes the results to
+# JSON and reports the change against the baseline of the same scale, if there is one.
+# Timings depend on the machine, so the baseline is never committed: record it locally
+# with --update-baseline (e.g. on the base branch), then --check fails with status 1 if a
+# case got slower (or its JSON larger) than the baseline allows. Without --check a run
+# only reports.
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, "results.json")
+
+# Data set sizes: N targets x M phases x D days
+SCALES = {
+    "small": {"targets": 100, "phases": 6, "days": 2},
+    "medium": {"targets": 1000, "phases": 6, "days": 5},
+    "large": {"targets": 5000, "phases": 6, "days": 10},
+}
+
+# Time differences below this are noise for the fastest cases, whatever the ratio
+MIN_REGRESSION_S = 0.002
+
+
+# ----------------------
+# Function: Run Benchmarks
+# ----------------------
+def run_benchmarks(params, repeat=5, seed=0):
+    """
+    Generates a data set and runs every benchmark on it.
+
+    Args:
+        params (dict): {"targets", "phases", "days"} of the data set.
+        repeat (int): Timed runs per case.
+        seed (int): Generator seed.
+
+    Returns:
+        dict: {case name: timings}, stage cases first.
+    """
+    rows = generate_rows(params["targets"], params["phases"], params["days"], seed=seed)
+    # The app reports every database fetch on stdout; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_stage_benchmarks(rows, repeat=repeat)
+        results.update(run_callback_benchmarks(rows, repeat=repeat))
+    return results
+
+
+# ----------------------
+# Function: Compare with Baseline
+# ----------------------
+def compare_with_baseline(results, baseline, tolerance, bytes_tolerance):
+    """
+    Finds the cases that regressed against a baseline.
+
+    Args:
+        results (dict): {case name: timings} of this run.
+        baseline (dict): {case name: timings} of the baseline run.
+        tolerance (float): Allowed relative increase of the median time (0.5 = 50 %).
+        bytes_tolerance (float): Allowed relative increase of the JSON and wire sizes.
+
+    Returns:
+        list of str: One message per regression (empty if none).
+    """
+    regressions = []
+    for case, timings in results.items():
+        base = baseline.get(case)
+        if base is None:
+            continue
+        limit = base["median_s"] * (1 + tolerance)
+        if timings["median_s"] > limit and timings["median_s"] - base["median_s"] > MIN_REGRESSION_S:
+            regressions.append(
+                f"{case}: {timings['median_s'] * 1000:.2f} ms, baseline "
+                f"{base['median_s'] * 1000:.2f} ms (limit {limit * 1000:.2f} ms)"
+            )
+        for size in ("json_bytes", "wire_bytes"):
+            if size in base and timings.get(size, 0) > base[size] * (1 + bytes_tolerance):
+                regressions.append(
+                    f"{case}: {timings[size]} {size.replace('_', ' ')}, baseline {base[size]}"
+                )
+    return regressions
+
+
+# ----------------------
+# Function: Format Report
+# ----------------------
+def format_report(results, baseline):
+    """
+    Formats results as a table with the change against the baseline.
+
+    Args:
+        results (dict): {case name: timings} of this run.
+        baseline (dict): {case name: timings} of the baseline run (may be empty).
+
+    Returns:
+        str: The table.
+    """
+    lines = [
+        f"{'case':<40} {'median ms':>10} {'min ms':>10} {'json bytes':>11} {'wire bytes':>11} "
+        f"{'vs base':>8}"
+    ]
+    for case, timings in results.items():
+        base = baseline.get(case)
+        change = f"{timings['median_s'] / base['median_s'] - 1:+.0%}" if base else "new"
+        json_bytes = timings.get("json_bytes", "")
+        wire_bytes = timings.get("wire_bytes", "")
+        lines.append(
+            f"{case:<40} {timings['median_s'] * 1000:>10.2f} {timings['min_s'] * 1000:>10.2f} "
+            f"{json_bytes:>11} {wire_bytes:>11} {change:>8}"
+        )
+    return "\n".join(lines)
+
+
+# ----------------------
+# Function: Main
+# ----------------------
+def main():
+    """
+    Command line entry point: runs the benchmarks and reports (or checks) them against the
+    local baseline.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's update path.")
+    parser.add_argument("--scale", choices=SCALES, default="medium", help="data set size")
+    parser.add_argument("--targets", type=int, help="override the number of targets")
+    parser.add_argument("--phases", type=int, help="override the number of phases per target")
+    parser.add_argument("--days", type=int, help="override the number of days")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--seed", type=int, default=0, help="generator seed")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown (0.5 = 50%%)")
+    parser.add_argument("--bytes-tolerance", type=float, default=0.05, help="allowed JSON/wire growth")
+    parser.add_argument(
+        "--baseline", default=DEFAULT_BASELINE, help="baseline JSON file (recorded on this machine)"
+    )
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write this run's results")
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="store this run as the baseline for its scale"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="exit with status 1 on regressions against the baseline"
+    )
+    args = parser.parse_args()
+    if args.check and args.update_baseline:
+        parser.error("--check and --update-baseline are exclusive")
+
+    params = dict(SCALES[args.scale])
+    for key in ("targets", "phases", "days"):
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+    # Baselines are kept per data set, so overridden sizes get their own entry
+    scale_key = args.scale if params == SCALES[args.scale] else (
+        f"{params['targets']}x{params['phases']}x{params['days']}"
+    )
+
+    results = run_benchmarks(params, repeat=args.repeat, seed=args.seed)
+    run = {
+        "scale": scale_key,
+        "params": params,
+        "recorded": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cases": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(run, f, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    baseline = baselines.get(scale_key, {}).get("cases", {})
+
+    print(f"Data set {scale_key}: {params['targets']} targets x {params['phases']} phases x {params['days']} days")
+    print(format_report(results, baseline))
+
+    if args.update_baseline:
+        baselines[scale_key] = run
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline for {scale_key} written to {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"No baseline for {scale_key}; run with --update-baseline to record one.")
+        if args.check:
+            sys.exit(2)
+        return
+    if not args.check:
+        return
+    regressions = compare_with_baseline(results, baseline, args.tolerance, args.bytes_tolerance)
+    if regressions:
+        print("Regressions:")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import statistics
+import time
+
+import plotly.express as px
+from plotly.io.json import to_json_plotly
+
+import data_processing
+import vectorized_processing
+from event_store import EventStore
+from gantt_lod import prepare_gantt_bars
+from graphs import (
+    create_avg_duration_bar,
+    create_phase_count_bar,
+    create_gantt_chart,
+    create_lod_gantt_chart,
+)
+from replay import ReplayEngine
+from response_encoding import compress_body
+
+# ----------------------
+# Stage Microbenchmarks
+# ----------------------
+# Times each step between the fetched rows and the JSON a browser receives, for both
+# processing engines, so a slowdown can be pinned on one stage. Figures are also serialized
+# the way Dash does (plotly's JSON encoder) and gzip-compressed the way the server sends
+# them, to record how many bytes each one costs before and on the wire.
+
+ENGINES = {"reference": data_processing, "vectorized": vectorized_processing}
+
+
+# ----------------------
+# Function: Measure
+# ----------------------
+def measure(function, repeat=5, setup=None):
+    """
+    Times a function over several runs.
+
+    Args:
+        function (callable): Called with the arguments returned by `setup` (or none).
+        repeat (int): Number of timed runs.
+        setup (callable, optional): Untimed preparation before each run; returns a tuple of
+            arguments for `function`.
+
+    Returns:
+        tuple: (timings, result) where timings is {"median_s", "min_s", "runs"} and result
+        is the return value of the last run.
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        args = setup() if setup is not None else ()
+        start = time.perf_counter()
+        result = function(*args)
+        times.append(time.perf_counter() - start)
+    timings = {"median_s": statistics.median(times), "min_s": min(times), "runs": repeat}
+    return timings, result
+
+
+# ----------------------
+# Function: Phase Colors
+# ----------------------
+def phase_colors(phases):
+    """
+    Assigns colors to phases the way `app.calculate_phase_stats` does.
+
+    Args:
+        phases (iterable of str): Phase names.
+
+    Returns:
+        dict: {phase: color}.
+    """
+    palette = px.colors.qualitative.Set1
+    return {phase: palette[i % len(palette)] for i, phase in enumerate(phases)}
+
+
+# ----------------------
+# Function: Run Stage Benchmarks
+# ----------------------
+def run_stage_benchmarks(rows, selected_date="all", repeat=5, express_limit=20000):
+    """
+    Benchmarks every processing and figure-building stage on the given rows.
+
+    Args:
+        rows (list of tuples): (target_id, phase_timestamp, phase) rows.
+        selected_date (str): Date filter passed to the stages ("all" or "YYYY-MM-DD").
+        repeat (int): Timed runs per stage.
+        express_limit (int): Skip the express Gantt chart (one SVG bar per interval) above
+            this many bars; it is only meant for small data sets.
+
+    Returns:
+        dict: {case name: {"median_s", "min_s", "runs"[, "json_bytes", "wire_bytes"]}}.
+    """
+    results = {}
+
+    # Processing stages, once per engine
+    gantt_data = None
+    for name, engine in ENGINES.items():
+        results[f"{name}.process_data"], organized = measure(
+            lambda: engine.process_data(rows, selected_date), repeat
+        )
+        results[f"{name}.durations_and_counts"], (durations, counts) = measure(
+            lambda: engine.calculate_phase_durations_and_counts(organized), repeat
+        )
+        results[f"{name}.average_duration"], averages = measure(
+            lambda: engine.calculate_average_duration(durations, counts), repeat
+        )
+        results[f"{name}.phase_sketches"], _ = measure(
+            lambda: engine.calculate_phase_sketches(organized), repeat
+        )
+        results[f"{name}.build_gantt_data"], gantt_data = measure(
+            lambda: engine.build_gantt_data(organized), repeat
+        )
+
+    # The event store the single-process app serves views from
+    results["event_store.build"], store = measure(lambda: EventStore(rows), repeat)
+    results["event_store.phase_stats_cold"], _ = measure(
+        lambda fresh: fresh.phase_stats(selected_date),
+        repeat,
+        setup=lambda: (EventStore(rows),),
+    )
+    store.phase_stats(selected_date)
+    results["event_store.phase_stats_warm"], _ = measure(
+        lambda: store.phase_stats(selected_date), repeat
+    )
+    results["event_store.phase_sketches_warm"], _ = measure(
+        lambda: store.phase_sketches(selected_date), repeat
+    )
+    # Drill-down into one target (the first one) through the per-target index
+    target_id = str(rows[0][0])
+    results["event_store.target_stats_cold"], _ = measure(
+        lambda fresh: fresh.target_stats(target_id, selected_date),
+        repeat,
+        setup=lambda: (EventStore(rows),),
+    )
+    results["event_store.target_timeline"], _ = measure(
+        lambda: store.target_timeline(target_id, selected_date), repeat
+    )
+
+    # Replay: building an engine, playing it through, one tick at 100x and seeking back
+    results["replay.build"], engine = measure(
+        lambda: ReplayEngine(rows, selected_date), repeat
+    )
+    start, end = engine.bounds()
+    results["replay.full"], _ = measure(
+        lambda fresh: fresh.state_at(end),
+        repeat,
+        setup=lambda: (ReplayEngine(rows, selected_date),),
+    )
+    middle = (start + end) / 2
+    tick = 100 * 1.0  # One 1 s tick at 100x
+
+    def move_to(cursor):
+        # Untimed setup: put the engine at a cursor first
+        engine.state_at(cursor)
+        return ()
+
+    results["replay.tick"], _ = measure(
+        lambda: engine.state_at(middle + tick), repeat, setup=lambda: move_to(middle)
+    )
+    results["replay.seek_back"], _ = measure(
+        lambda: engine.state_at(middle), repeat, setup=lambda: move_to(end)
+    )
+
+    # Figures, and what they cost on the wire
+    colors = phase_colors(durations)
+    figures = {
+        "avg_duration_bar": lambda: create_avg_duration_bar(averages, colors),
+        "phase_count_bar": lambda: create_phase_count_bar(counts, colors),
+        "gantt_lod": lambda: create_lod_gantt_chart(
+            gantt_data, colors, prepared=prepare_gantt_bars(gantt_data)
+        ),
+    }
+    if len(gantt_data) <= express_limit:
+        figures["gantt_express"] = lambda: create_gantt_chart(gantt_data, colors)
+    for name, build in figures.items():
+        results[f"graphs.{name}"], figure = measure(build, repeat)
+        results[f"json.{name}"], payload = measure(lambda: to_json_plotly(figure), repeat)
+        results[f"json.{name}"]["json_bytes"] = len(payload)
+        body = payload.encode()
+        results[f"gzip.{name}"], compressed = measure(lambda: compress_body(body, "gzip"), repeat)
+        results[f"gzip.{name}"]["wire_bytes"] = len(compressed)
+
+    return results
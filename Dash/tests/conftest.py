@@ -0,0 +1,73 @@
+import os
+import sys
+import uuid
+
+import psycopg2
+import pytest
+
+# ----------------------
+# Test Setup
+# ----------------------
+# The app's modules are flat files in app/ imported by name, as in the app itself, and the
+# benchmark data generator is shared with the tests. Tests run without a database, track
+# store, chat log or background threads unless a test sets them up itself; these settings
+# must be in place before config is imported.
+DASH_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(DASH_DIR, "app")
+for path in (APP_DIR, DASH_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ.setdefault("AGGREGATION_MODE", "python")
+os.environ.setdefault("SERVING_MODE", "single")
+os.environ.setdefault("UPDATE_MODE", "poll")
+os.environ.setdefault("PARTITION_MAINTENANCE_INTERVAL", "0")
+os.environ.setdefault("TRACK_STORE_DIR", os.path.join(APP_DIR, ".test-no-track-store"))
+os.environ["CHAT_LOG_PATH"] = ""
+
+
+# ----------------------
+# Fixture: Scratch Database
+# ----------------------
+@pytest.fixture
+def scratch_db():
+    # A connection to the configured Postgres (DB_HOST etc.), working in a schema of its
+    # own that is dropped afterwards; skipped when no server is reachable
+    from config import DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER
+
+    settings = dict(
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        connect_timeout=2,
+    )
+    try:
+        admin = psycopg2.connect(**settings)
+    except psycopg2.OperationalError as error:
+        pytest.skip(f"Postgres at {DB_HOST}:{DB_PORT} is not reachable: {error}")
+    schema = f"dash_test_{uuid.uuid4().hex[:8]}"
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {schema}")
+    conn = psycopg2.connect(**settings, options=f"-c search_path={schema}")
+    try:
+        yield conn
+    finally:
+        conn.close()
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+
+# ----------------------
+# Fixture: Snapshot Directory
+# ----------------------
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    # The reader caches the mapped version by number; start each directory afresh
+    import shared_snapshot
+
+    monkeypatch.setattr(shared_snapshot, "_reader_cache", {"version": None, "snapshot": None})
+    return str(tmp_path)
@@ -0,0 +1,132 @@
+from datetime import date, datetime
+
+import pytest
+
+from chat_log import (
+    ChatIndex,
+    ChatLogTail,
+    chat_events_for_target,
+    extract_track_numbers,
+    parse_chat_line,
+)
+
+LOG_DATE = date(2025, 4, 1)
+
+
+@pytest.mark.parametrize(
+    "text, tracks",
+    [
+        ("Intel, color TN 44642", [44642]),
+        ("@AOC CCO_ , tn44834 upgrade ID To hostile, DDG1", [44834]),
+        ("@Hydro c TN44834, working", [44834]),
+        ("Tn44833 is friendly", [44833]),
+        ("TNs 44953, 45044, and 78044 are fishing vessels", [44953, 45044, 78044]),
+        ("tns 44953/45044 & 78044", [44953, 45044, 78044]),
+        ("trk 44834 heading 270", [44834]),
+        ("tk 44853 fading", [44853]),
+        ("track 4483 lost", [4483]),
+        ("tracking 44833 and track #44834", [44833, 44834]),
+        ("44642 is civilian aircraft", [44642]),
+        ("c, 44846 fishing vessel", [44846]),
+        ("TN 44642 again, 44642 still", [44642]),
+        # Not track numbers: decimals, codes and longer numbers
+        ("speed 12.44642 kts, time 1201Z", []),
+        ("source #E4123 and 12345678", []),
+        ("freq 251.12345 / ref 2025-44642", []),
+        ("trackers 44642 online", [44642]),
+    ],
+)
+def test_extract_track_numbers(text, tracks):
+    assert extract_track_numbers(text) == tracks
+
+
+def test_parse_chat_line_and_relay():
+    event = parse_chat_line("[10:41:25] wf_beep: AOC_SIDO: @Hydro c TN44834, working\n", LOG_DATE)
+    assert event.timestamp == datetime(2025, 4, 1, 10, 41, 25)
+    assert event.sender == "wf_beep"
+    assert event.relayed_for == "AOC_SIDO"
+    assert event.text == "AOC_SIDO: @Hydro c TN44834, working"
+    assert event.tracks == [44834]
+
+    event = parse_chat_line("[9:05:00] Hydro_MSO: Intel, color TN 44642", LOG_DATE)
+    assert event.timestamp == datetime(2025, 4, 1, 9, 5)
+    assert event.relayed_for is None
+    assert parse_chat_line("*** Hydro_MSO has joined", LOG_DATE) is None
+
+
+def test_index_orders_events_by_time():
+    index = ChatIndex()
+    for line in (
+        "[10:00:00] a: TN 44642 first",
+        "[10:05:00] b: TN 44642 and TN 44643",
+        "[10:02:00] c: TN 44642 late line",
+    ):
+        index.add(parse_chat_line(line, LOG_DATE))
+    assert index.tracks() == [44642, 44643]
+    assert [e.sender for e in index.events_for_track(44642)] == ["a", "c", "b"]
+    assert [e.sender for e in index.events_for_track("44642")] == ["a", "c", "b"]
+    window = index.events_for_track(
+        44642, start=datetime(2025, 4, 1, 10, 2), end=datetime(2025, 4, 1, 10, 5)
+    )
+    assert [e.sender for e in window] == ["c"]
+    assert index.events_for_track("T-44642") == []
+    assert index.events_for_track(99999) == []
+
+
+def test_chat_events_for_target_keeps_the_latest_of_the_day():
+    index = ChatIndex()
+    for line, day in (
+        ("[23:50:00] a: TN 44642 before midnight", LOG_DATE),
+        ("[00:10:00] b: TN 44642 next day", date(2025, 4, 2)),
+        ("[00:20:00] c: TN 44642 again", date(2025, 4, 2)),
+        ("[00:30:00] d: TN 44643 other track", date(2025, 4, 2)),
+    ):
+        index.add(parse_chat_line(line, day))
+    senders = lambda events: [e.sender for e in events]  # noqa: E731
+    assert senders(chat_events_for_target(index, "44642", "2025-04-02")) == ["b", "c"]
+    assert senders(chat_events_for_target(index, "44642", "2025-04-01")) == ["a"]
+    assert senders(chat_events_for_target(index, "44642", "all", limit=2)) == ["b", "c"]
+    assert chat_events_for_target(index, "44642", "all", limit=0) == []
+    assert chat_events_for_target(index, "Target0", "all") == []
+
+
+def test_tail_rolls_over_midnight(tmp_path):
+    path = tmp_path / "chat.log"
+    path.write_text("[23:58:00] a: TN 44642\n[23:59:59] b: TN 44642\n")
+    tail = ChatLogTail(str(path), LOG_DATE)
+    assert [e.timestamp for e in tail.poll()] == [
+        datetime(2025, 4, 1, 23, 58),
+        datetime(2025, 4, 1, 23, 59, 59),
+    ]
+
+    # Lines appended after midnight belong to the next day, and stay there
+    with open(path, "a") as f:
+        f.write("[00:00:30] c: TN 44642\n[00:10:00] d: TN 44642\n[13:00:00] e: TN 44642\n")
+    assert [e.timestamp for e in tail.poll()] == [
+        datetime(2025, 4, 2, 0, 0, 30),
+        datetime(2025, 4, 2, 0, 10),
+        datetime(2025, 4, 2, 13, 0),
+    ]
+    # A line slightly out of order is not a new day
+    with open(path, "a") as f:
+        f.write("[12:59:00] f: TN 44642\n")
+    assert [e.timestamp for e in tail.poll()] == [datetime(2025, 4, 2, 12, 59)]
+    assert len(tail.index.events_for_track(44642)) == 6
+
+
+def test_tail_waits_for_complete_lines(tmp_path):
+    path = tmp_path / "chat.log"
+    path.write_text("[10:00:00] a: TN 44642\n[10:00:05] b: TN 446")
+    tail = ChatLogTail(str(path), LOG_DATE)
+    assert [e.sender for e in tail.poll()] == ["a"]
+    assert tail.poll() == []
+    with open(path, "a") as f:
+        f.write("43\nnot a chat line\n")
+    events = tail.poll()
+    assert [(e.sender, e.tracks) for e in events] == [("b", [44643])]
+    assert tail.lines_skipped == 1
+
+    # A truncated file is read again from the top
+    path.write_text("[11:00:00] c: TN 44644\n")
+    assert [e.sender for e in tail.poll()] == ["c"]
+    assert tail.index.tracks() == [44644]
@@ -0,0 +1,220 @@
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import database
+import ingest
+from conftest import DASH_DIR
+from database import (
+    PHASE_TRANSITIONS_CTE,
+    ROLL_UP_CLOSED_DAYS_QUERY,
+    ROLLUP_INSERT,
+    DatabaseTargetIndex,
+    RowLog,
+    _reroll_dirty_days,
+    _stream_full_resync,
+)
+from event_store import EventStore
+
+START = datetime(2024, 5, 16, 8, 0, 0)
+
+
+def make_rows(count, offset=0):
+    # Rows ordered like the fetch query returns them
+    return [
+        (f"Target{i % 3}", START + timedelta(minutes=offset + i), "find") for i in range(count)
+    ]
+
+
+def batches_of(rows, size):
+    return [rows[i : i + size] for i in range(0, len(rows), size)]
+
+
+def test_row_log_appends_without_changing_older_logs():
+    logs, rows = [RowLog()], []
+    for size in (10, 1, 3, 3, 7, 2, 30, 1):
+        batch = make_rows(size, offset=len(rows))
+        logs.append(logs[-1].appended(batch))
+        rows += batch
+    log = logs[-1]
+    assert list(log) == rows and len(log) == len(rows)
+    assert [log[i] for i in (0, 10, 11, -1, -len(rows))] == [
+        rows[i] for i in (0, 10, 11, -1, -len(rows))
+    ]
+    for start, stop in ((0, 57), (5, 15), (11, 14), (20, 20), (40, 100), (-5, None)):
+        assert log[start:stop] == rows[start:stop]
+    assert log[::2] == rows[::2]
+    # Chunk sizes keep decreasing, so there are few of them
+    sizes = [len(chunk) for chunk in log._chunks]
+    assert sizes == sorted(sizes, reverse=True) and len(set(sizes)) == len(sizes)
+    # Logs handed out earlier still hold their own rows
+    assert list(logs[3]) == rows[:14]
+    assert not logs[0]
+
+
+def test_unchanged_table_keeps_the_snapshot():
+    old_rows = make_rows(10)
+    rows, events, appended, fetched = _stream_full_resync(batches_of(list(old_rows), 3), old_rows)
+    assert rows is None and events is None
+    assert appended == []
+    assert fetched == 10
+
+
+def test_new_rows_are_appended_without_rebuilding():
+    old_rows = make_rows(10)
+    table = make_rows(14)
+    rows, events, appended, fetched = _stream_full_resync(batches_of(table, 4), old_rows)
+    assert rows is None and events is None
+    assert appended == table[10:]
+    assert fetched == 14
+
+
+def test_back_filled_row_rebuilds_from_the_first_difference():
+    old_rows = make_rows(10)
+    late = ("Target9", old_rows[4][1] + timedelta(seconds=1), "fix")
+    table = old_rows[:5] + [late] + old_rows[5:] + make_rows(2, offset=100)
+    rows, events, appended, fetched = _stream_full_resync(batches_of(table, 3), old_rows)
+    assert rows == table
+    assert events.row_count == len(table)
+    assert events.phase_stats("all") == EventStore(table).phase_stats("all")
+    assert fetched == len(table)
+
+
+def test_deleted_rows_shrink_the_snapshot():
+    old_rows = make_rows(10)
+    rows, events, _, _ = _stream_full_resync(batches_of(old_rows[:7], 3), old_rows)
+    assert rows == old_rows[:7]
+    assert events.row_count == 7
+
+    rows, events, _, _ = _stream_full_resync([], old_rows)
+    assert rows == [] and events.row_count == 0
+
+
+def test_empty_snapshot_collects_every_row():
+    table = make_rows(5)
+    rows, events, appended, _ = _stream_full_resync(batches_of(table, 2), [])
+    assert rows is None
+    assert appended == table
+
+
+def day_rollup(cur, day):
+    cur.execute(
+        "SELECT phase, sum_seconds, phase_count FROM phase_daily_rollup "
+        "WHERE day = %s ORDER BY phase",
+        (day,),
+    )
+    return [(phase, round(seconds, 3), count) for phase, seconds, count in cur.fetchall()]
+
+
+def day_from_raw_rows(cur, day):
+    cur.execute(
+        PHASE_TRANSITIONS_CTE.format(
+            where_clause="WHERE phase_timestamp >= %s::date AND phase_timestamp < %s::date + 1"
+        )
+        + """
+        SELECT phase, SUM(EXTRACT(EPOCH FROM next_timestamp - phase_timestamp)), COUNT(*)
+        FROM transitions
+        WHERE next_timestamp IS NOT NULL
+        GROUP BY phase
+        ORDER BY phase
+        """,
+        (day, day),
+    )
+    return [(phase, round(float(seconds), 3), count) for phase, seconds, count in cur.fetchall()]
+
+
+def dirty_days(cur):
+    cur.execute("SELECT day FROM phase_dirty_days ORDER BY day")
+    return [day for (day,) in cur.fetchall()]
+
+
+def test_late_rows_from_any_writer_re_roll_their_day(scratch_db):
+    ingest.ensure_schema(scratch_db)
+    ingest.ingest_file(scratch_db, os.path.join(DASH_DIR, "data.csv"), chunk_rows=100)
+    closed_day = date(2024, 5, 17)
+    with scratch_db.cursor() as cur:
+        cur.execute(ROLL_UP_CLOSED_DAYS_QUERY)
+        # Rolling up a day that is already rolled up (e.g. two workers at once) is a no-op
+        cur.execute(
+            PHASE_TRANSITIONS_CTE.format(where_clause="WHERE DATE(phase_timestamp) = %s")
+            + ROLLUP_INSERT,
+            (closed_day,),
+        )
+        scratch_db.commit()
+        before = day_rollup(cur, closed_day)
+        assert before == day_from_raw_rows(cur, closed_day)
+        assert dirty_days(cur) == []
+
+        # A late row on a closed day and a row on the live day, written outside ingest.py
+        cur.execute(
+            "INSERT INTO data (target_id, phase_timestamp, phase) VALUES "
+            "('Target0', '2024-05-17 23:00:00', 'find'), "
+            "('Target0', '2024-05-17 23:30:00', 'fix'), "
+            "('Target0', '2024-05-20 23:00:00', 'find')"
+        )
+        scratch_db.commit()
+        assert dirty_days(cur) == [closed_day]
+        assert day_rollup(cur, closed_day) == before
+
+    assert _reroll_dirty_days(scratch_db) == 1
+    with scratch_db.cursor() as cur:
+        assert dirty_days(cur) == []
+        after = day_rollup(cur, closed_day)
+        assert after != before
+        assert after == day_from_raw_rows(cur, closed_day)
+
+        cur.execute(
+            "DELETE FROM data WHERE target_id = 'Target0' "
+            "AND phase_timestamp IN ('2024-05-17 23:00:00', '2024-05-17 23:30:00')"
+        )
+        scratch_db.commit()
+        assert dirty_days(cur) == [closed_day]
+
+    assert _reroll_dirty_days(scratch_db) == 1
+    assert _reroll_dirty_days(scratch_db) == 0
+    with scratch_db.cursor() as cur:
+        assert day_rollup(cur, closed_day) == before
+
+
+def test_target_queries_match_the_event_store(scratch_db, monkeypatch):
+    ingest.ensure_schema(scratch_db)
+    ingest.ingest_file(scratch_db, os.path.join(DASH_DIR, "data.csv"), chunk_rows=100)
+
+    @contextmanager
+    def scratch_connection():
+        yield scratch_db
+
+    # Run the drill-down queries on the scratch schema instead of the pool
+    monkeypatch.setattr(database, "pooled_connection", scratch_connection)
+    monkeypatch.setattr(database, "ensure_aggregation_index", lambda: None)
+    with scratch_db.cursor() as cur:
+        cur.execute(
+            "SELECT target_id, phase_timestamp, phase FROM data "
+            "ORDER BY phase_timestamp, target_id, phase"
+        )
+        store = EventStore(cur.fetchall())
+
+    targets = DatabaseTargetIndex()
+    for selected_date in ("2024-05-17", "all"):
+        for target in ("Target0", "Target1", "NoSuchTarget"):
+            durations, counts = targets.target_stats(target, selected_date)
+            expected_durations, expected_counts = store.target_stats(target, selected_date)
+            assert counts == expected_counts
+            assert list(durations) == list(expected_durations)
+            assert durations == pytest.approx(expected_durations)
+            assert targets.target_timeline(target, selected_date) == store.target_timeline(
+                target, selected_date
+            )
+
+    # A target's revision changes with its own rows only
+    before = targets.target_revision("Target0"), targets.target_revision("Target1")
+    with scratch_db.cursor() as cur:
+        cur.execute(
+            "INSERT INTO data (target_id, phase_timestamp, phase) "
+            "VALUES ('Target0', '2024-05-17 23:00:00', 'find')"
+        )
+    scratch_db.commit()
+    assert targets.target_revision("Target0") != before[0]
+    assert targets.target_revision("Target1") == before[1]
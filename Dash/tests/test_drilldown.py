@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.generator import generate_rows
+from event_store import EventStore
+from shared_snapshot import read_snapshot, write_snapshot
+
+ROWS = generate_rows(20, days=3, seed=9)
+DAYS = sorted({str(row[1].date()) for row in ROWS})
+TARGETS = sorted({row[0] for row in ROWS})
+
+
+def with_late_row(rows, target):
+    # The rows plus one more event of a target, a second after its first one
+    _, timestamp, phase = next(row for row in rows if row[0] == target)
+    return sorted(
+        rows + [(target, timestamp + timedelta(seconds=1), phase)],
+        key=lambda row: (row[1], row[0], row[2]),
+    )
+
+
+@pytest.mark.parametrize("selected_date", DAYS + ["all"])
+def test_snapshot_index_matches_the_event_store(snapshot_dir, selected_date):
+    write_snapshot(ROWS, DAYS, snapshot_dir)
+    index = read_snapshot(snapshot_dir).target_index()
+    store = EventStore(ROWS)
+    for target in TARGETS[:5] + ["NoSuchTarget"]:
+        durations, counts = index.target_stats(target, selected_date)
+        expected_durations, expected_counts = store.target_stats(target, selected_date)
+        assert counts == expected_counts
+        assert list(durations) == list(expected_durations)
+        assert durations == pytest.approx(expected_durations)
+
+        timeline = index.target_timeline(target, selected_date).to_dict("records")
+        assert timeline == store.target_timeline(target, selected_date)
+
+
+def test_snapshot_index_is_built_once_per_version(snapshot_dir):
+    write_snapshot(ROWS, DAYS, snapshot_dir)
+    snapshot = read_snapshot(snapshot_dir)
+    assert snapshot.target_index() is snapshot.target_index()
+    write_snapshot(ROWS, DAYS, snapshot_dir)
+    assert read_snapshot(snapshot_dir).target_index() is not snapshot.target_index()
+
+
+def test_snapshot_revision_changes_only_with_the_target(snapshot_dir):
+    write_snapshot(ROWS, DAYS, snapshot_dir)
+    before = {t: read_snapshot(snapshot_dir).target_index().target_revision(t) for t in TARGETS}
+    assert len(set(before.values())) == len(TARGETS)
+    assert read_snapshot(snapshot_dir).target_index().target_revision("NoSuchTarget") == ""
+
+    # A new version with a late row of one target keeps the other targets' revisions
+    late_target = TARGETS[3]
+    write_snapshot(with_late_row(ROWS, late_target), DAYS, snapshot_dir)
+    index = read_snapshot(snapshot_dir).target_index()
+    after = {t: index.target_revision(t) for t in TARGETS}
+    assert after[late_target] != before[late_target]
+    assert {t: r for t, r in after.items() if t != late_target} == {
+        t: r for t, r in before.items() if t != late_target
+    }
@@ -0,0 +1,104 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import data_processing
+import vectorized_processing
+from benchmarks.generator import generate_rows
+
+from conftest import DASH_DIR
+
+# The vectorized engine must give the same results as the pure-Python reference engine
+
+
+def load_data_csv():
+    # data.csv rows look like "Target0, Thu May 16 08:12:46 2024, find"
+    rows = []
+    with open(os.path.join(DASH_DIR, "data.csv")) as handle:
+        for line in handle:
+            target_id, timestamp, phase = [field.strip() for field in line.split(",")]
+            rows.append((target_id, datetime.strptime(timestamp, "%a %b %d %H:%M:%S %Y"), phase))
+    return rows
+
+
+def edge_case_rows():
+    # Several dates, rows sharing a timestamp, single-event days and late-arriving rows
+    start = datetime(2024, 5, 16, 8, 0, 0)
+    rows = generate_rows(30, phases=6, days=3, seed=7)
+    rows += [
+        ("Tie", start, "find"),
+        ("Tie", start, "fix"),  # Same timestamp as the previous phase
+        ("Tie", start + timedelta(minutes=2), "track"),
+        ("Tie", start + timedelta(minutes=2), "target"),
+        ("Lonely", start + timedelta(days=1, hours=3), "find"),  # Only event of its day
+        ("Lonely", start + timedelta(days=2, hours=1), "fix"),  # And on the next day
+        ("Late", start + timedelta(days=2, minutes=9), "fix"),
+        ("Late", start + timedelta(days=2, minutes=1), "find"),  # Inserted after a later row
+    ]
+    rng = random.Random(3)
+    for i in range(200):
+        # Random rows over four days, timestamps on whole seconds as stored in Postgres
+        timestamp = start + timedelta(seconds=rng.randint(0, 4 * 86400 - 1))
+        rows.append((f"Random{rng.randint(0, 9)}", timestamp, rng.choice(["find", "fix", "track"])))
+    # In the order of database.FETCH_ALL_ROWS_QUERY, which both engines receive
+    rows.sort(key=lambda row: (row[1], row[0], row[2]))
+    return rows
+
+
+def reference_results(rows, selected_date):
+    organized = data_processing.process_data(rows, selected_date)
+    durations, counts = data_processing.calculate_phase_durations_and_counts(organized)
+    gantt = pd.DataFrame(data_processing.build_gantt_data(organized))
+    return durations, counts, gantt
+
+
+def vectorized_results(rows, selected_date):
+    organized = vectorized_processing.process_data(rows, selected_date)
+    durations, counts = vectorized_processing.calculate_phase_durations_and_counts(organized)
+    gantt = vectorized_processing.build_gantt_data(organized)
+    return durations, counts, gantt
+
+
+def normalized_gantt(gantt):
+    # Same bars regardless of row order and column dtypes
+    frame = pd.DataFrame(
+        {
+            "Task": gantt["Task"].astype(str),
+            "Start": pd.to_datetime(gantt["Start"]),
+            "Finish": pd.to_datetime(gantt["Finish"]),
+            "Target ID": gantt["Target ID"].astype(str),
+        }
+    )
+    return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+def selections(rows):
+    return ["all"] + sorted({str(row[1].date()) for row in rows}) + ["1999-01-01"]
+
+
+@pytest.mark.parametrize("rows", [load_data_csv(), edge_case_rows()], ids=["data.csv", "edge_cases"])
+def test_engines_agree(rows):
+    for selected_date in selections(rows):
+        ref_durations, ref_counts, ref_gantt = reference_results(rows, selected_date)
+        vec_durations, vec_counts, vec_gantt = vectorized_results(rows, selected_date)
+
+        assert vec_counts == ref_counts
+        assert list(vec_durations) == list(ref_durations)  # Same phase order
+        for phase, seconds in ref_durations.items():
+            assert vec_durations[phase] == pytest.approx(seconds, abs=1e-6)
+        assert data_processing.calculate_average_duration(
+            vec_durations, vec_counts
+        ) == data_processing.calculate_average_duration(ref_durations, ref_counts)
+
+        assert len(vec_gantt) == len(ref_gantt)
+        if len(ref_gantt):
+            pd.testing.assert_frame_equal(normalized_gantt(vec_gantt), normalized_gantt(ref_gantt))
+
+
+def test_data_csv_loads_every_row():
+    rows = load_data_csv()
+    assert len(rows) == 306
+    assert len(vectorized_processing.process_data(rows, "all")) == 306
@@ -0,0 +1,34 @@
+from benchmarks.generator import generate_rows
+from event_store import EventStore
+
+ROWS = generate_rows(20, days=3, seed=11)
+DAYS = sorted({str(row[1].date()) for row in ROWS})
+
+
+def store_view(store):
+    # Everything a view reads from a store, to compare stores by value
+    return (
+        store.row_count,
+        store.dates(),
+        store.rows("all"),
+        {day: store.phase_stats(day) for day in DAYS + ["all"]},
+        store.target_stats("Target3", "all"),
+    )
+
+
+def test_extended_store_leaves_the_original_unchanged():
+    split = len(ROWS) * 2 // 3
+    old = EventStore(ROWS[:split])
+    old.target_stats("Target3", "all")  # Fill the per-target cache before extending
+    before = store_view(old)
+    revisions = old.selection_revision("all"), old.target_revision("Target3")
+
+    # New rows on the last day, plus a late row on the first day
+    target, timestamp, phase = ROWS[0]
+    late = [(target, timestamp.replace(microsecond=1), phase)]
+    new = old.extended(ROWS[split:] + late)
+
+    assert store_view(old) == before
+    assert (old.selection_revision("all"), old.target_revision("Target3")) == revisions
+    assert store_view(new) == store_view(EventStore(ROWS + late))
+    assert new.selection_revision(DAYS[0]) != old.selection_revision(DAYS[0])
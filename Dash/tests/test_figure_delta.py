@@ -0,0 +1,62 @@
+import functools
+
+import figure_delta
+import gantt_lod
+from benchmarks.generator import generate_rows
+from data_processing import build_gantt_data, process_data
+from figure_delta import gantt_chart_patch
+from graphs import create_lod_gantt_chart
+
+MAX_BARS = 40
+ROWS = generate_rows(30, days=1, seed=3)
+PHASE_COLORS = {
+    "find": "red",
+    "fix": "blue",
+    "track": "green",
+    "target": "purple",
+    "engage": "orange",
+}
+
+
+def gantt_state(rows):
+    # The Gantt view state build_view keeps for the level-of-detail renderer
+    prepared = gantt_lod.prepare_gantt_bars(build_gantt_data(process_data(rows, "all")))
+    figure = create_lod_gantt_chart(None, PHASE_COLORS, prepared=prepared)
+    return {"gantt": prepared, "phase_colors": PHASE_COLORS, "trace_count": len(figure["data"])}
+
+
+def appended_bars(patch):
+    # Bars in the traces a patch appends: start, finish and a gap per bar
+    return sum(
+        len(operation["params"]["value"]["x"]) // 3
+        for operation in patch.to_plotly_json()["operations"]
+        if operation["operation"] == "Append"
+    )
+
+
+def test_patched_gantt_stays_within_the_bar_cap(monkeypatch):
+    monkeypatch.setattr(figure_delta, "GANTT_MAX_BARS", MAX_BARS)
+    monkeypatch.setattr(
+        gantt_lod,
+        "select_visible_intervals",
+        functools.partial(gantt_lod.select_visible_intervals, max_bars=MAX_BARS),
+    )
+
+    # Replay the rows in growing ticks, patching the browser's figure whenever possible
+    ticks = range(len(ROWS) // 8, len(ROWS) + 1, len(ROWS) // 8)
+    shown = gantt_state(ROWS[: ticks[0]])
+    drawn, trace_count, patches = len(shown["gantt"]["visible"]), shown["trace_count"], 0
+    for end in ticks[1:]:
+        state = gantt_state(ROWS[:end])
+        result = gantt_chart_patch(shown, state, trace_count)
+        if result is None:
+            drawn, trace_count = len(state["gantt"]["visible"]), state["trace_count"]
+        else:
+            outputs, trace_count = result
+            drawn += appended_bars(outputs["gantt-chart"])
+            patches += 1
+        # The browser draws exactly what a fresh render would, and the title counts it
+        assert drawn == len(state["gantt"]["visible"])
+        assert drawn <= MAX_BARS
+        shown = state
+    assert patches > 0
@@ -0,0 +1,71 @@
+import io
+import os
+
+import ingest
+
+from conftest import DASH_DIR
+
+DATA_CSV = os.path.join(DASH_DIR, "data.csv")
+
+
+def read_stream(text, chunk_rows=100):
+    stream = ingest.NormalizedCsvStream(io.StringIO(text), chunk_rows)
+    return stream, stream.read()
+
+
+def test_stream_normalizes_and_rejects_rows():
+    stream, copied = read_stream(
+        "target_id,phase_timestamp,phase\n"  # Header: unknown timestamp layout
+        " Target0 , Thu May 16 08:12:46 2024 , find \n"
+        "Target1,2024-05-16T08:13:48.250000,fix\n"
+        "Target2,,track\n"  # Empty timestamp
+        "Target3,2024-05-16 08:14:48\n"  # Missing field
+    )
+    assert copied == (
+        "Target0,2024-05-16 08:12:46,find\n" "Target1,2024-05-16 08:13:48.250000,fix\n"
+    )
+    assert (stream.rows_written, stream.rows_rejected) == (2, 3)
+    assert stream.exhausted
+
+
+def test_stream_reads_in_chunks():
+    lines = "".join(f"Target{i},2024-05-16 08:00:{i:02d},find\n" for i in range(5))
+    stream = ingest.NormalizedCsvStream(io.StringIO(lines), 2)
+    chunks = []
+    while not stream.exhausted:
+        stream.start_chunk()
+        chunks.append(stream.read())
+    assert [chunk.count("\n") for chunk in chunks] == [2, 2, 1]
+
+
+def test_timestamp_layout_cache_is_per_stream():
+    # A stream that learns the ISO layout must not change what other streams try first
+    read_stream("Target0,2024-05-16 08:00:00,find\n")
+    assert ingest.TIMESTAMP_FORMATS[0] == "%a %b %d %H:%M:%S %Y"
+    assert ingest.normalize_timestamp("Thu May 16 08:12:46 2024") == (
+        "2024-05-16 08:12:46",
+        "%a %b %d %H:%M:%S %Y",
+    )
+    assert ingest.normalize_timestamp("not a time") == (None, None)
+
+
+def test_ingest_data_csv_twice(scratch_db):
+    ingest.ensure_schema(scratch_db)
+
+    read, inserted, rejected, days = ingest.ingest_file(scratch_db, DATA_CSV, chunk_rows=100)
+    assert (read, inserted, rejected) == (306, 306, 0)
+    assert days
+
+    # Re-running is a no-op thanks to ON CONFLICT DO NOTHING
+    read, inserted, rejected, days = ingest.ingest_file(scratch_db, DATA_CSV, chunk_rows=100)
+    assert (read, inserted, rejected) == (306, 0, 0)
+    assert days == set()
+
+    with scratch_db.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM data")
+        assert cur.fetchone()[0] == 306
+        cur.execute(
+            "SELECT COUNT(*) FROM "
+            "(SELECT 1 FROM data GROUP BY target_id, phase_timestamp, phase HAVING COUNT(*) > 1) d"
+        )
+        assert cur.fetchone()[0] == 0
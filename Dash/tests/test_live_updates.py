@@ -0,0 +1,56 @@
+import threading
+import time
+
+import live_updates
+from live_updates import ChangeBroadcaster
+
+
+def test_wait_returns_at_once_when_version_already_changed():
+    broadcaster = ChangeBroadcaster()
+    broadcaster.publish()
+    started = time.monotonic()
+    assert broadcaster.wait_for_change(0, timeout=5) == 1
+    assert time.monotonic() - started < 1
+
+
+def test_wait_times_out_without_change():
+    broadcaster = ChangeBroadcaster()
+    started = time.monotonic()
+    assert broadcaster.wait_for_change(0, timeout=0.05) == 0
+    assert time.monotonic() - started >= 0.04
+
+
+def test_publish_wakes_every_waiter():
+    broadcaster = ChangeBroadcaster()
+    seen = []
+    ready = threading.Barrier(5)
+
+    def wait():
+        ready.wait()
+        seen.append(broadcaster.wait_for_change(0, timeout=5))
+
+    threads = [threading.Thread(target=wait) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    time.sleep(0.05)  # Let the waiters block
+    started = time.monotonic()
+    broadcaster.publish()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert seen == [1, 1, 1, 1]
+    assert time.monotonic() - started < 1
+
+
+def test_event_stream_sends_versions_and_keep_alives(monkeypatch):
+    broadcaster = ChangeBroadcaster()
+    monkeypatch.setattr(live_updates, "broadcaster", broadcaster)
+    monkeypatch.setattr(live_updates, "STREAM_KEEPALIVE", 0.01)
+    stream = live_updates.event_stream()
+    assert next(stream) == f"retry: {live_updates.RECONNECT_DELAY * 1000}\ndata: 0\n\n"
+    assert next(stream) == ": keep-alive\n\n"
+    broadcaster.publish()
+    broadcaster.publish()
+    # Versions published while the stream was not waiting are sent as one message
+    assert next(stream) == "data: 2\n\n"
+    assert next(stream) == ": keep-alive\n\n"
@@ -0,0 +1,85 @@
+import re
+
+from flask import Flask
+
+import metrics
+from metrics import Histogram, instrument_callback, register_metrics, render_metrics
+
+# One sample line of the Prometheus text format: name{labels} value
+SAMPLE_LINE = re.compile(r'^[a-z_]+(\{([a-z_]+="[^"]*",?)+\})? [0-9.e+-]+$')
+
+
+def test_unlabelled_histogram_exposition():
+    histogram = Histogram("test_rows", "Rows per fetch.", (1, 10, 100))
+    for value in (0, 5, 5, 50, 500):
+        histogram.observe(value)
+    assert histogram.render() == [
+        "# HELP test_rows Rows per fetch.",
+        "# TYPE test_rows histogram",
+        'test_rows_bucket{le="1"} 1',
+        'test_rows_bucket{le="10"} 3',
+        'test_rows_bucket{le="100"} 4',
+        'test_rows_bucket{le="+Inf"} 5',
+        "test_rows_sum 560",
+        "test_rows_count 5",
+    ]
+
+
+def test_labelled_histogram_exposition():
+    histogram = Histogram("test_seconds", "Stage time.", (0.01, 0.1), "stage")
+    histogram.observe(0.05, "fetch")
+    histogram.observe(0.01, "build")  # On a bound: counted in that bucket
+    histogram.observe(0.2, "fetch")
+    assert histogram.render() == [
+        "# HELP test_seconds Stage time.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="build",le="0.01"} 1',
+        'test_seconds_bucket{stage="build",le="0.1"} 1',
+        'test_seconds_bucket{stage="build",le="+Inf"} 1',
+        'test_seconds_sum{stage="build"} 0.01',
+        'test_seconds_count{stage="build"} 1',
+        'test_seconds_bucket{stage="fetch",le="0.01"} 0',
+        'test_seconds_bucket{stage="fetch",le="0.1"} 1',
+        'test_seconds_bucket{stage="fetch",le="+Inf"} 2',
+        'test_seconds_sum{stage="fetch"} 0.25',
+        'test_seconds_count{stage="fetch"} 2',
+    ]
+
+
+def test_empty_histogram_renders_only_metadata():
+    assert Histogram("test_empty", "Nothing yet.", (1,)).render() == [
+        "# HELP test_empty Nothing yet.",
+        "# TYPE test_empty histogram",
+    ]
+
+
+def test_render_metrics_is_valid_exposition():
+    with metrics.stage_timer("test_stage"):
+        pass
+    text = render_metrics()
+    assert text.endswith("\n")
+    for line in text.splitlines():
+        assert line.startswith("# HELP ") or line.startswith("# TYPE ") or SAMPLE_LINE.match(line)
+    assert 'dashboard_stage_seconds_count{stage="test_stage"}' in text
+    assert "# TYPE dashboard_callbacks_in_progress gauge" in text
+    assert "dashboard_callbacks_in_progress 0" in text
+
+
+def test_instrumented_callback_records_time_and_response_size():
+    server = Flask(__name__)
+    register_metrics(server)
+
+    @server.route("/callback")
+    @instrument_callback("test_callback")
+    def callback():
+        return "x" * 300
+
+    client = server.test_client()
+    assert client.get("/callback").status_code == 200
+    response = client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert 'dashboard_callback_seconds_count{callback="test_callback"} 1' in text
+    assert 'dashboard_response_bytes_bucket{callback="test_callback",le="256"} 0' in text
+    assert 'dashboard_response_bytes_bucket{callback="test_callback",le="1024"} 1' in text
+    assert 'dashboard_response_bytes_sum{callback="test_callback"} 300' in text
@@ -0,0 +1,145 @@
+from datetime import date, timedelta
+
+import partitions
+from partitions import (
+    create_day_partition,
+    ensure_day_partitions,
+    list_day_partitions,
+    maintain_partitions,
+    partition_name,
+)
+
+
+class ScriptedCursor:
+    # Records statements and answers the catalog queries partitions.py makes
+    def __init__(self, partitions=(), default_days=(), today=date(2024, 5, 16)):
+        self.partitions = set(partitions)
+        self.default_days = list(default_days)
+        self.today = today
+        self.executed = []
+        self._result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+        if "to_regclass" in sql:
+            self._result = [(params[0] if params[0] in self.partitions else None,)]
+        elif "pg_inherits" in sql:
+            self._result = [(name,) for name in self.partitions if name.startswith("data_p")]
+        elif "SELECT EXISTS" in sql:
+            self._result = [(any(params[0] <= day < params[1] for day in self.default_days),)]
+        elif "pg_try_advisory" in sql:
+            self._result = [(True,)]
+        elif "CURRENT_DATE" in sql:
+            self._result = [(self.today,)]
+        elif "SELECT DISTINCT DATE(phase_timestamp)" in sql:
+            self._result = [(day,) for day in self.default_days]
+        elif sql.lstrip().startswith("CREATE TABLE data_p"):
+            self.partitions.add(sql.split()[2])
+        self.rowcount = 0
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+    def statements(self, prefix):
+        return [(sql, params) for sql, params in self.executed if sql.startswith(prefix)]
+
+
+class ScriptedConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+def test_partition_name():
+    assert partition_name(date(2024, 5, 16)) == "data_p20240516"
+    assert partition_name(date(2024, 1, 2)) == "data_p20240102"
+    # Names sort in day order
+    days = [date(2023, 12, 31), date(2024, 1, 1), date(2024, 10, 1), date(2024, 2, 29)]
+    assert sorted(map(partition_name, days)) == list(map(partition_name, sorted(days)))
+
+
+def test_list_day_partitions_parses_and_orders_names():
+    cur = ScriptedCursor(partitions=["data_p20240517", "data_p20231231", "data_p20240229"])
+    assert list_day_partitions(cur) == {
+        date(2023, 12, 31): "data_p20231231",
+        date(2024, 2, 29): "data_p20240229",
+        date(2024, 5, 17): "data_p20240517",
+    }
+
+
+def test_partition_ranges_are_half_open_days():
+    cur = ScriptedCursor()
+    for day in (date(2024, 2, 28), date(2024, 2, 29), date(2024, 12, 31)):
+        assert create_day_partition(cur, day)
+    ranges = [params for _, params in cur.statements("CREATE TABLE data_p")]
+    assert ranges == [
+        (date(2024, 2, 28), date(2024, 2, 29)),
+        (date(2024, 2, 29), date(2024, 3, 1)),
+        (date(2024, 12, 31), date(2025, 1, 1)),
+    ]
+    # Consecutive days' partitions leave no gap and do not overlap
+    assert ranges[0][1] == ranges[1][0]
+    # An existing partition is left alone
+    assert not create_day_partition(cur, date(2024, 2, 29))
+
+
+def test_rows_in_default_partition_are_moved_and_attached():
+    day = date(2024, 5, 16)
+    cur = ScriptedCursor(default_days=[day])
+    assert create_day_partition(cur, day)
+    bounds = (day, day + timedelta(days=1))
+    assert cur.statements("CREATE TABLE data_p20240516 (LIKE data")
+    assert [params for _, params in cur.statements("WITH moved AS")] == [bounds]
+    assert [params for _, params in cur.statements("ALTER TABLE data ATTACH PARTITION")] == [
+        bounds
+    ]
+
+
+def test_ensure_day_partitions_skips_duplicates_and_existing():
+    cur = ScriptedCursor(partitions=["data_p20240516"])
+    days = [date(2024, 5, 18), date(2024, 5, 16), date(2024, 5, 17), date(2024, 5, 18)]
+    assert ensure_day_partitions(cur, days) == 2
+    assert [sql.split()[2] for sql, _ in cur.statements("CREATE TABLE data_p")] == [
+        "data_p20240517",
+        "data_p20240518",
+    ]
+
+
+def test_maintenance_premakes_and_drops_by_retention(monkeypatch):
+    monkeypatch.setattr(partitions, "data_is_partitioned", lambda cur: True)
+    today = date(2024, 5, 16)
+    cur = ScriptedCursor(
+        partitions=["data_p20240501", "data_p20240509", "data_p20240510", "data_p20240516"],
+        # Stray rows: one expired day and one day without a partition
+        default_days=[date(2024, 5, 2), date(2024, 5, 12)],
+        today=today,
+    )
+    conn = ScriptedConnection(cur)
+    created, dropped = maintain_partitions(conn, premake_days=2, retention_days=7)
+    assert dropped == [date(2024, 5, 1)]
+    assert [sql for sql, _ in cur.statements("DROP TABLE")] == ["DROP TABLE data_p20240501"]
+    assert [sql.split()[2] for sql, _ in cur.statements("CREATE TABLE data_p")] == [
+        "data_p20240512",
+        "data_p20240517",
+        "data_p20240518",
+    ]
+    assert created == 3
+    assert conn.committed
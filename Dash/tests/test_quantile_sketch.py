@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+import pytest
+
+from quantile_sketch import (
+    TDigest,
+    calculate_duration_statistic,
+    merge_phase_sketches,
+)
+
+QUANTILES = (0.01, 0.1, 0.5, 0.9, 0.99, 0.999)
+
+
+def durations(kind, size=20000, seed=1):
+    rng = np.random.default_rng(seed)
+    if kind == "lognormal":
+        return rng.lognormal(5, 1, size)
+    if kind == "exponential":
+        return rng.exponential(60, size)
+    return rng.uniform(0, 100, size)
+
+
+def assert_accurate(digest, values):
+    ordered = np.sort(values)
+    for q in QUANTILES:
+        estimate = digest.quantile(q)
+        # Rank error: the share of values below the estimate is within 0.2 % of q
+        assert abs(np.searchsorted(ordered, estimate) / len(ordered) - q) < 0.002
+    for q in (0.5, 0.9, 0.99):
+        # Value error at the percentiles the dashboard shows: under 1 %
+        assert digest.quantile(q) == pytest.approx(np.percentile(values, q * 100), rel=0.01)
+
+
+@pytest.mark.parametrize("kind", ["lognormal", "exponential", "uniform"])
+def test_quantiles_match_numpy(kind):
+    values = durations(kind)
+    digest = TDigest.from_values(values)
+    assert digest.count == len(values)
+    assert (digest.min, digest.max) == (values.min(), values.max())
+    assert digest.quantile(0) == values.min() and digest.quantile(1) == values.max()
+    assert len(digest.to_dict()["centroids"]) <= digest.compression
+    assert_accurate(digest, values)
+
+
+@pytest.mark.parametrize("kind", ["lognormal", "exponential", "uniform"])
+def test_merged_days_match_numpy(kind):
+    values = durations(kind)
+    merged = TDigest()
+    for day in np.array_split(values, 10):
+        merged.merge(TDigest.from_values(day))
+    assert merged.count == len(values)
+    assert (merged.min, merged.max) == (values.min(), values.max())
+    assert_accurate(merged, values)
+
+
+def test_added_values_match_batch():
+    values = durations("lognormal", size=5000, seed=2)
+    digest = TDigest()
+    for value in values:
+        digest.add(value)
+    assert digest.count == len(values)
+    assert_accurate(digest, values)
+
+
+def test_empty_and_single_value():
+    empty = TDigest()
+    assert empty.quantile(0.5) is None
+    assert empty.to_dict()["min"] is None
+    assert TDigest.from_dict(empty.to_dict()).quantile(0.5) is None
+    assert TDigest().merge(empty).count == 0
+
+    single = TDigest.from_values([42.0])
+    assert [single.quantile(q) for q in (0, 0.5, 1)] == [42.0, 42.0, 42.0]
+
+
+def test_dict_round_trip_through_json():
+    digest = TDigest.from_values(durations("exponential", size=3000))
+    restored = TDigest.from_dict(json.loads(json.dumps(digest.to_dict())))
+    assert restored.count == digest.count
+    assert [restored.quantile(q) for q in QUANTILES] == [digest.quantile(q) for q in QUANTILES]
+
+
+def test_merge_phase_sketches_and_statistic():
+    days = [
+        {"find": TDigest.from_values([60, 120]), "fix": TDigest.from_values([600])},
+        {"track": TDigest.from_values([300]), "find": TDigest.from_values([180, 240])},
+    ]
+    merged = {}
+    for day in days:
+        merge_phase_sketches(day, into=merged)
+    assert list(merged) == ["find", "fix", "track"]
+    assert merged["find"].count == 4
+    # The day sketches are left unchanged
+    assert days[0]["find"].count == 2
+
+    assert calculate_duration_statistic(merged, "p50") == {"find": 2.5, "fix": 10.0, "track": 5.0}
+    assert calculate_duration_statistic({"find": TDigest()}, "p90") == {}
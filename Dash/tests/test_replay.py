@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.generator import generate_rows
+from event_store import EventStore
+from replay import ReplayEngine
+from shared_snapshot import read_snapshot, write_snapshot
+
+ROWS = generate_rows(20, days=3, seed=5)
+DAYS = sorted({str(row[1].date()) for row in ROWS})
+
+
+def rows_until(day):
+    # Rows up to the end of a day, as a snapshot taken then would hold
+    return [row for row in ROWS if str(row[1].date()) <= day]
+
+
+def test_replay_at_the_end_matches_the_store():
+    store = EventStore(ROWS)
+    engine = ReplayEngine(store.rows(DAYS[1]), DAYS[1])
+    assert engine.event_count == len(store.rows(DAYS[1]))
+    state = engine.state_at(engine.bounds()[1])
+    durations, counts = store.phase_stats(DAYS[1])
+    assert state.phase_counts == counts
+    assert state.phase_durations == pytest.approx(durations)
+
+
+def test_selection_revision_changes_only_with_the_selection():
+    store = EventStore(rows_until(DAYS[1]))
+    first, second, everything = (store.selection_revision(s) for s in (DAYS[0], DAYS[1], "all"))
+    assert store.selection_revision(DAYS[2]) == 0
+
+    # Rows of a later day leave the earlier days' revisions alone
+    store.add_rows([row for row in ROWS if str(row[1].date()) == DAYS[2]])
+    assert store.selection_revision(DAYS[0]) == first
+    assert store.selection_revision(DAYS[1]) == second
+    assert store.selection_revision(DAYS[2]) != 0
+    assert store.selection_revision("all") != everything
+
+    # A late row on the first day renews that day only
+    target, timestamp, phase = ROWS[0]
+    store.add_rows([(target, timestamp + timedelta(seconds=1), phase)])
+    assert store.selection_revision(DAYS[0]) != first
+    assert store.selection_revision(DAYS[1]) == second
+
+    # A store rebuilt from the same rows (a full resync) gets new revisions
+    assert EventStore(ROWS).selection_revision(DAYS[1]) != second
+
+
+def test_snapshot_fingerprint_survives_appends_on_other_days(snapshot_dir):
+    directory = snapshot_dir
+    write_snapshot(rows_until(DAYS[1]), DAYS[:2], directory)
+    old = read_snapshot(directory)
+    old_keys = {day: old.selection_fingerprint(day) for day in DAYS}
+
+    write_snapshot(ROWS, DAYS, directory)
+    new = read_snapshot(directory)
+    assert new.version == old.version + 1
+    assert new.selection_fingerprint(DAYS[0]) == old_keys[DAYS[0]]
+    assert new.selection_fingerprint(DAYS[1]) == old_keys[DAYS[1]]
+    assert new.selection_fingerprint(DAYS[2]) != old_keys[DAYS[2]]
+    assert new.selection_fingerprint("all") != old.selection_fingerprint("all")
+    assert len({new.selection_fingerprint(day) for day in DAYS}) == len(DAYS)
+
+    # The day's slice holds exactly that day's rows
+    frame = new.to_frame(DAYS[1])
+    expected = [row for row in ROWS if str(row[1].date()) == DAYS[1]]
+    assert len(frame) == len(expected)
+    assert list(frame.itertuples(index=False, name=None))[:3] == [
+        (target, timestamp, phase) for target, timestamp, phase in expected[:3]
+    ]
+    assert len(new.to_frame()) == len(ROWS)
+
+
+def test_snapshot_fingerprint_changes_with_a_late_row(snapshot_dir):
+    directory = snapshot_dir
+    write_snapshot(ROWS, DAYS, directory)
+    before = {day: read_snapshot(directory).selection_fingerprint(day) for day in DAYS}
+
+    target, timestamp, phase = ROWS[0]
+    late = sorted(
+        ROWS + [(target, timestamp + timedelta(seconds=1), phase)],
+        key=lambda row: (row[1], row[0], row[2]),
+    )
+    write_snapshot(late, DAYS, directory)
+    after = read_snapshot(directory)
+    assert after.selection_fingerprint(DAYS[0]) != before[DAYS[0]]
+    assert after.selection_fingerprint(DAYS[1]) == before[DAYS[1]]
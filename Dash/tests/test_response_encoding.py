@@ -0,0 +1,116 @@
+import gzip
+
+import pytest
+from flask import Flask, Response
+
+import response_encoding
+from response_encoding import choose_encoding, compress_body, register_compression
+
+MIN_BYTES = 500
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("GZIP;q=0.5, BR;q=0.8", "br"),
+        ("gzip, br;q=0", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("gzip;q=0.0", None),
+        ("gzip;q=bogus", None),
+        ("deflate, gzip ; q=1", "gzip"),
+    ],
+)
+def test_choose_encoding(monkeypatch, header, expected):
+    # Pretend brotli is installed: only its presence is checked
+    monkeypatch.setattr(response_encoding, "brotli", object())
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(response_encoding, "brotli", None)
+    assert choose_encoding("gzip, deflate, br") == "gzip"
+    assert choose_encoding("br") is None
+
+
+def test_gzip_body_round_trips_and_is_deterministic():
+    body = b'{"data": [' + b"1.5, " * 1000 + b"2]}"
+    compressed = compress_body(body, "gzip")
+    assert gzip.decompress(compressed) == body
+    assert len(compressed) < len(body) / 10
+    assert compress_body(body, "gzip") == compressed
+
+
+def test_brotli_body_round_trips():
+    brotli = pytest.importorskip("brotli")
+    body = b"target,phase\n" * 500
+    assert brotli.decompress(compress_body(body, "br")) == body
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(response_encoding, "brotli", None)
+    monkeypatch.setattr(response_encoding, "_static_cache", {})
+    server = Flask(__name__)
+
+    @server.route("/json/<int:size>")
+    def json_body(size):
+        return Response(b"x" * size, mimetype="application/json")
+
+    @server.route("/png")
+    def png_body():
+        return Response(b"\x89PNG" + b"\0" * 2000, mimetype="image/png")
+
+    @server.route("/_dash-component-suites/bundle.js")
+    def bundle():
+        return Response(b"var a = 1;\n" * 400, mimetype="application/javascript")
+
+    register_compression(server, min_bytes=MIN_BYTES)
+    return server.test_client()
+
+
+def test_bodies_below_the_threshold_are_sent_as_is(client):
+    response = client.get(f"/json/{MIN_BYTES - 1}", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.data == b"x" * (MIN_BYTES - 1)
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_bodies_at_the_threshold_are_compressed(client):
+    response = client.get(f"/json/{MIN_BYTES}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert gzip.decompress(response.data) == b"x" * MIN_BYTES
+
+
+def test_clients_without_gzip_and_binary_types_are_not_compressed(client):
+    assert "Content-Encoding" not in client.get("/json/5000").headers
+    refused = client.get("/json/5000", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in refused.headers
+    png = client.get("/png", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in png.headers
+
+
+def test_static_bundles_are_compressed_once(client, monkeypatch):
+    calls = []
+
+    def counting_compress(body, encoding):
+        calls.append(encoding)
+        return compress_body(body, encoding)
+
+    monkeypatch.setattr(response_encoding, "compress_body", counting_compress)
+    first = client.get("/_dash-component-suites/bundle.js", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert list(response_encoding._static_cache) == [
+        ("/_dash-component-suites/bundle.js?", "gzip")
+    ]
+    second = client.get("/_dash-component-suites/bundle.js", headers={"Accept-Encoding": "gzip"})
+    assert second.data == first.data
+    assert calls == ["gzip"]
+    # Callback responses are compressed every time
+    client.get("/json/5000", headers={"Accept-Encoding": "gzip"})
+    client.get("/json/5000", headers={"Accept-Encoding": "gzip"})
+    assert calls == ["gzip"] * 3
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from track_store import TrackStore, build_track_store
+
+# Columns of the bc3data.csv layout, one of each encoding the store picks
+HEADER = (
+    "timestamp,timestamp,trackNumber,e1.latitude,e1.longitude,e1.altitude,e1.trackQuality,"
+    "e1.category,e1.is3d,e1.isDeadReckon,e11.isTest,e15.sourceId,e12.callsign,e10.aircraftICAOType"
+)
+
+
+def bc3_lines():
+    # 3 tracks written out of order, 40 rows
+    lines = [HEADER]
+    start = 1743524906
+    for i in range(40):
+        track = [44642, 7, 1201][i % 3]
+        epoch = start + (39 - i) * 45
+        text_time = pd.Timestamp(epoch, unit="s").strftime("%Y-%m-%d %H:%M:%S")
+        fields = [
+            str(epoch),
+            text_time,
+            str(track),
+            f"{32.08 + i * 0.001:.8f}",  # dense float64
+            f"{-77.46 - i * 0.002:.8f}",
+            f"{9418.32 + i:.2f}",  # dense float32
+            str(i % 8),  # dense int8
+            ["Air", "Surface"][i % 2],  # category
+            "TRUE" if i % 3 else "FALSE",  # bool
+            "" if i % 4 == 0 else ("TRUE" if i % 5 else "FALSE"),  # bool with gaps
+            "FALSE",  # constant
+            "" if i % 2 else "4294967295",  # constant with gaps
+            "EAGLE1" if i == 5 else ("HAWK2" if i == 17 else ""),  # sparse (2 of 40)
+            "",  # empty
+        ]
+        lines.append(",".join(fields))
+    return lines
+
+
+def expected_frame(csv_path):
+    frame = pd.read_csv(csv_path, low_memory=False)
+    frame = frame.drop(columns=["timestamp.1"])
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], unit="s")
+    return frame.sort_values(["trackNumber", "timestamp"], kind="stable").reset_index(drop=True)
+
+
+@pytest.fixture
+def store(tmp_path):
+    csv_path = tmp_path / "tracks.csv"
+    csv_path.write_text("\n".join(bc3_lines()) + "\n")
+    directory = str(tmp_path / "store")
+    assert build_track_store(str(csv_path), directory) == 40
+    return TrackStore(directory), expected_frame(csv_path)
+
+
+def assert_same_values(actual, expected):
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        if e is None or (isinstance(e, float) and np.isnan(e)):
+            assert a is None or (isinstance(a, float) and np.isnan(a))
+        else:
+            assert a == pytest.approx(e) if isinstance(e, float) else a == e
+
+
+def test_round_trip_columns(store):
+    track_store, expected = store
+    loaded = track_store.load_rows(slice(None))
+    assert sorted(loaded.columns) == sorted(expected.columns)
+    assert loaded["trackNumber"].tolist() == expected["trackNumber"].tolist()
+    assert (loaded["timestamp"] == expected["timestamp"]).all()
+    for name in track_store.columns:
+        assert_same_values(loaded[name].tolist(), expected[name].astype(object).tolist())
+
+
+def test_round_trip_dtypes(store):
+    track_store, _ = store
+    loaded = track_store.load_rows(slice(None))
+    assert loaded["timestamp"].dtype == np.dtype("datetime64[s]")
+    assert loaded["e1.latitude"].dtype == np.float64
+    assert loaded["e1.altitude"].dtype == np.float32
+    assert loaded["e1.trackQuality"].dtype == np.int8
+    # Text comes back as strings, and booleans with gaps as objects (None where missing)
+    for name in ("e1.category", "e12.callsign"):
+        assert pd.api.types.is_string_dtype(loaded[name])
+    for name in ("e1.is3d", "e1.isDeadReckon", "e11.isTest"):
+        assert loaded[name].dtype == object
+
+    encodings = {name: meta["encoding"] for name, meta in track_store._column_meta.items()}
+    assert encodings == {
+        "e1.latitude": "dense",
+        "e1.longitude": "dense",
+        "e1.altitude": "dense",
+        "e1.trackQuality": "dense",
+        "e1.category": "category",
+        "e1.is3d": "bool",
+        "e1.isDeadReckon": "bool",
+        "e11.isTest": "constant",
+        "e15.sourceId": "constant",
+        "e12.callsign": "sparse",
+        "e10.aircraftICAOType": "constant",
+    }
+
+
+def test_load_track_slices_one_track(store):
+    track_store, expected = store
+    assert track_store.track_numbers.tolist() == [7, 1201, 44642]
+    for track_number in (7, 1201, 44642):
+        loaded = track_store.load_track(track_number, columns=["e1.latitude", "e12.callsign"])
+        rows = expected[expected["trackNumber"] == track_number]
+        assert loaded["timestamp"].is_monotonic_increasing
+        assert loaded["e1.latitude"].tolist() == pytest.approx(rows["e1.latitude"].tolist())
+        assert_same_values(loaded["e12.callsign"].tolist(), rows["e12.callsign"].astype(object).tolist())
+    assert track_store.load_track(99).empty
@@ -0,0 +1,146 @@
+import json
+
+import numpy as np
+import plotly.io
+import pytest
+
+from graphs import create_trajectory_map
+from track_store import TrackStore, build_track_store
+from trajectory_index import TrajectoryIndex, build_trajectories, simplify_polyline
+
+DAY_START = 1743465600  # 2025-04-01 00:00:00 UTC
+
+
+def reference_simplify(x, y, tolerance):
+    # Textbook recursive Douglas-Peucker, returning the kept indices
+    def recurse(first, last):
+        if last - first < 2:
+            return []
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        chord = np.hypot(dx, dy)
+        best, best_distance = None, -1.0
+        for i in range(first + 1, last):
+            px, py = x[i] - x[first], y[i] - y[first]
+            distance = np.hypot(px, py) if chord == 0 else abs(px * dy - py * dx) / chord
+            if distance > best_distance:
+                best, best_distance = i, distance
+        if best_distance <= tolerance:
+            return []
+        return recurse(first, best) + [best] + recurse(best, last)
+
+    if len(x) <= 2:
+        return list(range(len(x)))
+    return [0] + recurse(0, len(x) - 1) + [len(x) - 1]
+
+
+def test_simplify_straight_line_keeps_end_points():
+    x = np.linspace(0, 10, 50)
+    keep = simplify_polyline(x, 2 * x + 1, tolerance=1e-9)
+    assert np.flatnonzero(keep).tolist() == [0, 49]
+
+
+def test_simplify_keeps_spike_above_tolerance():
+    x = np.arange(5, dtype=float)
+    y = np.array([0.0, 0.0, 3.0, 0.0, 0.0])
+    assert simplify_polyline(x, y, tolerance=2.9).tolist() == [True, False, True, False, True]
+    assert simplify_polyline(x, y, tolerance=3.0).tolist() == [True, False, False, False, True]
+
+
+def test_simplify_short_and_closed_polylines():
+    assert simplify_polyline(np.array([1.0]), np.array([2.0]), 0.5).tolist() == [True]
+    assert simplify_polyline(np.zeros(2), np.zeros(2), 0.5).all()
+    # First and last point equal: distances are measured from that point
+    x = np.array([0.0, 2.0, 1.0, 0.0])
+    y = np.array([0.0, 0.0, 0.1, 0.0])
+    assert simplify_polyline(x, y, tolerance=1.0).tolist() == [True, True, False, True]
+
+
+def test_simplify_matches_recursive_reference():
+    rng = np.random.default_rng(7)
+    for tolerance in (0.0, 0.05, 0.5, 5.0):
+        x = np.cumsum(rng.normal(size=300))
+        y = np.cumsum(rng.normal(size=300))
+        keep = simplify_polyline(x, y, tolerance)
+        assert np.flatnonzero(keep).tolist() == reference_simplify(x, y, tolerance)
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    # 6 tracks wandering around two days, some rows without a position
+    rng = np.random.default_rng(3)
+    directory = tmp_path_factory.mktemp("tracks")
+    lines = ["timestamp,trackNumber,e1.latitude,e1.longitude,e1.altitude"]
+    for track in range(6):
+        lat, lon = 30 + rng.uniform(0, 4), -80 + rng.uniform(0, 4)
+        epoch = DAY_START + int(rng.integers(0, 36 * 3600))
+        for _ in range(200):
+            lat += rng.normal(scale=0.05)
+            lon += rng.normal(scale=0.05)
+            epoch += int(rng.integers(5, 120))
+            position = "," if rng.random() < 0.05 else f"{lat:.6f},{lon:.6f}"
+            lines.append(f"{epoch},{100 + track},{position},{rng.uniform(1000, 9000):.1f}")
+    csv_path = directory / "tracks.csv"
+    csv_path.write_text("\n".join(lines) + "\n")
+    build_track_store(str(csv_path), str(directory / "store"))
+    return TrajectoryIndex(TrackStore(str(directory / "store")), grid_deg=0.5)
+
+
+def brute_force(index, bbox, time_window):
+    keep = ~np.isnan(index.latitudes) & ~np.isnan(index.longitudes)
+    if time_window is not None:
+        keep &= (index.timestamps >= time_window[0]) & (index.timestamps < time_window[1])
+    if bbox is not None:
+        lon_min, lon_max, lat_min, lat_max = bbox
+        keep &= (index.longitudes >= lon_min) & (index.longitudes <= lon_max)
+        keep &= (index.latitudes >= lat_min) & (index.latitudes <= lat_max)
+    return np.flatnonzero(keep)
+
+
+def test_index_available_dates(index):
+    assert index.available_dates == ["2025-04-01", "2025-04-02"]
+
+
+def test_query_matches_brute_force(index):
+    rng = np.random.default_rng(11)
+    windows = [None, (DAY_START, DAY_START + 86400), (DAY_START + 86400, DAY_START + 2 * 86400)]
+    # Small boxes (grid path), boxes covering everything (time path) and none
+    boxes = [None, (-200.0, 200.0, -90.0, 90.0)]
+    for _ in range(20):
+        lon, lat = rng.uniform(-81, -75), rng.uniform(29, 35)
+        size = rng.uniform(0.05, 2.0)
+        boxes.append((lon, lon + size, lat, lat + size))
+    for bbox in boxes:
+        for window in windows:
+            rows = index.query(bbox, window)
+            assert rows.tolist() == brute_force(index, bbox, window).tolist()
+
+
+def test_query_outside_data_is_empty(index):
+    assert len(index.query((10.0, 11.0, 10.0, 11.0))) == 0
+    assert len(index.query(None, (0, 1000))) == 0
+
+
+def test_build_trajectories_and_map(index):
+    viewport = [-79.0, -77.0, 31.0, 33.0]
+    trajectories = build_trajectories(index, "2025-04-01", viewport, plot_width_px=400)
+    points = trajectories["points"]
+    assert len(points) <= trajectories["candidates"]
+    assert (points["timestamp"].dt.strftime("%Y-%m-%d") == "2025-04-01").all()
+    assert len(points) > 0
+    assert trajectories["track_count"] == len(np.unique(points["trackNumber"]))
+
+    fig = create_trajectory_map(trajectories)
+    assert isinstance(fig, dict)
+    assert fig["layout"]["xaxis"]["range"] == viewport[:2]
+    assert fig["layout"]["yaxis"]["range"] == viewport[2:]
+    drawn = sum(
+        len(trace["customdata"]) - sum(row[0] is None for row in trace["customdata"])
+        for trace in fig["data"]
+    )
+    assert drawn == len(points)
+    # The figure is sent as is, so it must serialize without plotly's validation
+    json.loads(plotly.io.json.to_json_plotly(fig))
+
+    # Whole-map view: no fixed range
+    fig = create_trajectory_map(build_trajectories(index, "all"))
+    assert "range" not in fig["layout"]["xaxis"]